@@ -0,0 +1,51 @@
+from typing import List, Optional, Union
+
+from pandas import DataFrame
+
+from Visa_Prediction.cloud_storage.aws_storage import SimpleStorageService
+from Visa_Prediction.utils.async_utils import BoundedThreadRunner
+
+
+class AsyncSimpleStorageService:
+    """
+    This class is the asyncio counterpart of SimpleStorageService for the serving process. Every operation runs the
+    matching SimpleStorageService method on a bounded thread pool with a per call timeout. The storage service and
+    the runner can be injected, e.g. a SimpleStorageService talking to a local S3 stand-in.
+    """
+
+    def __init__(self, storage: Optional[SimpleStorageService] = None, runner: Optional[BoundedThreadRunner] = None):
+        self.storage = storage or SimpleStorageService()
+        self.runner = runner or BoundedThreadRunner(thread_name_prefix="visa-s3")
+
+    async def s3_key_path_available(self, bucket_name: str, s3_key: str, timeout_seconds: Optional[float] = None) -> bool:
+        return await self.runner.run(self.storage.s3_key_path_available, bucket_name, s3_key,
+                                     timeout_seconds=timeout_seconds)
+
+    async def head_object(self, bucket_name: str, s3_key: str, timeout_seconds: Optional[float] = None) -> dict:
+        return await self.runner.run(self.storage.s3_client.head_object, Bucket=bucket_name, Key=s3_key,
+                                     timeout_seconds=timeout_seconds)
+
+    async def get_file_object(self, filename: str, bucket_name: str,
+                              timeout_seconds: Optional[float] = None) -> Union[List[object], object]:
+        return await self.runner.run(self.storage.get_file_object, filename, bucket_name, timeout_seconds=timeout_seconds)
+
+    async def load_model(self, model_name: str, bucket_name: str, model_dir: str = None,
+                         timeout_seconds: Optional[float] = None) -> object:
+        return await self.runner.run(self.storage.load_model, model_name, bucket_name, model_dir,
+                                     timeout_seconds=timeout_seconds)
+
+    async def upload_file(self, from_filename: str, to_filename: str, bucket_name: str, remove: bool = True,
+                          timeout_seconds: Optional[float] = None) -> None:
+        return await self.runner.run(self.storage.upload_file, from_filename, to_filename, bucket_name, remove,
+                                     timeout_seconds=timeout_seconds)
+
+    async def download_file(self, s3_key: str, to_filename: str, bucket_name: str,
+                            timeout_seconds: Optional[float] = None) -> str:
+        return await self.runner.run(self.storage.download_file, s3_key, to_filename, bucket_name,
+                                     timeout_seconds=timeout_seconds)
+
+    async def read_csv(self, filename: str, bucket_name: str, timeout_seconds: Optional[float] = None) -> DataFrame:
+        return await self.runner.run(self.storage.read_csv, filename, bucket_name, timeout_seconds=timeout_seconds)
+
+    def close(self) -> None:
+        self.runner.shutdown()
@@ -1,22 +1,35 @@
-import boto3, os, sys
+import boto3, os, sys, tempfile
 from Visa_Prediction.configuration.aws_connection import S3Client
+from Visa_Prediction.constants import S3_MULTIPART_THRESHOLD, S3_MULTIPART_CHUNKSIZE, S3_MAX_CONCURRENCY
 from io import StringIO
-from typing import Union, List
+from typing import Union, List, Optional
+from boto3.s3.transfer import TransferConfig
 from Visa_Prediction.logger import logging
 from Visa_Prediction.exception import visaException
 from pandas import DataFrame, read_csv  
 from mypy_boto3_s3.service_resource import Bucket
 from botocore.exceptions import BotoCoreError, ClientError
-import pickle
+from Visa_Prediction.utils.main_utils import load_object
+from Visa_Prediction.utils.instrumentation import instrumentation, file_size
 
 from dotenv import load_dotenv
 load_dotenv()
 
 class SimpleStorageService:
-    def __init__(self):
+    def __init__(self, transfer_config: Optional[TransferConfig] = None):
+        """
+        transfer_config: multipart settings of uploads and downloads, objects above the multipart threshold are
+        transferred in chunks of multipart_chunksize with max_concurrency parallel requests
+        """
         s3_client = S3Client()
         self.s3_client = s3_client.s3_client
         self.s3_resource = s3_client.s3_resource
+        self.transfer_config = transfer_config or TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD,
+            multipart_chunksize=S3_MULTIPART_CHUNKSIZE,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=True,
+        )
 
     def s3_key_path_available(self, bucket_name: str, s3_key: str) -> bool:
         try:
@@ -87,10 +100,13 @@ class SimpleStorageService:
         except Exception as e:
             raise visaException(e, sys) from e
 
+    @instrumentation.instrument()
     def load_model(self, model_name: str, bucket_name: str, model_dir: str = None) -> object:
         """
         Method Name :   load_model
-        Description :   This method loads the model_name model from bucket_name bucket with kwargs
+        Description :   This method downloads the model_name model from bucket_name bucket to a temporary file and
+                        loads it from there, so model bundles get their arrays memory mapped instead of the whole
+                        object being read into memory and unpickled
 
         Output      :   list of objects or object is returned based on filename
         On Failure  :   Write an exception log and then raise an exception
@@ -107,9 +123,11 @@ class SimpleStorageService:
                 else model_dir + "/" + model_name
             )
             model_file = func()
-            file_object = self.get_file_object(model_file, bucket_name)
-            model_obj = self.read_object(file_object, decode=False)
-            model = pickle.loads(model_obj)
+            with tempfile.TemporaryDirectory(prefix="visa_model_") as tmp_dir:
+                local_file_path = os.path.join(tmp_dir, os.path.basename(model_file))
+                self.download_file(model_file, local_file_path, bucket_name)
+                # the memory maps of a bundle stay valid after the temporary file is removed
+                model = load_object(local_file_path)
             logging.info("Exited the load_model method of S3Operations class")
             return model
 
@@ -140,6 +158,7 @@ class SimpleStorageService:
                 pass
             logging.info("Exited the create_folder method of S3Operations class")
 
+    @instrumentation.instrument()
     def upload_file(self, from_filename: str, to_filename: str,  bucket_name: str,  remove: bool = True):
         """
         Method Name :   upload_file
@@ -158,8 +177,9 @@ class SimpleStorageService:
                 f"Uploading {from_filename} file to {to_filename} file in {bucket_name} bucket"
             )
 
+            instrumentation.add_bytes(file_size(from_filename))
             self.s3_resource.meta.client.upload_file(
-                from_filename, bucket_name, to_filename
+                from_filename, bucket_name, to_filename, Config=self.transfer_config
             )
 
             logging.info(
@@ -179,6 +199,35 @@ class SimpleStorageService:
         except Exception as e:
             raise visaException(e, sys) from e
 
+    @instrumentation.instrument(nbytes = lambda result, arguments: file_size(result))
+    def download_file(self, s3_key: str, to_filename: str, bucket_name: str) -> str:
+        """
+        Method Name :   download_file
+        Description :   This method downloads the s3_key object of bucket_name bucket to to_filename, large objects
+                        are fetched with parallel ranged requests. The object is written to a temporary file which
+                        is moved in place once complete
+
+        Output      :   Path of the downloaded file
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        logging.info("Entered the download_file method of S3Operations class")
+
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(to_filename)), exist_ok=True)
+            tmp_filename = f"{to_filename}.tmp{os.getpid()}"
+            try:
+                self.s3_client.download_file(bucket_name, s3_key, tmp_filename, Config=self.transfer_config)
+                os.replace(tmp_filename, to_filename)
+            finally:
+                if os.path.exists(tmp_filename):
+                    os.remove(tmp_filename)
+
+            logging.info("Exited the download_file method of S3Operations class")
+            return to_filename
+
+        except Exception as e:
+            raise visaException(e, sys) from e
+
     def upload_df_as_csv(self,data_frame: DataFrame,local_filename: str, bucket_filename: str,bucket_name: str,) -> None:
         """
         Method Name :   upload_df_as_csv
@@ -216,13 +265,14 @@ class SimpleStorageService:
         logging.info("Entered the get_df_from_object method of S3Operations class")
 
         try:
-            content = self.read_object(object_, make_readable=True)
-            df = read_csv(content, na_values="na")
+            # the streaming body is parsed as it is read, without holding the bytes and the decoded text in memory
+            df = read_csv(object_.get()["Body"], na_values="na")
             logging.info("Exited the get_df_from_object method of S3Operations class")
             return df
         except Exception as e:
             raise visaException(e, sys) from e
 
+    @instrumentation.instrument(rows = lambda result, arguments: len(result))
     def read_csv(self, filename: str, bucket_name: str) -> DataFrame:
         """
         Method Name :   get_df_from_object
@@ -238,7 +288,13 @@ class SimpleStorageService:
 
         try:
             csv_obj = self.get_file_object(filename, bucket_name)
-            df = self.get_df_from_object(csv_obj)
+            if csv_obj.size >= self.transfer_config.multipart_threshold:
+                # large files are downloaded with parallel ranged requests and parsed from a memory mapped file
+                with tempfile.TemporaryDirectory(prefix="visa_csv_") as tmp_dir:
+                    local_filename = self.download_file(filename, os.path.join(tmp_dir, os.path.basename(filename)), bucket_name)
+                    df = read_csv(local_filename, na_values="na", memory_map=True)
+            else:
+                df = self.get_df_from_object(csv_obj)
             logging.info("Exited the read_csv method of S3Operations class")
             return df
         except Exception as e:
@@ -0,0 +1,157 @@
+import fcntl
+import hashlib
+import os
+import sys
+from contextlib import contextmanager
+from typing import Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from Visa_Prediction.constants import MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation, file_size
+
+
+class ModelCache:
+    """
+    This class keeps downloaded model files on local disk, keyed by bucket, key and ETag, so that a process only
+    downloads a model when the object in S3 changed. Every lookup costs one HEAD request, processes which miss at
+    the same time wait on a file lock for the first one to finish the download, finished files are moved in place
+    atomically and the least recently used versions are evicted once the cache is larger than max_bytes.
+    Files are laid out as <cache_dir>/<sha256(bucket/key)>/<etag>.model
+    """
+
+    MODEL_SUFFIX = ".model"
+
+    def __init__(self, s3_client, cache_dir: str = MODEL_CACHE_DIR, max_bytes: int = MODEL_CACHE_MAX_BYTES):
+        self.s3_client = s3_client
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def head(self, bucket_name: str, key: str) -> Optional[dict]:
+        """
+        Returns the HEAD response of the object, None when it does not exist.
+        """
+        try:
+            return self.s3_client.head_object(Bucket=bucket_name, Key=key)
+        except ClientError as e:
+            if e.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+    @classmethod
+    def etag_of(cls, file_path: str) -> str:
+        """
+        Returns the ETag of a file returned by get_model_file.
+        """
+        return os.path.basename(file_path)[:-len(cls.MODEL_SUFFIX)]
+
+    def _key_dir(self, bucket_name: str, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(f"{bucket_name}/{key}".encode()).hexdigest()[:32])
+
+    @staticmethod
+    @contextmanager
+    def _file_lock(lock_file_path: str):
+        with open(lock_file_path, "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    @instrumentation.instrument(name = "model_cache.download", nbytes = lambda result, arguments: file_size(arguments["file_path"]))
+    def _download(self, bucket_name: str, key: str, etag: str, file_path: str, chunk_size: int = 8 * 1024 * 1024) -> None:
+        """
+        Streams the object to file_path with a GET conditional on the ETag seen by the HEAD request, so a model
+        replaced in between fails the download instead of being stored under the wrong ETag.
+        """
+        try:
+            body = self.s3_client.get_object(Bucket=bucket_name, Key=key, IfMatch=etag)["Body"]
+            with open(file_path, "wb") as file_obj:
+                for chunk in body.iter_chunks(chunk_size=chunk_size):
+                    file_obj.write(chunk)
+        except BaseException:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+            raise
+
+    def _latest_cached_file(self, key_dir: str) -> Optional[str]:
+        if not os.path.isdir(key_dir):
+            return None
+        files = [os.path.join(key_dir, name) for name in os.listdir(key_dir) if name.endswith(self.MODEL_SUFFIX)]
+        return max(files, key=os.path.getmtime) if files else None
+
+    def get_model_file(self, bucket_name: str, key: str) -> str:
+        """
+        Returns the local path of the current version of the object, downloading it when it is not cached yet.
+        When S3 can not be reached the most recently used cached version of the object is returned.
+        """
+        try:
+            key_dir = self._key_dir(bucket_name, key)
+            try:
+                head = self.head(bucket_name, key)
+            except (BotoCoreError, ClientError) as e:
+                cached_file_path = self._latest_cached_file(key_dir)
+                if cached_file_path is None:
+                    raise
+                logging.info(f"Could not revalidate s3://{bucket_name}/{key} ({e}), using cached {cached_file_path}")
+                return cached_file_path
+            if head is None:
+                raise FileNotFoundError(f"s3://{bucket_name}/{key} does not exist")
+
+            etag = head["ETag"].strip('"')
+            file_path = os.path.join(key_dir, f"{etag}{self.MODEL_SUFFIX}")
+            if not os.path.exists(file_path):
+                os.makedirs(key_dir, exist_ok=True)
+                with self._file_lock(os.path.join(key_dir, f"{etag}.lock")):
+                    # another process may have finished the download while this one waited for the lock
+                    if not os.path.exists(file_path):
+                        tmp_file_path = f"{file_path}.tmp{os.getpid()}"
+                        logging.info(f"Model cache miss, downloading s3://{bucket_name}/{key} with ETag {etag}")
+                        self._download(bucket_name, key, head["ETag"], tmp_file_path)
+                        os.replace(tmp_file_path, file_path)
+                    else:
+                        logging.info(f"Model s3://{bucket_name}/{key} with ETag {etag} was downloaded by another process")
+            else:
+                logging.info(f"Model cache hit for s3://{bucket_name}/{key} with ETag {etag}")
+            os.utime(file_path)
+            self.evict(keep=file_path)
+            return file_path
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """
+        Removes the least recently used model files until the cache fits in max_bytes, never removing keep.
+        Processes which already loaded a removed file keep their memory maps of it.
+        """
+        try:
+            files = []
+            for root, _, names in os.walk(self.cache_dir):
+                for name in names:
+                    if not name.endswith(self.MODEL_SUFFIX):
+                        continue
+                    file_path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, file_path))
+            files.sort()
+            total_bytes = sum(size for _, size, _ in files)
+            for _, size, file_path in files:
+                if total_bytes <= self.max_bytes:
+                    break
+                if keep is not None and os.path.abspath(file_path) == os.path.abspath(keep):
+                    continue
+                total_bytes -= size
+                for evicted_path in (file_path, file_path[:-len(self.MODEL_SUFFIX)] + ".lock"):
+                    try:
+                        os.remove(evicted_path)
+                    except FileNotFoundError:
+                        # evicted by another process in the meantime
+                        pass
+                logging.info(f"Evicted {file_path} from the model cache")
+        except Exception as e:
+            raise visaException(e, sys) from e
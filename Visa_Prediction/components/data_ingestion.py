@@ -1,6 +1,9 @@
 import os
 import sys
 
+import pyarrow as pa
+import pyarrow.parquet as pq
+from bson import ObjectId
 from pandas import DataFrame
 from sklearn.model_selection import train_test_split
 
@@ -8,7 +11,11 @@ from Visa_Prediction.entity.config_entity import DataIngestionConfig
 from Visa_Prediction.entity.artifact_entity  import DataIngestionArtifact
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation
 from Visa_Prediction.data_access.visa_data import VisaData
+from Visa_Prediction.constants import SCHEMA_FILE_PATH
+from Visa_Prediction.utils.main_utils import read_yaml_file, write_yaml_file, save_dataframe
+from Visa_Prediction.utils.artifact_cache import artifact_cache
 
 class DataIngestion:
     def __init__(self, data_ingestion_config: DataIngestionConfig = DataIngestionConfig()):
@@ -17,9 +24,105 @@ class DataIngestion:
         """
         try:
             self.data_ingestion_config = data_ingestion_config
+            self._schema_config = artifact_cache.read_yaml(file_path = SCHEMA_FILE_PATH)
         except Exception as e:
             raise visaException(e, sys)
         
+    def read_high_water_mark(self) -> dict:
+        """
+        Reads the high water mark of the persistent feature store, an empty dict when the store has not been
+        built yet or was built from another collection.
+        """
+        try:
+            high_water_mark_file_path = self.data_ingestion_config.high_water_mark_file_path
+            if not os.path.exists(high_water_mark_file_path):
+                return {}
+            high_water_mark = read_yaml_file(file_path = high_water_mark_file_path) or {}
+            if high_water_mark.get("collection_name") != self.data_ingestion_config.collection_name:
+                logging.info("High water mark belongs to another collection, ignoring it")
+                return {}
+            return high_water_mark
+        except Exception as e:
+            raise visaException(e, sys)
+
+    def write_high_water_mark(self, last_id, partitions: list, n_rows: int) -> None:
+        """
+        Persists the high water mark, written after the new partition so that a failed run never points past the
+        rows which are actually in the store.
+        """
+        try:
+            write_yaml_file(
+                file_path = self.data_ingestion_config.high_water_mark_file_path,
+                content = {
+                    "collection_name": self.data_ingestion_config.collection_name,
+                    "last_id": str(last_id) if isinstance(last_id, ObjectId) else last_id,
+                    "last_id_is_object_id": isinstance(last_id, ObjectId),
+                    "partitions": partitions,
+                    "n_rows": n_rows
+                },
+                replace = True
+            )
+        except Exception as e:
+            raise visaException(e, sys)
+
+    def export_incremental_data(self, visa_data: VisaData) -> DataFrame:
+        """
+        Fetches only the documents above the high water mark, appends them as a new partition of the persistent
+        feature store and returns the whole store. Without a high water mark, or when incremental ingestion is off,
+        the whole collection is exported and the store is rebuilt from it.
+        """
+        try:
+            collection_name = self.data_ingestion_config.collection_name
+            store_dir = self.data_ingestion_config.persistent_feature_store_dir
+            high_water_mark = self.read_high_water_mark() if self.data_ingestion_config.incremental else {}
+            partitions = list(high_water_mark.get("partitions", []))
+            n_rows = high_water_mark.get("n_rows", 0)
+
+            last_id = high_water_mark.get("last_id")
+            if last_id is not None and high_water_mark.get("last_id_is_object_id"):
+                last_id = ObjectId(last_id)
+
+            # snapshot the upper bound first so that documents inserted during the export are left for the next run
+            upper_id = visa_data.get_last_id(collection_name)
+            if upper_id is None or (last_id is not None and upper_id <= last_id):
+                logging.info(f"No new documents in {collection_name} above the high water mark {last_id}")
+            else:
+                id_range = {"$lte": upper_id}
+                if last_id is not None:
+                    id_range["$gt"] = last_id
+                    logging.info(f"Fetching the documents of {collection_name} above the high water mark {last_id}")
+                else:
+                    logging.info(f"No high water mark found, exporting the whole {collection_name} collection")
+                    partitions = []
+                    n_rows = 0
+
+                table = visa_data.export_collection_as_table(
+                    collection_name = collection_name,
+                    batch_size = self.data_ingestion_config.mongo_batch_size,
+                    num_workers = self.data_ingestion_config.num_workers,
+                    query = {"_id": id_range}
+                )
+
+                os.makedirs(store_dir, exist_ok = True)
+                if last_id is None:
+                    for file_name in os.listdir(store_dir):
+                        if file_name.startswith("part-"):
+                            os.remove(os.path.join(store_dir, file_name))
+                if table.num_rows > 0:
+                    partition_name = f"part-{len(partitions):05d}.parquet"
+                    pq.write_table(table, os.path.join(store_dir, partition_name))
+                    partitions.append(partition_name)
+                    n_rows += table.num_rows
+                    logging.info(f"Appended {table.num_rows} new rows to the feature store as {partition_name}")
+                self.write_high_water_mark(last_id = upper_id, partitions = partitions, n_rows = n_rows)
+
+            if not partitions:
+                return DataFrame(columns = list(visa_data.column_types))
+            tables = [pq.read_table(os.path.join(store_dir, partition_name)) for partition_name in partitions]
+            return pa.concat_tables(tables, promote_options = "permissive").to_pandas()
+        except Exception as e:
+            raise visaException(e, sys)
+
     def export_data_into_feature_store(self) -> DataFrame:
         """
         Export data from MongoDB to feature store.
@@ -27,14 +130,14 @@ class DataIngestion:
         try:
             logging.info("Exporting the data from MongoDB to feature store")
             visa_data = VisaData()
-            dataframe = visa_data.export_collection_as_dataframe(collection_name = self.data_ingestion_config.collection_name)
+            dataframe = self.export_incremental_data(visa_data)
             
             logging.info(f"Shape of the dataframe: {dataframe.shape}")
             feature_store_file_path = self.data_ingestion_config.feature_store_file_path
             dir_path =os.path.dirname(feature_store_file_path)
             os.makedirs(dir_path, exist_ok = True)
             logging.info(f"Saving the exported data into feature store file path: {feature_store_file_path}")
-            dataframe.to_csv(feature_store_file_path, index =False, header =True)
+            save_dataframe(feature_store_file_path, dataframe, category_columns = self._schema_config["categorical_columns"])
             return dataframe
         
         except Exception as e:
@@ -47,20 +150,26 @@ class DataIngestion:
         logging.info("Starting to split the data into train and test sets")
 
         try:
-            train_set, test_set = train_test_split(dataframe, test_size = self.data_ingestion_config.train_test_split_ratio)
+            train_set, test_set = train_test_split(
+                dataframe,
+                test_size = self.data_ingestion_config.train_test_split_ratio,
+                random_state = self.data_ingestion_config.random_state
+            )
             logging.info("Performed the train test split successfully")
 
             dir_path = os.path.dirname(self.data_ingestion_config.training_file_path)
             os.makedirs(dir_path, exist_ok = True)
 
             logging.info(f"Exporting the train and test file path")
-            train_set.to_csv(self.data_ingestion_config.training_file_path, index = False, header = True)
-            test_set.to_csv(self.data_ingestion_config.testing_file_path, index = False, header = True)
+            category_columns = self._schema_config["categorical_columns"]
+            save_dataframe(self.data_ingestion_config.training_file_path, train_set, category_columns = category_columns)
+            save_dataframe(self.data_ingestion_config.testing_file_path, test_set, category_columns = category_columns)
             logging.info("Exported the train and test file path successfully")
 
         except Exception as e:
             raise visaException(e, sys)
         
+    @instrumentation.instrument(name = "data_ingestion", log = True)
     def initiate_data_ingestion(self) -> DataIngestionArtifact:
         """
         Initiates the data ingestion components of training pipeline
@@ -68,6 +177,7 @@ class DataIngestion:
         logging.info("Starting the data ingestion component")
         try:
             dataframe = self.export_data_into_feature_store()
+            instrumentation.add_rows(len(dataframe))
 
             logging.info("Data from MongoDB exported to feature store successfully")
 
@@ -1,9 +1,11 @@
 import sys
 import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
 
 import numpy as np
 import pandas as pd
-from imblearn.combine import SMOTEENN
+from scipy import sparse
 from sklearn.pipeline import Pipeline
 from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder, PowerTransformer
 from sklearn.compose import ColumnTransformer
@@ -11,49 +13,76 @@ from sklearn.compose import ColumnTransformer
 from Visa_Prediction.constants import TARGET_COLUMN, SCHEMA_FILE_PATH, CURRENT_YEAR
 from Visa_Prediction.entity.config_entity import DataTransformationConfig
 from Visa_Prediction.entity.artifact_entity import DataIngestionArtifact, DataTransformationArtifact, DataValidationArtifact
-from Visa_Prediction.utils.main_utils import save_object, save_numpy_array_data, read_yaml_file, write_yaml_file, drop_columns
+from Visa_Prediction.utils.main_utils import (save_object, save_numpy_array_data, drop_columns, write_yaml_file,
+                                              iter_dataframe_batches, count_dataframe_rows, open_numpy_array_memmap)
+from Visa_Prediction.utils.artifact_cache import artifact_cache
+from Visa_Prediction.utils.drift_utils import DatasetSketch, sketch_chunks
+from Visa_Prediction.utils.resampling import Resampler, ResamplingResult, get_resampler
+from Visa_Prediction.utils.streaming_fit import StreamingPreprocessorFit
+from Visa_Prediction.utils.feature_matrix import (check_feature_layout, feature_matrix_file_path, to_feature_matrix,
+                                                  save_feature_matrix)
 from Visa_Prediction.entity.estimator import TargetValueMapping
 
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation
 
 class DataTransformation:
     def __init__(self, 
                  data_ingestion_artifact: DataIngestionArtifact,
                  data_transformation_config: DataTransformationConfig,
-                 data_validation_artifact: DataValidationArtifact):
+                 data_validation_artifact: Optional[DataValidationArtifact]):
         """
         This class will initialise the Data Ingestion artifact, Data Validation artifact and Data Transformation artifact.
+        The data validation artifact is None when the validation runs concurrently, its status is then checked downstream.
         """
         try:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_transformation_config = data_transformation_config 
             self.data_validation_artifact = data_validation_artifact
-            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self._schema_config = artifact_cache.read_yaml(file_path=SCHEMA_FILE_PATH)
+            check_feature_layout(self.data_transformation_config.feature_layout)
 
         except Exception as e:
             raise visaException(e, sys) from e
         
     @staticmethod
-    def read_data(file_path) -> pd.DataFrame:
+    def read_data(file_path, columns = None) -> pd.DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return artifact_cache.read_dataframe(file_path, columns = columns)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def get_input_columns(self) -> list:
+        """
+        This function returns the raw columns which are used by the transformation, the ones which are dropped are never read.
+        """
+        try:
+            feature_columns = (self._schema_config['oh_columns'] + self._schema_config['or_columns'] +
+                               self._schema_config['num_features'] + ['yr_of_estab', TARGET_COLUMN])
+            return [column for column in dict.fromkeys(feature_columns) if column != 'company_age']
         except Exception as e:
             raise visaException(e, sys) from e
         
-    def get_data_transformer_object(self) -> Pipeline:
+    def get_data_transformer_object(self, categories: Optional[Dict[str, list]] = None) -> Pipeline:
         """
         This function will create and return a data transformer object for the data.
+        categories: vocabulary of every categorical column, the encoders learn the categories from the data when not given
         """
         try:
             logging.info("Got numerical columns from the schema config")
 
-            numeric_transformer = StandardScaler()
-            oh_transformer = OneHotEncoder()
-            ordinal_encoder = OrdinalEncoder()
-
             oh_columns = self._schema_config['oh_columns']
             or_columns = self._schema_config['or_columns']
+
+            numeric_transformer = StandardScaler()
+            if categories is None:
+                oh_transformer = OneHotEncoder()
+                ordinal_encoder = OrdinalEncoder()
+            else:
+                oh_transformer = OneHotEncoder(categories = [categories[column] for column in oh_columns])
+                ordinal_encoder = OrdinalEncoder(categories = [categories[column] for column in or_columns])
+
             transform_columns = self._schema_config['transform_columns']
             num_features = self._schema_config['num_features']
 
@@ -77,65 +106,281 @@ class DataTransformation:
         except Exception as e:
             raise visaException(e, sys) from e
         
-    def initiate_data_transformation(self, ) -> DataTransformationArtifact:
+    def get_resampler(self) -> Resampler:
         """
-        This function will initiate the data transformation process. 
+        This function returns the resampler of the configured resampling strategy.
         """
         try:
-            if self.data_validation_artifact.validation_status:
-                logging.info("Staarting the Data Transformation component")
-                preprocessor = self.get_data_transformer_object()
+            config = self.data_transformation_config
+            return get_resampler(config.resampling_strategy,
+                                 n_jobs = config.resampling_n_jobs,
+                                 neighbors_algorithm = config.resampling_neighbors_algorithm,
+                                 approximate_neighbors = config.resampling_approximate_neighbors,
+                                 max_chunk_bytes = config.resampling_max_chunk_bytes)
+        except Exception as e:
+            raise visaException(e, sys) from e
 
-                train_df = DataTransformation.read_data(file_path = self.data_ingestion_artifact.train_file_path)
-                test_df = DataTransformation.read_data(file_path = self.data_ingestion_artifact.test_file_path)
+    def get_reference_sketch(self, input_feature_df: pd.DataFrame) -> DatasetSketch:
+        """
+        This function sketches the model input features of the training data, the sketch is the reference which the
+        live prediction traffic is compared against by the drift monitor.
+        """
+        try:
+            return sketch_chunks([input_feature_df],
+                                 numerical_columns = self._schema_config['num_features'],
+                                 categorical_columns = self._schema_config['oh_columns'] + self._schema_config['or_columns'])
+        except Exception as e:
+            raise visaException(e, sys) from e
 
-                input_feature_train_df = train_df.drop(columns = [TARGET_COLUMN], axis = 1)
-                target_feature_train_df = train_df[TARGET_COLUMN]
+    def prepare_features(self, df: pd.DataFrame) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        This function splits the raw columns into the input features, with company_age in place of the dropped
+        columns, and the target mapped to its numerical values.
+        """
+        try:
+            input_feature_df = df.drop(columns = [TARGET_COLUMN], axis = 1)
+            # the target is read as a Categorical, map relabels its categories instead of replacing every row
+            target_feature_df = df[TARGET_COLUMN].map(TargetValueMapping()._asdict())
 
-                logging.info("Got the preprocessed object, input features and target feature from the training dataframe")
+            input_feature_df['company_age'] = CURRENT_YEAR - input_feature_df['yr_of_estab']
 
-                input_feature_train_df['company_age'] = CURRENT_YEAR - input_feature_train_df['yr_of_estab']
-                
-                drop_cols = self._schema_config['drop_columns']
+            drop_cols = [col for col in self._schema_config['drop_columns'] if col in input_feature_df.columns]
 
-                input_feature_train_df = drop_columns(df = input_feature_train_df, cols = drop_cols)
+            return drop_columns(df = input_feature_df, cols = drop_cols), target_feature_df
+        except Exception as e:
+            raise visaException(e, sys) from e
 
-                target_feature_train_df = target_feature_train_df.replace(TargetValueMapping()._asdict())
+    def iter_feature_batches(self, file_path: str):
+        """
+        This function reads the file one batch of streaming_batch_rows rows at a time and yields the prepared input
+        features and target of every batch.
+        """
+        for batch_df in iter_dataframe_batches(file_path, columns = self.get_input_columns(),
+                                               batch_rows = self.data_transformation_config.streaming_batch_rows):
+            yield self.prepare_features(batch_df)
 
-                input_feature_test_df = test_df.drop(columns=[TARGET_COLUMN], axis=1)
-                target_feature_test_df = test_df[TARGET_COLUMN]
+    def fit_preprocessor_streaming(self, file_path: str) -> Tuple[object, DatasetSketch]:
+        """
+        This function fits the preprocessor in one chunked pass over the training file, the Yeo-Johnson lambdas are
+        estimated on a reservoir sample of streaming_sample_rows rows and all the other statistics are exact.
+        It returns the fitted preprocessor and an empty reference sketch whose bin edges are taken from the sample.
+        """
+        try:
+            streaming_fit = StreamingPreprocessorFit(oh_columns = self._schema_config['oh_columns'],
+                                                     or_columns = self._schema_config['or_columns'],
+                                                     num_features = self._schema_config['num_features'],
+                                                     sample_rows = self.data_transformation_config.streaming_sample_rows,
+                                                     random_state = 42)
+            for input_feature_df, _ in self.iter_feature_batches(file_path):
+                streaming_fit.partial_fit(input_feature_df)
 
-                input_feature_test_df['company_age'] = CURRENT_YEAR - input_feature_test_df['yr_of_estab']
+            preprocessor = streaming_fit.finalize(self.get_data_transformer_object(categories = streaming_fit.categories()))
+            reference_sketch = DatasetSketch.from_reference(streaming_fit.reservoir.sample,
+                                                            numerical_columns = self._schema_config['num_features'],
+                                                            categorical_columns = self._schema_config['oh_columns'] + self._schema_config['or_columns'])
 
-                input_feature_test_df = drop_columns(df = input_feature_test_df, cols = drop_cols)
+            logging.info(f"Fitted the preprocessor on {streaming_fit.n_rows} rows in streaming mode, "
+                         f"with a sample of {len(streaming_fit.reservoir)} rows")
+            return preprocessor, reference_sketch
+        except Exception as e:
+            raise visaException(e, sys) from e
 
-                target_feature_test_df = target_feature_test_df.replace(TargetValueMapping()._asdict())
+    def transform_to_file(self, preprocessor, file_path: str, feature_file_path: str, label_file_path: str,
+                          reference_sketch: Optional[DatasetSketch] = None) -> Tuple[np.memmap, np.memmap]:
+        """
+        This function transforms the file one batch at a time into the memory mapped feature and label arrays saved
+        at the given paths, and adds the input features to reference_sketch when given.
+        """
+        try:
+            n_rows = count_dataframe_rows(file_path)
+            n_features = len(preprocessor.get_feature_names_out())
+            features = open_numpy_array_memmap(feature_file_path, shape = (n_rows, n_features),
+                                               dtype = self.data_transformation_config.feature_dtype)
+            labels = open_numpy_array_memmap(label_file_path, shape = (n_rows, ), dtype = "int8")
+            start = 0
+            for input_feature_df, target_feature_df in self.iter_feature_batches(file_path):
+                if reference_sketch is not None:
+                    reference_sketch.update(input_feature_df)
+                input_feature_arr = preprocessor.transform(input_feature_df)
+                if sparse.issparse(input_feature_arr):
+                    input_feature_arr = input_feature_arr.toarray()
+                stop = start + len(input_feature_df)
+                features[start:stop] = input_feature_arr
+                labels[start:stop] = target_feature_df.to_numpy()
+                start = stop
+            features.flush()
+            labels.flush()
+            return features, labels
+        except Exception as e:
+            raise visaException(e, sys) from e
 
-                logging.info("Got train and test input features and target features")
+    def transform_and_resample(self, preprocessor, input_feature_df: pd.DataFrame, target_feature_df: pd.Series,
+                               resample: bool = True) -> ResamplingResult:
+        """
+        This function transforms the input features with the fitted preprocessor and resamples them with the
+        configured strategy, or keeps the rows as they are when resample is False.
+        """
+        try:
+            input_feature_arr = preprocessor.transform(input_feature_df)
+            resampler = self.get_resampler() if resample else Resampler()
+            return resampler.run(input_feature_arr, target_feature_df.to_numpy())
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def transform_file_and_resample(self, preprocessor, file_path: str, feature_file_path: str, label_file_path: str,
+                                    resample: bool = True,
+                                    reference_sketch: Optional[DatasetSketch] = None) -> Tuple[int, ResamplingResult]:
+        """
+        This function transforms the file one batch at a time into the saved arrays with transform_to_file, then
+        resamples them with the configured strategy, or keeps the rows as they are when resample is False, and saves
+        the result with save_streamed_arrays. It returns the number of rows of the file and the resampling result.
+        """
+        try:
+            input_feature_arr, target_feature_arr = self.transform_to_file(preprocessor, file_path, feature_file_path,
+                                                                           label_file_path, reference_sketch = reference_sketch)
+            resampler = self.get_resampler() if resample else Resampler()
+            resampling = resampler.run(input_feature_arr, target_feature_arr)
+            self.save_streamed_arrays(resampling, input_feature_arr, feature_file_path, label_file_path)
+            return len(target_feature_arr), resampling
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def transform_in_memory(self) -> Tuple[dict, ResamplingResult]:
+        """
+        This function fits the preprocessor on the whole training dataframe, resamples the transformed arrays and
+        saves them with the preprocessor and the reference sketch. It returns the resampling report and the train
+        resampling result.
+        """
+        try:
+            config = self.data_transformation_config
+            preprocessor = self.get_data_transformer_object()
+
+            input_columns = self.get_input_columns()
+            train_df = DataTransformation.read_data(file_path = self.data_ingestion_artifact.train_file_path, columns = input_columns)
+            test_df = DataTransformation.read_data(file_path = self.data_ingestion_artifact.test_file_path, columns = input_columns)
+            instrumentation.add_rows(len(train_df) + len(test_df))
+
+            input_feature_train_df, target_feature_train_df = self.prepare_features(train_df)
+            input_feature_test_df, target_feature_test_df = self.prepare_features(test_df)
+
+            logging.info("Got train and test input features and target features")
+
+            preprocessor.fit(input_feature_train_df)
+
+            # once the preprocessor is fitted the test rows do not depend on the train rows, they are transformed and
+            # resampled on a second thread while this one transforms and resamples the train rows
+            with ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "visa-transform-test") as executor:
+                test_future = executor.submit(self.transform_and_resample, preprocessor, input_feature_test_df,
+                                              target_feature_test_df, config.resample_test)
+                train_resampling = self.transform_and_resample(preprocessor, input_feature_train_df, target_feature_train_df)
+                test_resampling = test_future.result()
+
+            input_feature_train_final, target_feature_train_final = train_resampling.X, train_resampling.y
+            input_feature_test_final, target_feature_test_final = test_resampling.X, test_resampling.y
+            resampling_report = {"train": train_resampling.report}
+            if config.resample_test:
+                resampling_report["test"] = test_resampling.report
+
+            logging.info(f"Applied the {config.resampling_strategy} resampling strategy")
+
+            feature_dtype, feature_layout = config.feature_dtype, config.feature_layout
+
+            save_object(config.transformed_object_file_path, preprocessor)
+            save_object(config.reference_sketch_file_path, self.get_reference_sketch(input_feature_train_df))
+            save_feature_matrix(feature_matrix_file_path(config.transformed_train_file_path, feature_layout),
+                                to_feature_matrix(input_feature_train_final, feature_layout, feature_dtype))
+            save_feature_matrix(feature_matrix_file_path(config.transformed_test_file_path, feature_layout),
+                                to_feature_matrix(input_feature_test_final, feature_layout, feature_dtype))
+            save_numpy_array_data(config.transformed_train_label_file_path, array = target_feature_train_final, dtype = "int8")
+            save_numpy_array_data(config.transformed_test_label_file_path, array = target_feature_test_final, dtype = "int8")
+
+            return resampling_report, train_resampling
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def transform_streaming(self) -> Tuple[dict, ResamplingResult]:
+        """
+        This function fits the preprocessor in a first chunked pass over the training file and transforms the train
+        and test files chunk by chunk into the saved arrays in a second pass, so that neither the raw nor the
+        transformed data is held in memory. Resampling strategies which change the rows still build the resampled
+        arrays in memory, they then replace the streamed ones. It returns the resampling report and the train
+        resampling result.
+        """
+        try:
+            config = self.data_transformation_config
+            preprocessor, reference_sketch = self.fit_preprocessor_streaming(self.data_ingestion_artifact.train_file_path)
 
-                input_feature_train_arr = preprocessor.fit_transform(input_feature_train_df)
+            # the test file only needs the fitted preprocessor, it is transformed and resampled on a second thread
+            # while this one transforms and resamples the train file
+            with ThreadPoolExecutor(max_workers = 1, thread_name_prefix = "visa-transform-test") as executor:
+                test_future = executor.submit(self.transform_file_and_resample, preprocessor,
+                                              self.data_ingestion_artifact.test_file_path, config.transformed_test_file_path,
+                                              config.transformed_test_label_file_path, config.resample_test)
+                n_train_rows, train_resampling = self.transform_file_and_resample(
+                    preprocessor, self.data_ingestion_artifact.train_file_path, config.transformed_train_file_path,
+                    config.transformed_train_label_file_path, reference_sketch = reference_sketch)
+                n_test_rows, test_resampling = test_future.result()
 
-                input_feature_test_arr = preprocessor.transform(input_feature_test_df)
-                
-                smt = SMOTEENN(sampling_strategy = "minority")
-                input_feature_train_final, target_feature_train_final = smt.fit_resample(input_feature_train_arr, target_feature_train_df)
-                input_feature_test_final, target_feature_test_final = smt.fit_resample(input_feature_test_arr, target_feature_test_df)
+            instrumentation.add_rows(n_train_rows + n_test_rows)
+            logging.info(f"Transformed the train and test files in streaming mode and applied the {config.resampling_strategy} resampling strategy")
 
-                logging.info("Applied SMOTEENN to the test dataset")
+            resampling_report = {"train": train_resampling.report}
+            if config.resample_test:
+                resampling_report["test"] = test_resampling.report
 
-                train_arr = np.c_[input_feature_train_final, np.array(target_feature_train_final)]
-                test_arr = np.c_[input_feature_test_final, np.array(target_feature_test_final)]
+            save_object(config.transformed_object_file_path, preprocessor)
+            save_object(config.reference_sketch_file_path, reference_sketch)
 
-                save_object(self.data_transformation_config.transformed_object_file_path, preprocessor)
-                save_numpy_array_data(self.data_transformation_config.transformed_train_file_path, array = train_arr)
-                save_numpy_array_data(self.data_transformation_config.transformed_test_file_path, array = test_arr)
+            return resampling_report, train_resampling
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def save_streamed_arrays(self, resampling: ResamplingResult, streamed_feature_arr: np.memmap, feature_file_path: str, label_file_path: str) -> None:
+        """
+        This function overwrites the streamed arrays with the resampled ones, unless the resampler kept the rows, and
+        replaces the streamed dense feature array by its sparse matrix with the csr feature layout.
+        """
+        try:
+            config = self.data_transformation_config
+            rows_changed = resampling.X is not streamed_feature_arr
+            if rows_changed:
+                save_numpy_array_data(label_file_path, array = resampling.y, dtype = "int8")
+            if config.feature_layout == "csr":
+                save_feature_matrix(feature_matrix_file_path(feature_file_path, config.feature_layout),
+                                    to_feature_matrix(resampling.X, config.feature_layout, config.feature_dtype))
+                os.remove(feature_file_path)
+            elif rows_changed:
+                save_numpy_array_data(feature_file_path, array = resampling.X, dtype = config.feature_dtype)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    @instrumentation.instrument(name = "data_transformation", log = True)
+    def initiate_data_transformation(self, ) -> DataTransformationArtifact:
+        """
+        This function will initiate the data transformation process. 
+        """
+        try:
+            if self.data_validation_artifact is None or self.data_validation_artifact.validation_status:
+                logging.info("Staarting the Data Transformation component")
+                if self.data_transformation_config.streaming_fit:
+                    resampling_report, train_resampling = self.transform_streaming()
+                else:
+                    resampling_report, train_resampling = self.transform_in_memory()
+                write_yaml_file(self.data_transformation_config.resampling_report_file_path, resampling_report)
 
-                logging.info("Saved the transformed object, transformed train and test arrays")
+                logging.info("Saved the transformed object, transformed train and test feature and label arrays")
 
                 data_transformation_artifact = DataTransformationArtifact(
                     transformed_object_file_path = self.data_transformation_config.transformed_object_file_path,
-                    transformed_train_file_path=self.data_transformation_config.transformed_train_file_path,
-                    transformed_test_file_path=self.data_transformation_config.transformed_test_file_path
+                    transformed_train_file_path=feature_matrix_file_path(self.data_transformation_config.transformed_train_file_path,
+                                                                         self.data_transformation_config.feature_layout),
+                    transformed_test_file_path=feature_matrix_file_path(self.data_transformation_config.transformed_test_file_path,
+                                                                        self.data_transformation_config.feature_layout),
+                    transformed_train_label_file_path=self.data_transformation_config.transformed_train_label_file_path,
+                    transformed_test_label_file_path=self.data_transformation_config.transformed_test_label_file_path,
+                    reference_sketch_file_path=self.data_transformation_config.reference_sketch_file_path,
+                    resampling_report_file_path=self.data_transformation_config.resampling_report_file_path,
+                    class_weight=train_resampling.class_weight
                 )
                 return data_transformation_artifact
             else:
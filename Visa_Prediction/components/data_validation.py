@@ -1,15 +1,15 @@
-import json
 import sys
 import os
 
-import pandas as pd
 from pandas import DataFrame
-from evidently.model_profile import Profile
-from evidently.model_profile.sections import DataDriftProfileSection
 
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
-from Visa_Prediction.utils.main_utils import read_yaml_file, write_yaml_file
+from Visa_Prediction.utils.instrumentation import instrumentation
+from Visa_Prediction.utils.main_utils import write_yaml_file
+from Visa_Prediction.utils.artifact_cache import artifact_cache
+from Visa_Prediction.utils.drift_utils import compare_sketches, iter_frame_chunks, sketch_chunks
+from Visa_Prediction.utils.schema_validator import SchemaValidator, SchemaValidationResult
 from Visa_Prediction.entity.artifact_entity import DataValidationArtifact, DataIngestionArtifact
 from Visa_Prediction.entity.config_entity import DataIngestionConfig, DataValidationConfig
 from Visa_Prediction.constants import SCHEMA_FILE_PATH
@@ -22,14 +22,15 @@ class DataValidation:
         try:
             self.data_ingestion_artifact = data_ingestion_artifact
             self.data_validation_config = data_validation_config
-            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            self._schema_config = artifact_cache.read_yaml(file_path=SCHEMA_FILE_PATH)
+            self.schema_validator = SchemaValidator(self._schema_config)
         except Exception as e:
             raise visaException(e, sys)
 
     @staticmethod
     def read_data(file_path) -> DataFrame:
         try:
-            return pd.read_csv(file_path)
+            return artifact_cache.read_dataframe(file_path)
         except Exception as e:
             raise visaException(e, sys)    
     
@@ -71,18 +72,36 @@ class DataValidation:
         except Exception as e:
             raise visaException(e, sys) from e
         
-    def detect_dataset_drift(self, reference_df: DataFrame, current_df: DataFrame) -> bool:
-        """ 
-
+    def validate_rows(self, df: DataFrame) -> SchemaValidationResult:
+        """
+        This function checks the values of every row against the types, domains and ranges of schema.yaml, chunk by chunk.
         """
         try:
-            data_drift_profile = Profile(sections = [DataDriftProfileSection()])
-            data_drift_profile.calculate(reference_df, current_df)
-
-            report = data_drift_profile.json()
-            json_report = json.loads(report)
+            result = self.schema_validator.validate(iter_frame_chunks(df, self.data_validation_config.chunk_rows))
+            logging.info(f"Schema validation: {result.summary()}")
+            return result
+        except Exception as e:
+            raise visaException(e, sys) from e
 
-            write_yaml_file(file_path=self.data_validation_config.drift_report_file_path, content=json_report)
+    def detect_dataset_drift(self, reference_df: DataFrame, current_df: DataFrame) -> bool:
+        """
+        This function sketches both dataframes chunk by chunk, compares the sketches with the KS test and the
+        population stability index for the numerical columns and the chi-square test for the categorical columns,
+        writes the drift report and returns whether the dataset has drifted.
+        """
+        try:
+            config = self.data_validation_config
+            reference_sketch = sketch_chunks(iter_frame_chunks(reference_df, config.chunk_rows),
+                                             numerical_columns=self._schema_config["numerical_columns"],
+                                             categorical_columns=self._schema_config["categorical_columns"],
+                                             n_bins=config.drift_bins, max_categories=config.drift_max_categories)
+            current_sketch = sketch_chunks(iter_frame_chunks(current_df, config.chunk_rows),
+                                           template=reference_sketch)
+            json_report = compare_sketches(reference_sketch, current_sketch,
+                                           p_value_threshold=config.drift_p_value_threshold,
+                                           drift_share_threshold=config.drift_share_threshold)
+
+            write_yaml_file(file_path=config.drift_report_file_path, content=json_report)
 
             n_features = json_report["data_drift"]["data"]["metrics"]["n_features"]
             n_drifted_features = json_report["data_drift"]["data"]["metrics"]["n_drifted_features"]
@@ -96,6 +115,7 @@ class DataValidation:
             raise visaException(e, sys) from e
         
 
+    @instrumentation.instrument(name = "data_validation", log = True)
     def initiate_data_validation(self) -> DataValidationArtifact:
         """
         This function will begin the data validation process. 
@@ -106,6 +126,7 @@ class DataValidation:
             logging.info("Starting data validation")
             train_df, test_df = (DataValidation.read_data(file_path=self.data_ingestion_artifact.train_file_path),
                                  DataValidation.read_data(file_path=self.data_ingestion_artifact.test_file_path))
+            instrumentation.add_rows(len(train_df) + len(test_df))
 
             status = self.validate_number_of_columns(dataframe=train_df)
             logging.info(f"All required columns present in training dataframe: {status}")
@@ -126,6 +147,14 @@ class DataValidation:
             if not status:
                 validation_error_msg += f"columns are missing in test dataframe."
 
+            train_result, test_result = self.validate_rows(df=train_df), self.validate_rows(df=test_df)
+            write_yaml_file(file_path=self.data_validation_config.schema_report_file_path,
+                            content={"train": train_result.summary(), "test": test_result.summary()})
+            if train_result.n_invalid_rows:
+                validation_error_msg += f"{train_result.n_invalid_rows} rows of training dataframe violate the schema."
+            if test_result.n_invalid_rows:
+                validation_error_msg += f"{test_result.n_invalid_rows} rows of test dataframe violate the schema."
+
             validation_status = len(validation_error_msg) == 0
 
             if validation_status:
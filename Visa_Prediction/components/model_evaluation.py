@@ -2,14 +2,15 @@ from Visa_Prediction.entity.config_entity import ModelEvaluationConfig
 from Visa_Prediction.entity.artifact_entity import DataIngestionArtifact,DataValidationArtifact,ModelTrainerArtifact,ModelEvaluationArtifact
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation
 from Visa_Prediction.constants import TARGET_COLUMN, CURRENT_YEAR
 from Visa_Prediction.entity.s3_estimator import visaEstimator
 from Visa_Prediction.entity.estimator import VisaModel, TargetValueMapping
+from Visa_Prediction.utils.artifact_cache import artifact_cache
 
 from sklearn.metrics import f1_score, precision_score, recall_score, accuracy_score
 import sys, os
 import numpy as np
-import pandas as pd
 from typing import Optional
 from dataclasses import dataclass
 
@@ -24,11 +25,17 @@ class EvaluateModelResponse:
     difference: float 
 
 class ModelEvaluation:
-    def __init__(self, model_eval_config: ModelEvaluationConfig, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact):
+    def __init__(self, model_eval_config: ModelEvaluationConfig, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact,
+                 best_model: Optional[visaEstimator] = None):
+        """
+        best_model: production model fetched ahead of the evaluation with prefetch_best_model, it is fetched by the
+        evaluation when not given
+        """
         try: 
             self.model_eval_config = model_eval_config
             self.data_ingestion_artifact = data_ingestion_artifact
             self.model_trainer_artifact = model_trainer_artifact
+            self.best_model = best_model
         except Exception as e:
             raise visaException(e, sys) from e
 
@@ -41,6 +48,8 @@ class ModelEvaluation:
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
+            if self.best_model is not None:
+                return self.best_model
             bucket_name = self.model_eval_config.bucket_name
             model_path=self.model_eval_config.s3_model_key_path
             visa_estimator = visaEstimator(bucket_name = bucket_name,
@@ -52,6 +61,25 @@ class ModelEvaluation:
         except Exception as e:
             raise  visaException(e,sys)
 
+    @staticmethod
+    def prefetch_best_model(model_eval_config: ModelEvaluationConfig) -> Optional[visaEstimator]:
+        """
+        Method Name :   prefetch_best_model
+        Description :   This function downloads and loads the model in production, e.g. while the new model is trained,
+                        so that the evaluation does not wait for it
+
+        Output      :   Returns the model object with its model loaded if available in s3 storage
+        On Failure  :   Write an exception log and then raise an exception
+        """
+        try:
+            best_model = ModelEvaluation(model_eval_config = model_eval_config, data_ingestion_artifact = None,
+                                         model_trainer_artifact = None).get_best_model()
+            if best_model is not None:
+                best_model.get_model()
+            return best_model
+        except Exception as e:
+            raise visaException(e, sys) from e
+
     def evaluate_model(self) -> EvaluateModelResponse:
         """
         Method Name :   evaluate_model
@@ -62,11 +90,13 @@ class ModelEvaluation:
         On Failure  :   Write an exception log and then raise an exception
         """
         try:
-            test_df = pd.read_csv(self.data_ingestion_artifact.test_file_path)
+            test_df = artifact_cache.read_dataframe(self.data_ingestion_artifact.test_file_path)
+            instrumentation.add_rows(len(test_df))
             test_df['company_age'] = CURRENT_YEAR-test_df['yr_of_estab']
 
             x, y = test_df.drop(TARGET_COLUMN, axis=1), test_df[TARGET_COLUMN]
-            y = y.replace(
+            # the target is read as a Categorical, map relabels its categories instead of replacing every row
+            y = y.map(
                 TargetValueMapping()._asdict()
             )
 
@@ -91,6 +121,7 @@ class ModelEvaluation:
         except Exception as e:
             raise visaException(e, sys)
 
+    @instrumentation.instrument(name = "model_evaluation", log = True)
     def initiate_model_evaluation(self) -> ModelEvaluationArtifact:
         """
         Method Name :   initiate_model_evaluation
@@ -1,6 +1,7 @@
 from Visa_Prediction.cloud_storage.aws_storage import SimpleStorageService
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation
 from Visa_Prediction.entity.config_entity import ModelPusherConfig
 from Visa_Prediction.entity.artifact_entity import ModelPusherArtifact, ModelTrainerArtifact, ModelEvaluationArtifact
 from Visa_Prediction.entity.s3_estimator import visaEstimator
@@ -17,6 +18,7 @@ class ModelPusher:
             model_path = model_pusher_config.s3_model_key_path
         )
 
+    @instrumentation.instrument(name = "model_pusher", log = True)
     def initiate_model_pusher(self) -> ModelPusherArtifact:
         try:
             logging.info("Uploading the Artifacts to S3 bucket")
@@ -7,14 +7,16 @@ import pandas as pd
 from pandas import DataFrame
 from sklearn.pipeline import Pipeline
 from sklearn.metrics import accuracy_score, f1_score, precision_score, recall_score
-from neuro_mf import ModelFactory
 
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation
 from Visa_Prediction.utils.main_utils import *
 from Visa_Prediction.entity.config_entity import ModelTrainerConfig
 from Visa_Prediction.entity.artifact_entity import DataTransformationArtifact, ModelTrainerArtifact, ClassificationMetricArtifact
 from Visa_Prediction.entity.estimator import VisaModel
+from Visa_Prediction.utils.model_search import ModelSearch
+from Visa_Prediction.utils.feature_matrix import load_feature_matrix, as_estimator_input, get_feature_layout
 
 class ModelTrainer:
     def __init__(self, data_transformation_artifact: DataTransformationArtifact,
@@ -22,26 +24,25 @@ class ModelTrainer:
         self.data_transformation_artifact = data_transformation_artifact
         self.model_trainer_config = model_trainer_config
 
-    def get_model_object_and_report(self, train: np.array, test: np.array) -> Tuple[object, object]: 
+    def get_model_object_and_report(self, x_train: np.array, y_train: np.array, x_test: np.array, y_test: np.array) -> Tuple[object, object]: 
             """
-            This function uses neuro_mf package to get the best model object and report of that model
+            This function uses the parallel model search to get the best model object and report of that model
             """
             try:
                 logging.info("Getting the best model object and report")
 
-                model_factory = ModelFactory(model_config_path = self.model_trainer_config.model_config_file_path)
+                model_search = ModelSearch(model_config_path = self.model_trainer_config.model_config_file_path)
 
-                x_train, y_train, x_test, y_test = train[:, :-1], train[:, -1], test[:, :-1], test[:, -1]
-
-                best_model_detail = model_factory.get_best_model(
+                best_model_detail = model_search.get_best_model(
                     X = x_train,
                     y = y_train,
-                    base_accuracy = self.model_trainer_config.expected_accuracy
+                    base_accuracy = self.model_trainer_config.expected_accuracy,
+                    class_weight = self.data_transformation_artifact.class_weight
                 )
 
                 model_obj = best_model_detail.best_model
 
-                y_pred = model_obj.predict(x_test)
+                y_pred = model_obj.predict(as_estimator_input(model_obj, x_test))
 
                 accuracy = accuracy_score(y_true = y_test, y_pred = y_pred)
                 f1score = f1_score(y_true = y_test, y_pred = y_pred) 
@@ -59,15 +60,20 @@ class ModelTrainer:
             except Exception as e:
                 raise visaException(e, sys) from e
     
+    @instrumentation.instrument(name = "model_trainer", log = True)
     def initiate_model_trainer(self, ) -> ModelTrainerArtifact:
         """
         This function initiates the model training
         """
         try:
-            train_arr = load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_train_file_path)
-            test_arr = load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_test_file_path)
+            # dense arrays are memory mapped read only, the search workers map the same files and share their pages
+            x_train = load_feature_matrix(file_path = self.data_transformation_artifact.transformed_train_file_path, mmap_mode = "r")
+            y_train = load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_train_label_file_path, mmap_mode = "r")
+            x_test = load_feature_matrix(file_path = self.data_transformation_artifact.transformed_test_file_path, mmap_mode = "r")
+            y_test = load_numpy_array_data(file_path = self.data_transformation_artifact.transformed_test_label_file_path, mmap_mode = "r")
+            instrumentation.add_rows(x_train.shape[0])
 
-            best_model_detail, metric_artifact = self.get_model_object_and_report(train = train_arr, test = test_arr)
+            best_model_detail, metric_artifact = self.get_model_object_and_report(x_train = x_train, y_train = y_train, x_test = x_test, y_test = y_test)
 
             preprocessing_obj = load_object(file_path = self.data_transformation_artifact.transformed_object_file_path)
 
@@ -75,15 +81,22 @@ class ModelTrainer:
                 logging.info("Best model with accuracy above expected accuracy is not found")
                 raise Exception("The best model is not good as per the expected accuracy")              
             
-            visa_model = VisaModel(preprocessing_object = preprocessing_obj, trained_model_object = best_model_detail.best_model)
+            visa_model = VisaModel(preprocessing_object = preprocessing_obj, trained_model_object = best_model_detail.best_model,
+                                   feature_layout = get_feature_layout(x_train), feature_dtype = str(x_train.dtype))
+            visa_model.reference_sketch = load_object(file_path = self.data_transformation_artifact.reference_sketch_file_path)
+            visa_model.compile_preprocessor()
+            # the speedups are timed on this machine, they go in the artifact so that the decision can be audited
+            compiled_model_report = {}
+            visa_model.compile_model(X_sample = x_test, report = compiled_model_report)
 
             logging.info("Created the Visa Model object")
 
-            save_object(self.model_trainer_config.trained_model_file_path, visa_model)
+            save_object(self.model_trainer_config.trained_model_file_path, visa_model, bundle = True)
 
             model_trainer_artifact = ModelTrainerArtifact(
                 trained_model_file_path = self.model_trainer_config.trained_model_file_path,
-                metric_artifact = metric_artifact
+                metric_artifact = metric_artifact,
+                compiled_model_report = compiled_model_report
             )
 
             logging.info(f"Model Trainer Artifact: {model_trainer_artifact}")
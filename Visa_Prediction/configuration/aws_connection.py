@@ -1,6 +1,7 @@
 import boto3
+from botocore.config import Config
 import os
-from Visa_Prediction.constants import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, REGION_NAME
+from Visa_Prediction.constants import AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY, REGION_NAME, S3_MAX_POOL_CONNECTIONS
 from dotenv import load_dotenv
 load_dotenv()
 
@@ -8,10 +9,12 @@ class S3Client:
 
     s3_client=None
     s3_resource = None
-    def __init__(self, region_name=REGION_NAME):
+    def __init__(self, region_name=REGION_NAME, max_pool_connections=S3_MAX_POOL_CONNECTIONS):
         """ 
         This Class gets aws credentials from env_variable and creates an connection with s3 bucket 
-        and raise exception when environment variable is not set
+        and raise exception when environment variable is not set.
+        max_pool_connections sizes the HTTP connection pool shared by the threads using the client, it only
+        applies to the first instance since the client is shared by the whole process
         """
 
         if S3Client.s3_resource==None or S3Client.s3_client==None:
@@ -21,16 +24,19 @@ class S3Client:
                 raise Exception(f"Environment variable: {AWS_ACCESS_KEY_ID} is not not set.")
             if __secret_access_key is None:
                 raise Exception(f"Environment variable: {AWS_SECRET_ACCESS_KEY} is not set.")
-        
+
+            client_config = Config(max_pool_connections=max_pool_connections)
             S3Client.s3_resource = boto3.resource('s3',
                                             aws_access_key_id=__access_key_id,
                                             aws_secret_access_key=__secret_access_key,
-                                            region_name=region_name
+                                            region_name=region_name,
+                                            config=client_config
                                             )
             S3Client.s3_client = boto3.client('s3',
                                         aws_access_key_id=__access_key_id,
                                         aws_secret_access_key=__secret_access_key,
-                                        region_name=region_name
+                                        region_name=region_name,
+                                        config=client_config
                                         )
         self.s3_resource = S3Client.s3_resource
         self.s3_client = S3Client.s3_client
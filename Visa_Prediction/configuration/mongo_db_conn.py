@@ -4,7 +4,7 @@ from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
 
 import os
-from Visa_Prediction.constants import DB_NAME, MONGO_CONNECTION_URL
+from Visa_Prediction.constants import DB_NAME, MONGO_CONNECTION_URL, MONGO_MAX_POOL_SIZE
 import pymongo
 import certifi
 
@@ -23,13 +23,13 @@ class MongoDBClient:
     """
     client = None
 
-    def __init__(self, database_name=DB_NAME) -> None:
+    def __init__(self, database_name=DB_NAME, max_pool_size=MONGO_MAX_POOL_SIZE) -> None:
         try:
             if MongoDBClient.client is None:
                 mongo_db_url = os.getenv("MONGO_CONNECTION_URL")
                 if mongo_db_url is None:
                     raise Exception(f"Environment key: {MONGO_CONNECTION_URL} is not set.")
-                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca)
+                MongoDBClient.client = pymongo.MongoClient(mongo_db_url, tlsCAFile=ca, maxPoolSize=max_pool_size)
             self.client = MongoDBClient.client
             self.database = self.client[database_name]
             self.database_name = database_name
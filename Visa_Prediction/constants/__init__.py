@@ -8,14 +8,15 @@ load_dotenv()
 MONGO_CONNECTION_URL = os.environ.get("MONGO_CONNECTION_URL")
 DB_NAME = os.environ.get("DB_NAME")
 COLLECTION_NAME = os.environ.get("COLLECTION_NAME")
+MONGO_MAX_POOL_SIZE: int = 100
 
 PIPELINE_NAME: str = "visapred"
 ARTIFACT_DIR: str = "artifact"
 
-FILE_NAME = "visadata.csv"
+FILE_NAME = "visadata.parquet"
 
-TRAIN_FILE_NAME: str = "train.csv"
-TEST_FILE_NAME: str = "test.csv"
+TRAIN_FILE_NAME: str = "train.parquet"
+TEST_FILE_NAME: str = "test.parquet"
 
 MODEL_FILE_NAME = "model.pkl"
 
@@ -23,10 +24,28 @@ TARGET_COLUMN = "case_status"
 CURRENT_YEAR = date.today().year
 PREPROCESSING_OBJECT_FILE_NAME = "preprocessing.pkl"
 SCHEMA_FILE_PATH = os.path.join("config", "schema.yaml")
+ARTIFACT_CACHE_MAX_BYTES: int = 512 * 1024 * 1024
+STAGE_CACHE_DIR_NAME: str = "stage_cache"
+STAGE_CACHE_KEEP_PER_STAGE: int = 5
+TRAINING_PIPELINE_DAG_MAX_WORKERS: int = 4
+TRAINING_PIPELINE_DAG_REPORT_FILE_NAME: str = "pipeline_report.yaml"
+TRAINING_PIPELINE_SPECULATIVE_TRANSFORMATION: bool = True
+INSTRUMENTATION_REPORT_FILE_NAME: str = "instrumentation_report.json"
+INSTRUMENTATION_PROFILE_DIR_NAME: str = "profiles"
+# comma separated names of the tracks which are run under cProfile, e.g. data_transformation,model_trainer
+INSTRUMENTATION_PROFILE_TRACKS: tuple = tuple(name for name in os.getenv("VISA_PROFILE_TRACKS", "").split(",") if name)
 
 AWS_ACCESS_KEY_ID = "AWS_ACCESS_KEY_ID"
 AWS_SECRET_ACCESS_KEY = "AWS_SECRET_ACCESS_KEY"
 REGION_NAME = os.environ.get("REGION_NAME")
+S3_MULTIPART_THRESHOLD: int = 64 * 1024 * 1024
+S3_MULTIPART_CHUNKSIZE: int = 16 * 1024 * 1024
+S3_MAX_CONCURRENCY: int = 10
+S3_MAX_POOL_CONNECTIONS: int = 32
+
+ASYNC_IO_MAX_WORKERS: int = 16
+ASYNC_IO_MAX_CONCURRENCY: int = 16
+ASYNC_IO_TIMEOUT_SECONDS: float = 10
 
 """ 
 These are the Data Ingestion related constant vairables and we save all these in this file because if we 
@@ -38,6 +57,11 @@ DATA_INGESTION_DIR_NAME: str = "data_ingestion"
 DATA_INGESTION_FEATURE_STORE_DIR: str = "feature_store"
 DATA_INGESTION_INGESTED_DIR: str = "ingested"
 DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO: float = 0.2
+DATA_INGESTION_MONGO_BATCH_SIZE: int = 10000
+DATA_INGESTION_NUM_WORKERS: int = 4
+DATA_INGESTION_RANDOM_STATE: int = 42
+DATA_INGESTION_INCREMENTAL: bool = True
+DATA_INGESTION_HIGH_WATER_MARK_FILE_NAME: str = "high_water_mark.yaml"
 
 """
 These are the Data Validation related constants.
@@ -45,6 +69,13 @@ These are the Data Validation related constants.
 DATA_VALIDATION_DIR_NAME: str = "data_validation"
 DATA_VALIDATION_DRIFT_REPORT_DIR: str = "drift_report"
 DATA_VALIDATION_DRIFT_REPORT_FILE_NAME: str = "report.yaml"
+DATA_VALIDATION_DRIFT_BINS: int = 20
+DATA_VALIDATION_DRIFT_MAX_CATEGORIES: int = 1000
+DATA_VALIDATION_DRIFT_P_VALUE_THRESHOLD: float = 0.05
+DATA_VALIDATION_DRIFT_SHARE_THRESHOLD: float = 0.5
+DATA_VALIDATION_CHUNK_ROWS: int = 1_000_000
+DATA_VALIDATION_SCHEMA_REPORT_DIR: str = "schema_report"
+DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME: str = "report.yaml"
 
 """ 
 These are Data Transformation related constants.
@@ -52,6 +83,21 @@ These are Data Transformation related constants.
 DATA_TRANSFORMATION_DIR_NAME: str = "data_transformation"
 DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR: str = "transformed"
 DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR: str = "transformed_object"
+DATA_TRANSFORMATION_LABEL_FILE_SUFFIX: str = "_labels"
+DATA_TRANSFORMATION_FEATURE_DTYPE: str = "float64"
+# "dense" or "csr", csr stores the whole matrix as one CSR matrix, the dense numeric columns included
+DATA_TRANSFORMATION_FEATURE_LAYOUT: str = "dense"
+DATA_TRANSFORMATION_REFERENCE_SKETCH_FILE_NAME: str = "reference_sketch.pkl"
+DATA_TRANSFORMATION_RESAMPLING_REPORT_FILE_NAME: str = "resampling_report.yaml"
+DATA_TRANSFORMATION_RESAMPLING_STRATEGY: str = "smoteenn"
+DATA_TRANSFORMATION_RESAMPLE_TEST: bool = True
+DATA_TRANSFORMATION_RESAMPLING_N_JOBS: int = -1
+DATA_TRANSFORMATION_RESAMPLING_NEIGHBORS_ALGORITHM: str = "kd_tree"
+DATA_TRANSFORMATION_RESAMPLING_APPROXIMATE_NEIGHBORS: bool = False
+DATA_TRANSFORMATION_RESAMPLING_MAX_CHUNK_BYTES: int = 256 * 1024 * 1024
+DATA_TRANSFORMATION_STREAMING_FIT: bool = False
+DATA_TRANSFORMATION_STREAMING_BATCH_ROWS: int = 500_000
+DATA_TRANSFORMATION_STREAMING_SAMPLE_ROWS: int = 100_000
 
 """
 These are the Model Trainer related constants.
@@ -68,6 +114,30 @@ These are the Model Evaluation related constants.
 MODEL_EVALUATION_CHANGED_THRESHOLD_SCORE: float = 0.02
 MODEL_BUCKET_NAME = os.getenv("MODEL_BUCKET_NAME")
 MODEL_PUSHER_S3_KEY = "model-registry"
+MODEL_CACHE_DIR: str = os.getenv("MODEL_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "visa_prediction", "models"))
+MODEL_CACHE_MAX_BYTES: int = 2 * 1024 * 1024 * 1024
+
+"""
+These are the Prediction Pipeline related constants.
+"""
+PREDICTION_MAX_BATCH_SIZE: int = 10000
+PREDICTION_MICRO_BATCH_MAX_SIZE: int = 256
+PREDICTION_MICRO_BATCH_MAX_WAIT_MS: float = 5
+PREDICTION_WORKER_THREADS: int = 4
+PREDICTION_MODEL_REFRESH_INTERVAL_SECONDS: float = 60
+PREDICTION_DRIFT_WINDOW_SECONDS: float = 300
+PREDICTION_DRIFT_WINDOWS: int = 12
+PREDICTION_DRIFT_SKETCH_CAPACITY: int = 256
+PREDICTION_DRIFT_REPORT_QUANTILES: tuple = (0.05, 0.25, 0.5, 0.75, 0.95)
+PREDICTION_VALIDATE_INPUTS: bool = True
+PREDICTION_WARMUP_RECORDS: list = [
+    {"continent": "Asia", "education_of_employee": "Master's", "has_job_experience": "Y",
+     "requires_job_training": "N", "no_of_employees": 2412, "yr_of_estab": 2002, "region_of_employment": "Northeast",
+     "prevailing_wage": 83425.65, "unit_of_wage": "Year", "full_time_position": "Y"},
+    {"continent": "Africa", "education_of_employee": "High School", "has_job_experience": "N",
+     "requires_job_training": "Y", "no_of_employees": 44444, "yr_of_estab": 2008, "region_of_employment": "West",
+     "prevailing_wage": 122.996, "unit_of_wage": "Hour", "full_time_position": "Y"},
+]
 
 APP_HOST = "0.0.0.0"
 APP_PORT = 8081
\ No newline at end of file
@@ -0,0 +1,52 @@
+from typing import List, Optional
+
+import pandas as pd
+import pyarrow as pa
+
+from Visa_Prediction.constants import DATA_INGESTION_MONGO_BATCH_SIZE
+from Visa_Prediction.data_access.visa_data import VisaData
+from Visa_Prediction.utils.async_utils import BoundedThreadRunner
+
+
+class AsyncVisaData:
+    """
+    This class is the asyncio counterpart of VisaData for the serving process. Every operation runs on a bounded
+    thread pool with a per call timeout, the concurrency limit of the runner should not exceed the MongoDB
+    connection pool size (MONGO_MAX_POOL_SIZE) so that calls never wait for a connection inside a thread.
+    The VisaData instance and the runner can be injected, e.g. a VisaData backed by a local MongoDB stand-in.
+    """
+
+    def __init__(self, visa_data: Optional[VisaData] = None, runner: Optional[BoundedThreadRunner] = None):
+        self.visa_data = visa_data or VisaData()
+        self.runner = runner or BoundedThreadRunner(thread_name_prefix="visa-mongo")
+
+    async def find(self, collection_name: str, query: dict, limit: int = 0, database_name: Optional[str] = None,
+                   timeout_seconds: Optional[float] = None) -> List[dict]:
+        """
+        Returns the documents matching query, without their _id, e.g. to look up the records of some case_ids.
+        """
+        def find_documents() -> List[dict]:
+            collection = self.visa_data.get_collection(collection_name, database_name)
+            return list(collection.find(query, {"_id": 0}, limit=limit))
+
+        return await self.runner.run(find_documents, timeout_seconds=timeout_seconds)
+
+    async def get_last_id(self, collection_name: str, database_name: Optional[str] = None,
+                          timeout_seconds: Optional[float] = None):
+        return await self.runner.run(self.visa_data.get_last_id, collection_name, database_name,
+                                     timeout_seconds=timeout_seconds)
+
+    async def export_collection_as_table(self, collection_name: str, database_name: Optional[str] = None,
+                                         batch_size: int = DATA_INGESTION_MONGO_BATCH_SIZE, query: Optional[dict] = None,
+                                         timeout_seconds: Optional[float] = None) -> pa.Table:
+        return await self.runner.run(self.visa_data.export_collection_as_table, collection_name, database_name,
+                                     batch_size=batch_size, query=query, timeout_seconds=timeout_seconds)
+
+    async def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str] = None,
+                                             batch_size: int = DATA_INGESTION_MONGO_BATCH_SIZE,
+                                             timeout_seconds: Optional[float] = None) -> pd.DataFrame:
+        return await self.runner.run(self.visa_data.export_collection_as_dataframe, collection_name, database_name,
+                                     batch_size=batch_size, timeout_seconds=timeout_seconds)
+
+    def close(self) -> None:
+        self.runner.shutdown()
@@ -1,11 +1,118 @@
 from Visa_Prediction.configuration.mongo_db_conn import MongoDBClient
-from Visa_Prediction.constants import DB_NAME
+from Visa_Prediction.constants import DB_NAME, SCHEMA_FILE_PATH, DATA_INGESTION_MONGO_BATCH_SIZE
 from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.main_utils import read_yaml_file
+from Visa_Prediction.utils.instrumentation import instrumentation
 import pandas as pd
+import pyarrow as pa
 import os
 import sys
-from typing import Optional 
-import numpy as np 
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional
+
+
+def get_schema_column_types(schema_config: dict) -> Dict[str, str]:
+    """
+    Returns the column name to type mapping of the columns section of schema.yaml.
+    """
+    column_types = {}
+    for column in schema_config["columns"]:
+        column_types.update(column)
+    return column_types
+
+
+def _to_arrow_column(values: List, column_type: str) -> pa.Array:
+    """
+    Converts the values of one column of a batch into a typed Arrow array, "na" values become nulls.
+    """
+    values = [None if value == "na" else value for value in values]
+    array = pa.array(values, from_pandas=True)
+    if column_type == "category":
+        if not pa.types.is_string(array.type):
+            array = array.cast(pa.string())
+    elif not (pa.types.is_integer(array.type) or pa.types.is_floating(array.type)):
+        array = array.cast(pa.float64())
+    return array
+
+
+def iter_collection_batches(collection, column_types: Dict[str, str], batch_size: int = DATA_INGESTION_MONGO_BATCH_SIZE,
+                            query: Optional[dict] = None) -> Iterator[pa.Table]:
+    """
+    Streams the documents of a pymongo (or mongomock) collection as typed Arrow tables of at most batch_size rows.
+    Only the schema columns are projected, so _id and unknown fields never leave the database, and each batch is
+    converted to columns straight away so that memory stays bounded by one batch of documents. Documents are read
+    in _id order so that the exported row order is deterministic.
+    """
+    columns = list(column_types)
+    projection = {column: 1 for column in columns}
+    projection["_id"] = 0
+    cursor = collection.find(query or {}, projection, batch_size=batch_size).sort("_id", 1)
+
+    batch = []
+    for document in cursor:
+        batch.append(document)
+        if len(batch) == batch_size:
+            yield pa.table({column: _to_arrow_column([doc.get(column) for doc in batch], column_types[column])
+                            for column in columns})
+            batch = []
+    if batch:
+        yield pa.table({column: _to_arrow_column([doc.get(column) for doc in batch], column_types[column])
+                        for column in columns})
+
+
+def get_id_partitions(collection, num_partitions: int, query: Optional[dict] = None) -> List[dict]:
+    """
+    Splits the documents matching query into at most num_partitions contiguous _id ranges of about the same number of
+    documents, using the _id index to find the boundaries. Returns one query per range, in _id order.
+    """
+    query = query or {}
+    n_documents = collection.count_documents(query) if query else collection.estimated_document_count()
+    num_partitions = max(1, min(num_partitions, n_documents))
+    boundaries = []
+    for partition in range(1, num_partitions):
+        boundary = list(collection.find(query, {"_id": 1}).sort("_id", 1).skip(partition * n_documents // num_partitions).limit(1))
+        if boundary and (not boundaries or boundary[0]["_id"] > boundaries[-1]):
+            boundaries.append(boundary[0]["_id"])
+
+    queries = []
+    lower = None
+    for upper in boundaries + [None]:
+        id_range = {}
+        if lower is not None:
+            id_range["$gte"] = lower
+        if upper is not None:
+            id_range["$lt"] = upper
+        if not id_range:
+            queries.append(query)
+        elif query:
+            queries.append({"$and": [query, {"_id": id_range}]})
+        else:
+            queries.append({"_id": id_range})
+        lower = upper
+    return queries
+
+
+def _reset_mongo_client() -> None:
+    """
+    Runs in every ingestion worker process so that it opens its own connection pool instead of reusing the forked one.
+    """
+    MongoDBClient.client = None
+
+
+def _export_partition(database_name: Optional[str], collection_name: str, column_types: Dict[str, str],
+                      batch_size: int, query: dict) -> Optional[pa.Table]:
+    """
+    Exports one _id range of the collection in a worker process.
+    """
+    mongo_client = MongoDBClient(database_name=database_name or DB_NAME)
+    collection = mongo_client.database[collection_name]
+    tables = list(iter_collection_batches(collection, column_types, batch_size=batch_size, query=query))
+    if not tables:
+        return None
+    return pa.concat_tables(tables, promote_options="permissive")
+
 
 class VisaData:
     """
@@ -14,24 +121,94 @@ class VisaData:
     def __init__(self):
         try:
             self.mongo_client = MongoDBClient(database_name=DB_NAME)
+            self.column_types = get_schema_column_types(read_yaml_file(file_path=SCHEMA_FILE_PATH))
+            self.export_metrics: Dict[str, float] = {}
         except Exception as e:
             raise visaException(e, sys)
-        
-    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str]=None) -> pd.DataFrame:
+
+    def get_collection(self, collection_name: str, database_name: Optional[str] = None):
+        if database_name is None:
+            return self.mongo_client.database[collection_name]
+        return self.mongo_client.client[database_name][collection_name]
+
+    def get_last_id(self, collection_name: str, database_name: Optional[str] = None):
         """
-        This function exports the specified collection from MongoDB as a pandas DataFrame.
+        Returns the highest _id of the collection, None when the collection is empty.
         """
         try:
-            if database_name is None:
-                collection_name = self.mongo_client.database[collection_name]
+            collection = self.get_collection(collection_name, database_name)
+            last_document = list(collection.find({}, {"_id": 1}).sort("_id", -1).limit(1))
+            return last_document[0]["_id"] if last_document else None
+        except Exception as e:
+            raise visaException(e, sys)
+
+    def _iter_partition_tables(self, collection_name: str, database_name: Optional[str], batch_size: int,
+                               num_workers: int, query: Optional[dict]) -> Iterator[pa.Table]:
+        """
+        Reads the _id partitions of the collection concurrently in worker processes and yields their tables in
+        partition order, so the merged row order does not depend on which worker finishes first.
+        """
+        queries = get_id_partitions(self.get_collection(collection_name, database_name), num_workers, query)
+        logging.info(f"Exporting {collection_name} in {len(queries)} _id range partitions with {num_workers} workers")
+        with ProcessPoolExecutor(max_workers=min(num_workers, len(queries)), initializer=_reset_mongo_client) as executor:
+            futures = [executor.submit(_export_partition, database_name, collection_name, self.column_types,
+                                       batch_size, partition_query) for partition_query in queries]
+            for future in futures:
+                table = future.result()
+                if table is not None:
+                    yield table
+
+    @instrumentation.instrument(rows = lambda result, arguments: result.num_rows, nbytes = lambda result, arguments: result.nbytes)
+    def export_collection_as_table(self, collection_name: str, database_name: Optional[str] = None,
+                                   batch_size: int = DATA_INGESTION_MONGO_BATCH_SIZE,
+                                   num_workers: int = 1, query: Optional[dict] = None) -> pa.Table:
+        """
+        This function streams the documents of the specified collection matching query from MongoDB in batches of
+        batch_size documents and returns them as one Arrow table, logging the progress and throughput of the export.
+        With more than one worker the documents are split into _id ranges which are read concurrently by worker processes.
+        """
+        try:
+            if num_workers > 1:
+                table_iterator = self._iter_partition_tables(collection_name, database_name, batch_size, num_workers, query)
             else:
-                collection_name = self.mongo_client[database_name][collection_name]
+                table_iterator = iter_collection_batches(self.get_collection(collection_name, database_name),
+                                                         self.column_types, batch_size=batch_size, query=query)
+            tables = []
+            n_rows = 0
+            started = time.perf_counter()
+            for table in table_iterator:
+                tables.append(table)
+                n_rows += table.num_rows
+                elapsed = time.perf_counter() - started
+                logging.info(f"Exported {n_rows} documents from {collection_name} "
+                             f"({n_rows / max(elapsed, 1e-9):.0f} documents/s)")
 
-            df = pd.DataFrame(list(collection_name.find()))
-            if "_id" in df.columns.to_list():
-                df = df.drop(columns=["_id"], axis = 1) # Dropping the id column from the DataFrame
-            df.replace({"na":np.nan}, inplace=True)
+            elapsed = time.perf_counter() - started
+            self.export_metrics = {
+                "rows": n_rows,
+                "batches": len(tables),
+                "workers": num_workers,
+                "seconds": elapsed,
+                "rows_per_second": n_rows / max(elapsed, 1e-9),
+            }
+            logging.info(f"Export metrics of {collection_name}: {self.export_metrics}")
 
-            return df
+            if not tables:
+                return pa.table({column: pa.array([], type=pa.string() if column_type == "category" else pa.float64())
+                                 for column, column_type in self.column_types.items()})
+            return pa.concat_tables(tables, promote_options="permissive")
         except Exception as e:
-            raise visaException(e, sys)
\ No newline at end of file
+            raise visaException(e, sys)
+
+    def export_collection_as_dataframe(self, collection_name: str, database_name: Optional[str]=None,
+                                       batch_size: int = DATA_INGESTION_MONGO_BATCH_SIZE,
+                                       num_workers: int = 1) -> pd.DataFrame:
+        """
+        This function exports the specified collection from MongoDB as a pandas DataFrame.
+        """
+        try:
+            table = self.export_collection_as_table(collection_name, database_name, batch_size=batch_size,
+                                                    num_workers=num_workers)
+            return table.to_pandas()
+        except Exception as e:
+            raise visaException(e, sys)
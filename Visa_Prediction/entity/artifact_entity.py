@@ -1,4 +1,5 @@
 from dataclasses import dataclass
+from typing import Optional
 
 @dataclass
 class DataIngestionArtifact:
@@ -16,6 +17,11 @@ class DataTransformationArtifact:
     transformed_object_file_path: str
     transformed_train_file_path: str
     transformed_test_file_path: str
+    transformed_train_label_file_path: str
+    transformed_test_label_file_path: str
+    reference_sketch_file_path: str
+    resampling_report_file_path: str
+    class_weight: Optional[dict] = None
 
 @dataclass 
 class ClassificationMetricArtifact:
@@ -27,6 +33,8 @@ class ClassificationMetricArtifact:
 class ModelTrainerArtifact:
     trained_model_file_path: str
     metric_artifact: ClassificationMetricArtifact
+    # speedup of the compiled predictor per batch size and whether it was kept
+    compiled_model_report: Optional[dict] = None
 
 @dataclass
 class ModelEvaluationArtifact:
@@ -0,0 +1,240 @@
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier, KDTree
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+
+
+class CompiledForest:
+    """
+    This class holds a fitted RandomForestClassifier as flattened node arrays (feature, threshold, children, value)
+    of all the trees and traverses them for a whole batch at once with vectorized NumPy.
+    """
+
+    def __init__(self, feature: np.ndarray, threshold: np.ndarray, children: np.ndarray,
+                 missing_go_to_left: np.ndarray, value: np.ndarray, roots: np.ndarray, max_depth: int,
+                 classes: np.ndarray):
+        self.feature = feature
+        self.threshold = threshold
+        self.children = children
+        self.missing_go_to_left = missing_go_to_left
+        self.value = value
+        self.roots = roots
+        self.max_depth = int(max_depth)
+        self.classes = classes
+
+    @classmethod
+    def from_estimator(cls, model: RandomForestClassifier) -> "CompiledForest":
+        if model.n_outputs_ != 1:
+            raise ValueError("Only single output forests can be compiled")
+
+        feature, threshold, children, missing, value, roots = [], [], [], [], [], []
+        offset, max_depth = 0, 0
+        for estimator in model.estimators_:
+            tree = estimator.tree_
+            node_ids = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+
+            # leaves point to themselves so that extra traversal steps keep samples in place
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(np.where(is_leaf, 0.0, tree.threshold))
+            children.append(np.stack([np.where(is_leaf, node_ids, tree.children_left),
+                                      np.where(is_leaf, node_ids, tree.children_right)], axis=1) + offset)
+            missing.append(np.asarray(getattr(tree, "missing_go_to_left", np.zeros(tree.node_count)), dtype=bool))
+
+            proba = tree.value[:, 0, :model.n_classes_].copy()
+            normalizer = proba.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            proba /= normalizer
+            value.append(proba)
+
+            roots.append(offset)
+            offset += tree.node_count
+            max_depth = max(max_depth, tree.max_depth)
+
+        # sklearn compares float32 features with float64 thresholds, rounding the thresholds down to float32
+        # keeps every comparison identical while letting the traversal stay in float32
+        threshold = np.concatenate(threshold)
+        threshold32 = threshold.astype(np.float32)
+        rounded_up = threshold32.astype(np.float64) > threshold
+        threshold32[rounded_up] = np.nextafter(threshold32[rounded_up], np.float32(-np.inf))
+
+        return cls(feature=np.concatenate(feature).astype(np.intp), threshold=threshold32,
+                   children=np.concatenate(children).ravel().astype(np.intp),
+                   missing_go_to_left=np.concatenate(missing), value=np.concatenate(value),
+                   roots=np.asarray(roots, dtype=np.intp), max_depth=max_depth, classes=np.asarray(model.classes_))
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        X = np.ascontiguousarray(X.toarray() if sparse.issparse(X) else X, dtype=np.float32)
+        n_samples, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n_samples, dtype=np.intp) * n_features)[:, np.newaxis]
+        nodes = np.repeat(self.roots[np.newaxis, :], n_samples, axis=0)
+        check_missing = bool(np.isnan(flat_X).any())
+        for _ in range(self.max_depth):
+            x = flat_X.take(row_offsets + self.feature.take(nodes))
+            if check_missing:
+                # a NaN compares False with the threshold, it takes the side sklearn stored for missing values
+                go_right = np.where(np.isnan(x), ~self.missing_go_to_left.take(nodes), x > self.threshold.take(nodes))
+            else:
+                go_right = x > self.threshold.take(nodes)
+            nodes = self.children.take(2 * nodes + go_right)
+
+        proba = np.zeros((n_samples, self.value.shape[1]), dtype=np.float64)
+        for tree_index in range(nodes.shape[1]):
+            proba += self.value.take(nodes[:, tree_index], axis=0)
+        proba /= nodes.shape[1]
+        return proba
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.classes.take(np.argmax(self.predict_proba(X), axis=1), axis=0)
+
+
+class CompiledKNN:
+    """
+    This class holds a prebuilt neighbour index (a KDTree over the training matrix) of a fitted KNeighborsClassifier
+    together with the encoded labels. The index is queried directly for the whole batch, split across threads for
+    large batches, and the neighbour votes are counted with vectorized NumPy.
+    """
+
+    # batches with at least this many rows are queried in parallel chunks
+    parallel_min_rows: int = 1024
+
+    def __init__(self, fit_X: np.ndarray, fit_y: np.ndarray, classes: np.ndarray, n_neighbors: int, weights: str,
+                 leaf_size: int):
+        self.fit_X = fit_X
+        self.fit_y = fit_y
+        self.classes = classes
+        self.n_neighbors = int(n_neighbors)
+        self.weights = str(weights)
+        self.leaf_size = int(leaf_size)
+        self.index = KDTree(self.fit_X, leaf_size=self.leaf_size)
+
+    @classmethod
+    def from_estimator(cls, model: KNeighborsClassifier) -> "CompiledKNN":
+        if model.effective_metric_ != "euclidean" or model.outputs_2d_:
+            raise ValueError("Only single output KNN models with the euclidean metric can be compiled")
+        if model.weights not in ("uniform", "distance"):
+            raise ValueError("Only uniform and distance weights can be compiled")
+        fit_X = model._fit_X.toarray() if sparse.issparse(model._fit_X) else model._fit_X
+        return cls(fit_X=np.ascontiguousarray(fit_X, dtype=np.float64), fit_y=np.asarray(model._y),
+                   classes=np.asarray(model.classes_), n_neighbors=model.n_neighbors, weights=model.weights,
+                   leaf_size=model.leaf_size)
+
+    def kneighbors(self, X: np.ndarray):
+        n_threads = os.cpu_count() or 1
+        if X.shape[0] < self.parallel_min_rows or n_threads == 1:
+            return self.index.query(X, k=self.n_neighbors)
+        chunks = np.array_split(X, n_threads)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            results = list(executor.map(lambda chunk: self.index.query(chunk, k=self.n_neighbors), chunks))
+        return np.concatenate([dist for dist, _ in results]), np.concatenate([ind for _, ind in results])
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        X = np.asarray(X.toarray() if sparse.issparse(X) else X, dtype=np.float64)
+        dist, ind = self.kneighbors(X)
+        labels = self.fit_y.take(ind)
+        if self.weights == "uniform":
+            weights = np.ones_like(dist)
+        else:
+            with np.errstate(divide="ignore"):
+                weights = 1.0 / dist
+            exact = np.isinf(weights)
+            exact_rows = exact.any(axis=1)
+            weights[exact_rows] = exact[exact_rows]
+        votes = np.stack([(weights * (labels == label)).sum(axis=1) for label in range(len(self.classes))], axis=1)
+        return self.classes.take(np.argmax(votes, axis=1))
+
+
+
+def measure_throughput(predict_fn: Callable, X: np.ndarray, batch_sizes: Sequence[int],
+                       min_seconds: float = 0.2) -> Dict[int, float]:
+    """
+    Measures the rows per second of predict_fn for each of the batch sizes.
+    """
+    throughput = {}
+    for batch_size in batch_sizes:
+        batch = X[np.arange(batch_size) % X.shape[0]]
+        predict_fn(batch)
+        n_calls, started = 0, time.perf_counter()
+        while True:
+            predict_fn(batch)
+            n_calls += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_seconds:
+                break
+        throughput[batch_size] = n_calls * batch_size / elapsed
+    return throughput
+
+
+def with_missing_values(X: np.ndarray, fraction: float = 0.1, random_state: int = 0) -> np.ndarray:
+    """
+    Returns a float64 copy of X with about fraction of its values replaced by NaN.
+    """
+    X = np.array(X, dtype=np.float64)
+    X[np.random.default_rng(random_state).random(X.shape) < fraction] = np.nan
+    return X
+
+
+def compile_model(model: object, X_sample: np.ndarray, batch_sizes: Sequence[int] = (1, 64, 10000),
+                  report: Optional[dict] = None) -> Optional[object]:
+    """
+    Compiles a fitted RandomForestClassifier or KNeighborsClassifier. The compiled model is only returned when it
+    gives the same predictions as the model on X_sample, and for forests also on X_sample with missing values, and
+    is faster than the model at every one of the batch sizes, else None. When given, report is filled with the
+    measured speedup per batch size and the decision, so that it can be audited.
+    """
+    report = report if report is not None else {}
+    report.update(model=type(model).__name__, compiled=False, speedups={})
+    try:
+        if isinstance(model, RandomForestClassifier):
+            compiled = CompiledForest.from_estimator(model)
+        elif isinstance(model, KNeighborsClassifier):
+            compiled = CompiledKNN.from_estimator(model)
+        else:
+            logging.info(f"No compiled predictor available for {type(model).__name__}")
+            report["reason"] = "no compiled predictor"
+            return None
+
+        X_sample = X_sample.toarray() if sparse.issparse(X_sample) else np.asarray(X_sample)
+        if not np.array_equal(compiled.predict(X_sample), model.predict(X_sample)):
+            logging.info(f"Compiled {type(model).__name__} predictions differ from the model, not using it")
+            report["reason"] = "predictions differ"
+            return None
+        if isinstance(compiled, CompiledForest):
+            # missing values take their own branch of the traversal, they are checked on a copy of the sample
+            X_missing = with_missing_values(X_sample)
+            try:
+                expected = model.predict(X_missing)
+            except ValueError:
+                # versions of sklearn without missing value support reject them, there is nothing to match
+                expected = None
+            if expected is not None and not np.array_equal(compiled.predict(X_missing), expected):
+                logging.info(f"Compiled {type(model).__name__} predictions differ from the model on missing values, not using it")
+                report["reason"] = "predictions differ on missing values"
+                return None
+
+        model_throughput = measure_throughput(model.predict, X_sample, batch_sizes)
+        compiled_throughput = measure_throughput(compiled.predict, X_sample, batch_sizes)
+        for batch_size in batch_sizes:
+            speedup = compiled_throughput[batch_size] / model_throughput[batch_size]
+            report["speedups"][int(batch_size)] = round(speedup, 3)
+            logging.info(f"Batch size {batch_size}: {type(model).__name__} {model_throughput[batch_size]:.0f} rows/s, "
+                         f"compiled {compiled_throughput[batch_size]:.0f} rows/s, speedup {speedup:.2f}x")
+        slower = [batch_size for batch_size, speedup in report["speedups"].items() if speedup <= 1.0]
+        if slower:
+            logging.info(f"Compiled {type(model).__name__} is not faster than the model at batch sizes {slower}, not using it")
+            report["reason"] = f"not faster at batch sizes {slower}"
+            return None
+        report["compiled"] = True
+        return compiled
+    except Exception as e:
+        raise visaException(e, sys) from e
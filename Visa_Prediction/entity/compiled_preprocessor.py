@@ -0,0 +1,235 @@
+import sys
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from scipy import sparse
+from sklearn.compose import ColumnTransformer
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler, OneHotEncoder, OrdinalEncoder, PowerTransformer
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+
+
+def _lookup_codes(lookup: pd.Index, column: pd.Series) -> np.ndarray:
+    """
+    Returns the position of every value of the column in lookup, -1 for unknown values. A Categorical column is
+    looked up once per category and its codes are mapped, instead of hashing every row.
+    """
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        category_codes = np.append(lookup.get_indexer(column.cat.categories), -1)
+        # missing values have the code -1, which takes the trailing -1
+        return category_codes.take(column.cat.codes.to_numpy())
+    return lookup.get_indexer(column.to_numpy())
+
+
+class _OneHotBlock:
+    """
+    One hot encodes a single column with a precomputed category lookup table.
+    """
+
+    def __init__(self, column: str, categories: np.ndarray, handle_unknown: str, offset: int):
+        self.column = column
+        self.lookup = pd.Index(categories)
+        self.handle_unknown = handle_unknown
+        self.offset = offset
+        self.width = len(categories)
+
+    def fill(self, dataframe: DataFrame, out: np.ndarray) -> None:
+        codes = _lookup_codes(self.lookup, dataframe[self.column])
+        unknown = codes < 0
+        if unknown.any() and self.handle_unknown == "error":
+            raise ValueError(f"Found unknown categories {list(pd.unique(dataframe[self.column].to_numpy()[unknown]))} "
+                             f"in column {self.column} during transform")
+        out[:, self.offset:self.offset + self.width] = 0.0
+        rows = np.flatnonzero(~unknown)
+        out[rows, self.offset + codes[rows]] = 1.0
+
+
+class _OrdinalBlock:
+    """
+    Ordinal encodes a single column with a precomputed category lookup table.
+    """
+
+    def __init__(self, column: str, categories: np.ndarray, handle_unknown: str, unknown_value, offset: int):
+        self.column = column
+        self.lookup = pd.Index(categories)
+        self.handle_unknown = handle_unknown
+        self.unknown_value = unknown_value
+        self.offset = offset
+        self.width = 1
+
+    def fill(self, dataframe: DataFrame, out: np.ndarray) -> None:
+        codes = _lookup_codes(self.lookup, dataframe[self.column]).astype(np.float64)
+        unknown = codes < 0
+        if unknown.any():
+            if self.handle_unknown == "error":
+                raise ValueError(f"Found unknown categories {list(pd.unique(dataframe[self.column].to_numpy()[unknown]))} "
+                                 f"in column {self.column} during transform")
+            codes[unknown] = self.unknown_value
+        out[:, self.offset] = codes
+
+
+class _NumericBlock:
+    """
+    Applies the fused Yeo-Johnson and standardization steps to a group of numeric columns, using the same
+    floating point operations as sklearn so that the output is bit for bit identical.
+    """
+
+    def __init__(self, columns: List[str], steps: List[Tuple], offset: int):
+        self.columns = columns
+        self.steps = steps
+        self.offset = offset
+        self.width = len(columns)
+
+    @staticmethod
+    def _yeo_johnson(x: np.ndarray, lmbda: float) -> np.ndarray:
+        out = np.zeros_like(x)
+        pos = x >= 0
+        if abs(lmbda) < np.spacing(1.0):
+            out[pos] = np.log1p(x[pos])
+        else:
+            out[pos] = (np.power(x[pos] + 1, lmbda) - 1) / lmbda
+        if abs(lmbda - 2) > np.spacing(1.0):
+            out[~pos] = -(np.power(-x[~pos] + 1, 2 - lmbda) - 1) / (2 - lmbda)
+        else:
+            out[~pos] = -np.log1p(-x[~pos])
+        return out
+
+    def fill(self, dataframe: DataFrame, out: np.ndarray) -> None:
+        values = dataframe[self.columns].to_numpy(dtype=np.float64, copy=True)
+        for step in self.steps:
+            if step[0] == "yeo-johnson":
+                with np.errstate(invalid="ignore"):
+                    for i, lmbda in enumerate(step[1]):
+                        values[:, i] = self._yeo_johnson(values[:, i], lmbda)
+            else:
+                _, mean, scale = step
+                if mean is not None:
+                    values -= mean
+                if scale is not None:
+                    values /= scale
+        out[:, self.offset:self.offset + self.width] = values
+
+
+class CompiledPreprocessor:
+    """
+    This class is an array backed replacement for the fitted ColumnTransformer built in DataTransformation.
+    Categorical columns are encoded with precomputed lookup tables and numeric columns go through fused
+    Yeo-Johnson / mean / scale arithmetic written straight into one preallocated output array, which avoids
+    the per step column selection and validation overhead of sklearn for small batches.
+    """
+
+    def __init__(self, blocks: list, n_features_out: int, sparse_output: bool):
+        self.blocks = blocks
+        self.n_features_out = n_features_out
+        self.sparse_output = sparse_output
+
+    @staticmethod
+    def _numeric_steps(transformer) -> List[Tuple]:
+        if isinstance(transformer, Pipeline):
+            steps = []
+            for _, step in transformer.steps:
+                if step in (None, "passthrough"):
+                    continue
+                steps.extend(CompiledPreprocessor._numeric_steps(step))
+            return steps
+        if isinstance(transformer, PowerTransformer):
+            if transformer.method != "yeo-johnson":
+                raise ValueError(f"Power transformer method {transformer.method} is not supported")
+            steps = [("yeo-johnson", np.asarray(transformer.lambdas_, dtype=np.float64))]
+            if transformer.standardize:
+                steps.extend(CompiledPreprocessor._numeric_steps(transformer._scaler))
+            return steps
+        if isinstance(transformer, StandardScaler):
+            return [("scale", transformer.mean_ if transformer.with_mean else None,
+                     transformer.scale_ if transformer.with_std else None)]
+        if transformer == "passthrough":
+            return []
+        raise ValueError(f"Transformer {type(transformer).__name__} is not supported by the preprocessing compiler")
+
+    @classmethod
+    def compile(cls, preprocessor: ColumnTransformer) -> "CompiledPreprocessor":
+        """
+        Builds the compiled transformer from a fitted ColumnTransformer. Raises a ValueError when the
+        preprocessor uses a step which can not be compiled.
+        """
+        if not isinstance(preprocessor, ColumnTransformer):
+            raise ValueError(f"Expected a fitted ColumnTransformer, got {type(preprocessor).__name__}")
+
+        blocks = []
+        offset = 0
+        for name, transformer, columns in preprocessor.transformers_:
+            if transformer == "drop" or len(columns) == 0:
+                continue
+            columns = list(columns)
+            if not all(isinstance(col, str) for col in columns):
+                raise ValueError(f"Columns of {name} must be selected by name to be compiled")
+
+            if isinstance(transformer, OneHotEncoder):
+                if transformer.drop is not None or getattr(transformer, "_infrequent_enabled", False):
+                    raise ValueError(f"OneHotEncoder {name} uses drop or infrequent categories")
+                for col, categories in zip(columns, transformer.categories_):
+                    blocks.append(_OneHotBlock(col, categories, transformer.handle_unknown, offset))
+                    offset += len(categories)
+            elif isinstance(transformer, OrdinalEncoder):
+                if np.dtype(transformer.dtype) != np.float64:
+                    raise ValueError(f"OrdinalEncoder {name} must use the float64 dtype")
+                if any(pd.isna(categories).any() for categories in transformer.categories_):
+                    raise ValueError(f"OrdinalEncoder {name} has missing values among its categories")
+                for col, categories in zip(columns, transformer.categories_):
+                    blocks.append(_OrdinalBlock(col, categories, transformer.handle_unknown,
+                                                transformer.unknown_value, offset))
+                    offset += 1
+            else:
+                blocks.append(_NumericBlock(columns, cls._numeric_steps(transformer), offset))
+                offset += len(columns)
+
+        return cls(blocks=blocks, n_features_out=offset, sparse_output=bool(preprocessor.sparse_output_))
+
+    def transform(self, dataframe: DataFrame):
+        """
+        Transforms the raw feature DataFrame into the model input matrix.
+        """
+        out = np.empty((len(dataframe), self.n_features_out), dtype=np.float64)
+        for block in self.blocks:
+            block.fill(dataframe, out)
+        return sparse.csr_matrix(out) if self.sparse_output else out
+
+    def verification_frame(self, n_rows: int = 16) -> DataFrame:
+        """
+        Builds a small frame covering every known category and a spread of numeric values which is used to
+        check the compiled output against the original preprocessor.
+        """
+        n_rows = max([n_rows] + [len(block.lookup) for block in self.blocks if not isinstance(block, _NumericBlock)])
+        grid = np.array([0.0, 1.0, -1.0, 0.5, 3.0, 27.0, 1234.5, 98765.0, -10.0, 2.0])
+        frame = {}
+        for block in self.blocks:
+            if isinstance(block, _NumericBlock):
+                for col in block.columns:
+                    frame[col] = np.resize(grid, n_rows)
+            else:
+                frame[block.column] = np.resize(block.lookup.to_numpy(), n_rows)
+        return DataFrame(frame)
+
+
+def compile_preprocessor(preprocessor: ColumnTransformer) -> CompiledPreprocessor:
+    """
+    Compiles the fitted preprocessor and checks that the compiled output is bit for bit identical to the
+    output of the preprocessor before returning it.
+    """
+    try:
+        compiled = CompiledPreprocessor.compile(preprocessor)
+        frame = compiled.verification_frame()
+        expected = preprocessor.transform(frame)
+        actual = compiled.transform(frame)
+        if sparse.issparse(expected):
+            expected, actual = expected.toarray(), actual.toarray()
+        if expected.shape != actual.shape or not np.array_equal(expected, actual, equal_nan=True):
+            raise ValueError("Compiled preprocessor output does not match the fitted preprocessor")
+        logging.info(f"Compiled the preprocessor into {len(compiled.blocks)} array backed blocks")
+        return compiled
+    except Exception as e:
+        raise visaException(e, sys) from e
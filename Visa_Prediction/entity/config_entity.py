@@ -21,9 +21,21 @@ class TrainingPipelineConfig:
     pipeline_name: str = PIPELINE_NAME
     artifact_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP)
     timestamp: str = TIMESTAMP
+    dag_report_file_path: str = os.path.join(ARTIFACT_DIR, TIMESTAMP, TRAINING_PIPELINE_DAG_REPORT_FILE_NAME)
+    dag_max_workers: int = TRAINING_PIPELINE_DAG_MAX_WORKERS
+    # transformation runs concurrently with validation and the trainer waits for the validation status
+    speculative_transformation: bool = TRAINING_PIPELINE_SPECULATIVE_TRANSFORMATION
+    instrumentation_report_file_path: str = os.path.join(ARTIFACT_DIR, TIMESTAMP, INSTRUMENTATION_REPORT_FILE_NAME)
+    profile_dir: str = os.path.join(ARTIFACT_DIR, TIMESTAMP, INSTRUMENTATION_PROFILE_DIR_NAME)
+    profile_tracks: tuple = INSTRUMENTATION_PROFILE_TRACKS
 
 training_pipeline_config: TrainingPipelineConfig = TrainingPipelineConfig()
 
+@dataclass
+class StageCacheConfig:
+    stage_cache_dir: str = os.path.join(ARTIFACT_DIR, STAGE_CACHE_DIR_NAME)
+    keep_per_stage: int = STAGE_CACHE_KEEP_PER_STAGE
+
 @dataclass
 class DataIngestionConfig:
     data_ingestion_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_INGESTION_DIR_NAME)
@@ -32,11 +44,23 @@ class DataIngestionConfig:
     testing_file_path: str = os.path.join(data_ingestion_dir, DATA_INGESTION_INGESTED_DIR, TEST_FILE_NAME)
     train_test_split_ratio: float = DATA_INGESTION_TRAIN_TEST_SPLIT_RATIO
     collection_name:str = DATA_INGESTION_COLLECTION_NAME
+    mongo_batch_size: int = DATA_INGESTION_MONGO_BATCH_SIZE
+    num_workers: int = DATA_INGESTION_NUM_WORKERS
+    random_state: int = DATA_INGESTION_RANDOM_STATE
+    incremental: bool = DATA_INGESTION_INCREMENTAL
+    persistent_feature_store_dir: str = os.path.join(ARTIFACT_DIR, DATA_INGESTION_FEATURE_STORE_DIR)
+    high_water_mark_file_path: str = os.path.join(persistent_feature_store_dir, DATA_INGESTION_HIGH_WATER_MARK_FILE_NAME)
 
 @dataclass
 class DataValidationConfig:
     data_validation_dir: str = os.path.join(training_pipeline_config.artifact_dir, DATA_VALIDATION_DIR_NAME)
     drift_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_DRIFT_REPORT_DIR, DATA_VALIDATION_DRIFT_REPORT_FILE_NAME)
+    drift_bins: int = DATA_VALIDATION_DRIFT_BINS
+    drift_max_categories: int = DATA_VALIDATION_DRIFT_MAX_CATEGORIES
+    drift_p_value_threshold: float = DATA_VALIDATION_DRIFT_P_VALUE_THRESHOLD
+    drift_share_threshold: float = DATA_VALIDATION_DRIFT_SHARE_THRESHOLD
+    schema_report_file_path: str = os.path.join(data_validation_dir, DATA_VALIDATION_SCHEMA_REPORT_DIR, DATA_VALIDATION_SCHEMA_REPORT_FILE_NAME)
+    chunk_rows: int = DATA_VALIDATION_CHUNK_ROWS
 
 @dataclass
 class DataTransformationConfig:
@@ -44,18 +68,45 @@ class DataTransformationConfig:
     transformed_train_file_path: str = os.path.join(
         data_transformation_dir, 
         DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, 
-        TRAIN_FILE_NAME.replace("csv", "npy")
+        TRAIN_FILE_NAME.replace("parquet", "npy")
     )
     transformed_test_file_path: str = os.path.join(
         data_transformation_dir, 
         DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, 
-        TEST_FILE_NAME.replace("csv", "npy")
+        TEST_FILE_NAME.replace("parquet", "npy")
+    )
+    transformed_train_label_file_path: str = os.path.join(
+        data_transformation_dir, 
+        DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, 
+        TRAIN_FILE_NAME.replace(".parquet", DATA_TRANSFORMATION_LABEL_FILE_SUFFIX + ".npy")
+    )
+    transformed_test_label_file_path: str = os.path.join(
+        data_transformation_dir, 
+        DATA_TRANSFORMATION_TRANSFORMED_DATA_DIR, 
+        TEST_FILE_NAME.replace(".parquet", DATA_TRANSFORMATION_LABEL_FILE_SUFFIX + ".npy")
     )
     transformed_object_file_path: str = os.path.join(
         data_transformation_dir,
         DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
         PREPROCESSING_OBJECT_FILE_NAME
     )
+    reference_sketch_file_path: str = os.path.join(
+        data_transformation_dir,
+        DATA_TRANSFORMATION_TRANSFORMED_OBJECT_DIR,
+        DATA_TRANSFORMATION_REFERENCE_SKETCH_FILE_NAME
+    )
+    resampling_report_file_path: str = os.path.join(data_transformation_dir, DATA_TRANSFORMATION_RESAMPLING_REPORT_FILE_NAME)
+    feature_dtype: str = DATA_TRANSFORMATION_FEATURE_DTYPE
+    feature_layout: str = DATA_TRANSFORMATION_FEATURE_LAYOUT
+    resampling_strategy: str = DATA_TRANSFORMATION_RESAMPLING_STRATEGY
+    resample_test: bool = DATA_TRANSFORMATION_RESAMPLE_TEST
+    resampling_n_jobs: int = DATA_TRANSFORMATION_RESAMPLING_N_JOBS
+    resampling_neighbors_algorithm: str = DATA_TRANSFORMATION_RESAMPLING_NEIGHBORS_ALGORITHM
+    resampling_approximate_neighbors: bool = DATA_TRANSFORMATION_RESAMPLING_APPROXIMATE_NEIGHBORS
+    resampling_max_chunk_bytes: int = DATA_TRANSFORMATION_RESAMPLING_MAX_CHUNK_BYTES
+    streaming_fit: bool = DATA_TRANSFORMATION_STREAMING_FIT
+    streaming_batch_rows: int = DATA_TRANSFORMATION_STREAMING_BATCH_ROWS
+    streaming_sample_rows: int = DATA_TRANSFORMATION_STREAMING_SAMPLE_ROWS
 
 @dataclass
 class ModelTrainerConfig:
@@ -79,3 +130,12 @@ class ModelPusherConfig:
 class VisaPredictionConfig:
     model_file_path: str = MODEL_FILE_NAME
     model_bucket_patt: str = MODEL_BUCKET_NAME
+    max_batch_size: int = PREDICTION_MAX_BATCH_SIZE
+    micro_batch_max_size: int = PREDICTION_MICRO_BATCH_MAX_SIZE
+    micro_batch_max_wait_ms: float = PREDICTION_MICRO_BATCH_MAX_WAIT_MS
+    worker_threads: int = PREDICTION_WORKER_THREADS
+    model_refresh_interval_seconds: float = PREDICTION_MODEL_REFRESH_INTERVAL_SECONDS
+    drift_window_seconds: float = PREDICTION_DRIFT_WINDOW_SECONDS
+    drift_windows: int = PREDICTION_DRIFT_WINDOWS
+    drift_sketch_capacity: int = PREDICTION_DRIFT_SKETCH_CAPACITY
+    validate_inputs: bool = PREDICTION_VALIDATE_INPUTS
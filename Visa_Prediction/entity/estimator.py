@@ -1,10 +1,14 @@
 import sys
 import os
+from typing import Optional
 
 from pandas import DataFrame
 from sklearn.pipeline import Pipeline
 
+from Visa_Prediction.entity.compiled_model import compile_model
+from Visa_Prediction.entity.compiled_preprocessor import compile_preprocessor
 from Visa_Prediction.exception import visaException
+from Visa_Prediction.utils.feature_matrix import to_feature_matrix, as_estimator_input
 from Visa_Prediction.logger import logging
 
 class TargetValueMapping:
@@ -16,14 +20,63 @@ class TargetValueMapping:
         return self.__dict__
     
     def reverse_mapping(self):
-        mapping_response = self.asdict()
+        mapping_response = self._asdict()
         return dict(zip(mapping_response.values(), mapping_response.keys()))
     
 
 class VisaModel:
-    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object):
+    def __init__(self, preprocessing_object: Pipeline, trained_model_object: object, feature_layout: str = "dense",
+                 feature_dtype: Optional[str] = None):
         self.preprocessing_object = preprocessing_object
         self.trained_model_object = trained_model_object
+        # layout and dtype of the feature matrices the model was trained on, the inputs are transformed to match
+        self.feature_layout = feature_layout
+        self.feature_dtype = feature_dtype
+        self.compiled_preprocessor = None
+        self.compiled_model = None
+        # sketch of the training features, the reference of the drift monitor of the prediction pipeline
+        self.reference_sketch = None
+
+    def compile_preprocessor(self) -> bool:
+        """
+        This function compiles the fitted preprocessing object into an array backed transformer which is used by
+        predict instead of the sklearn steps. If the preprocessing object can not be compiled the sklearn steps are kept.
+        """
+        try:
+            self.compiled_preprocessor = compile_preprocessor(self.preprocessing_object)
+            return True
+        except Exception as e:
+            logging.info(f"Preprocessing object could not be compiled, using it as it is: {e}")
+            self.compiled_preprocessor = None
+            return False
+
+    def compile_model(self, X_sample, report: Optional[dict] = None) -> bool:
+        """
+        This function compiles the trained model object into a native NumPy predictor which is used by predict instead of
+        the model object. The compiled predictor is only kept when it matches the model predictions on X_sample and is faster
+        at every measured batch size, report is filled with the measured speedups.
+        """
+        try:
+            self.compiled_model = compile_model(self.trained_model_object, X_sample, report = report)
+        except Exception as e:
+            logging.info(f"Trained model object could not be compiled, using it as it is: {e}")
+            if report is not None:
+                report.update(compiled = False, reason = str(e))
+            self.compiled_model = None
+        return self.compiled_model is not None
+
+    def transform(self, dataframe: DataFrame, feature_layout: Optional[str] = None):
+        """
+        This function transforms the raw inputs with the compiled preprocessor when present, else with the preprocessing object,
+        into a matrix of the feature layout, by default the one of the training data, and of the training dtype.
+        """
+        compiled_preprocessor = getattr(self, "compiled_preprocessor", None)
+        if compiled_preprocessor is not None:
+            transformed_feature = compiled_preprocessor.transform(dataframe)
+        else:
+            transformed_feature = self.preprocessing_object.transform(dataframe)
+        return to_feature_matrix(transformed_feature, feature_layout or getattr(self, "feature_layout", "dense"),
+                                 getattr(self, "feature_dtype", None))
 
     def predict(self, dataframe: DataFrame) -> DataFrame:
         """
@@ -33,10 +86,16 @@ class VisaModel:
         """
         try:
             logging.info("Using trained model to get predictions")
-            transformed_feature = self.preprocessing_object.transform(dataframe)
+            compiled_model = getattr(self, "compiled_model", None)
+            if compiled_model is not None:
+                # the compiled predictors work on dense arrays
+                transformed_feature = self.transform(dataframe, feature_layout = "dense")
+                logging.info("Used preprocessing object to get the predictions")
+                return compiled_model.predict(transformed_feature)
+            transformed_feature = self.transform(dataframe)
 
             logging.info("Used preprocessing object to get the predictions")
-            return self.trained_model_object.predict(transformed_feature)
+            return self.trained_model_object.predict(as_estimator_input(self.trained_model_object, transformed_feature))
 
         except Exception as e:
             raise visaException(e, sys) from e
@@ -1,7 +1,14 @@
 from Visa_Prediction.cloud_storage.aws_storage import SimpleStorageService
+from Visa_Prediction.cloud_storage.model_cache import ModelCache
+from Visa_Prediction.utils.main_utils import load_object
 from Visa_Prediction.exception import visaException
-from Visa_Prediction.entity.estimator import VisaModel
+from Visa_Prediction.entity.estimator import VisaModel, TargetValueMapping
+from Visa_Prediction.logger import logging
 import sys
+import threading
+from typing import Optional, Tuple
+
+import numpy as np
 from pandas import DataFrame
 
 from dotenv import load_dotenv
@@ -20,24 +27,118 @@ class visaEstimator:
         """
         self.bucket_name = bucket_name
         self.s3 = SimpleStorageService()
+        self.model_cache = ModelCache(s3_client=self.s3.s3_client)
         self.model_path = model_path
         self.loaded_model:VisaModel=None
+        self.loaded_etag: Optional[str] = None
+        self._rejected_etag: Optional[str] = None
+        self._lock = threading.Lock()
+        self._stop_refresher = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
 
 
     def is_model_present(self,model_path):
         try:
-            return self.s3.s3_key_path_available(bucket_name=self.bucket_name, s3_key=model_path)
-        except visaException as e:
+            return self.model_cache.head(bucket_name=self.bucket_name, key=model_path) is not None
+        except Exception as e:
             print(e)
             return False
 
+    def _load_latest(self) -> Tuple[VisaModel, str]:
+        """
+        Loads the current version of the model through the local model cache and returns it with its ETag
+        """
+        file_path = self.model_cache.get_model_file(bucket_name=self.bucket_name, key=self.model_path)
+        return load_object(file_path), ModelCache.etag_of(file_path)
+
     def load_model(self,)->VisaModel:
         """
-        Load the model from the model_path
+        Load the model from the model_path, through the local model cache so that the model is only downloaded
+        when its ETag changed
         :return:
         """
+        try:
+            return self._load_latest()[0]
+        except Exception as e:
+            raise visaException(e, sys)
+
+    def get_model(self) -> VisaModel:
+        """
+        Returns the model currently used for prediction, loading it on first use. Callers keep the returned
+        reference for the whole batch, so a model swapped in by the refresher only serves the following batches.
+        """
+        try:
+            if self.loaded_model is None:
+                with self._lock:
+                    if self.loaded_model is None:
+                        self.loaded_model, self.loaded_etag = self._load_latest()
+            return self.loaded_model
+        except Exception as e:
+            raise visaException(e, sys)
+
+    @staticmethod
+    def warm_up(model: VisaModel, warmup_frame: DataFrame) -> None:
+        """
+        Scores the warm up frame with the model, raising an exception when scoring fails or returns anything but one
+        known class per row
+        """
+        predictions = np.asarray(model.predict(warmup_frame))
+        known_classes = set(TargetValueMapping()._asdict().values())
+        if len(predictions) != len(warmup_frame) or not set(predictions.astype(int).tolist()) <= known_classes:
+            raise ValueError(f"Warm up predictions {predictions} are not valid")
+
+    def refresh(self, warmup_frame: DataFrame) -> bool:
+        """
+        Checks the registry for a new version of the model. A new version is loaded and warmed up with the warm up
+        frame off the request path and then swapped in, a version which fails to warm up is rejected and the current
+        model is kept. Returns True when the model was swapped.
+        """
+        try:
+            file_path = self.model_cache.get_model_file(bucket_name=self.bucket_name, key=self.model_path)
+            etag = ModelCache.etag_of(file_path)
+            if etag in (self.loaded_etag, self._rejected_etag):
+                return False
+
+            logging.info(f"Found model version {etag} in s3://{self.bucket_name}/{self.model_path}, warming it up")
+            try:
+                candidate = load_object(file_path)
+                self.warm_up(candidate, warmup_frame)
+            except Exception as e:
+                self._rejected_etag = etag
+                logging.info(f"Model version {etag} failed to warm up, keeping version {self.loaded_etag}: {e}")
+                return False
+
+            with self._lock:
+                previous_etag = self.loaded_etag
+                self.loaded_model, self.loaded_etag = candidate, etag
+            logging.info(f"Swapped model version {previous_etag} for {etag}")
+            return True
+        except Exception as e:
+            raise visaException(e, sys)
+
+    def start_refresher(self, interval_seconds: float, warmup_frame: DataFrame) -> None:
+        """
+        Starts a daemon thread which calls refresh every interval_seconds until stop_refresher is called
+        """
+        def run() -> None:
+            while not self._stop_refresher.wait(interval_seconds):
+                try:
+                    self.refresh(warmup_frame)
+                except Exception as e:
+                    logging.info(f"Model refresh failed, keeping version {self.loaded_etag}: {e}")
+
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        self._stop_refresher.clear()
+        self._refresher = threading.Thread(target=run, name="visa-model-refresher", daemon=True)
+        self._refresher.start()
+        logging.info(f"Started the model refresher, polling every {interval_seconds} seconds")
 
-        return self.s3.load_model(self.model_path,bucket_name=self.bucket_name)
+    def stop_refresher(self) -> None:
+        self._stop_refresher.set()
+        if self._refresher is not None:
+            self._refresher.join()
+            self._refresher = None
 
     def save_model(self,from_file,remove:bool=False)->None:
         """
@@ -62,8 +163,6 @@ class visaEstimator:
         :return:
         """
         try:
-            if self.loaded_model is None:
-                self.loaded_model = self.load_model()
-            return self.loaded_model.predict(dataframe=dataframe)
+            return self.get_model().predict(dataframe=dataframe)
         except Exception as e:
-            raise visaException(e, sys)
\ No newline at end of file
+            raise visaException(e, sys)
@@ -0,0 +1,204 @@
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from Visa_Prediction.constants import TRAINING_PIPELINE_DAG_MAX_WORKERS
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.instrumentation import instrumentation
+
+EXECUTORS = ("thread", "process")
+
+
+@dataclass
+class Task:
+    """
+    A node of the pipeline graph. fn is called with one keyword argument per entry of inputs, the result of the
+    upstream task of that name, and runs after the tasks of after as well. The resource hints tell the scheduler
+    where to run the task:
+        executor -> "thread" for tasks which wait on IO or release the GIL, "process" for pure Python CPU work,
+                    fn and its result must then be picklable, the workers are spawned and start from a fresh interpreter
+        cpus     -> cores the task keeps busy, 0 for IO bound tasks, the scheduler never runs more than max_cpus at once
+    """
+    name: str
+    fn: Callable[..., object]
+    inputs: Dict[str, str] = field(default_factory=dict)
+    after: List[str] = field(default_factory=list)
+    executor: str = "thread"
+    cpus: float = 1
+
+    @property
+    def dependencies(self) -> List[str]:
+        return list(dict.fromkeys(list(self.inputs.values()) + list(self.after)))
+
+
+def _run_in_process(fn: Callable[..., object], kwargs: dict):
+    """
+    Runs a process task in a worker and returns its result with the measurements it recorded in the worker.
+    """
+    instrumentation.reset()
+    return fn(**kwargs), instrumentation.export()
+
+
+@dataclass
+class TaskTiming:
+    ready: float
+    start: float = 0.0
+    end: float = 0.0
+
+    @property
+    def seconds(self) -> float:
+        return self.end - self.start
+
+
+class DagScheduler:
+    """
+    This class runs a graph of tasks, every task starts as soon as its dependencies are done and the cpu budget
+    allows it, on a thread pool or a process pool following its executor hint. The first failure stops the
+    scheduling of new tasks, lets the running ones finish and is raised. report returns the timings of the run
+    with its critical path, the chain of tasks which determined the wall time.
+    """
+
+    def __init__(self, tasks: List[Task], max_workers: int = TRAINING_PIPELINE_DAG_MAX_WORKERS,
+                 max_cpus: Optional[float] = None):
+        """
+        :param tasks: Tasks of the graph, with unique names
+        :param max_workers: Threads of the thread pool and processes of the process pool
+        :param max_cpus: Sum of the cpus hints of the tasks running at once, the number of cores when not given
+        """
+        try:
+            self.tasks = {task.name: task for task in tasks}
+            if len(self.tasks) != len(tasks):
+                raise ValueError("Task names of the graph must be unique")
+            for task in tasks:
+                if task.executor not in EXECUTORS:
+                    raise ValueError(f"Task {task.name} has an unknown executor {task.executor}, expected one of {list(EXECUTORS)}")
+                unknown = [name for name in task.dependencies if name not in self.tasks]
+                if unknown:
+                    raise ValueError(f"Task {task.name} depends on unknown tasks {unknown}")
+            self.order = self._topological_order()
+            self.max_workers = max(1, max_workers)
+            self.max_cpus = max_cpus if max_cpus is not None else (os.cpu_count() or 1)
+            self.timings: Dict[str, TaskTiming] = {}
+            self.wall_seconds = 0.0
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def _topological_order(self) -> List[str]:
+        remaining = {name: set(task.dependencies) for name, task in self.tasks.items()}
+        order = []
+        while remaining:
+            ready = [name for name, dependencies in remaining.items() if not dependencies]
+            if not ready:
+                raise ValueError(f"The graph has a cycle among the tasks {sorted(remaining)}")
+            for name in ready:
+                order.append(name)
+                del remaining[name]
+            for dependencies in remaining.values():
+                dependencies.difference_update(ready)
+        return order
+
+    def run(self) -> Dict[str, object]:
+        """
+        Runs the graph and returns the result of every task.
+        """
+        results: Dict[str, object] = {}
+        running: Dict[Future, str] = {}
+        pending = list(self.order)
+        failure: Optional[BaseException] = None
+        busy_cpus = 0.0
+        started = time.perf_counter()
+        self.timings = {}
+        needs_processes = any(task.executor == "process" for task in self.tasks.values())
+        thread_pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="visa-dag")
+        # the scheduler already runs threads, forking it could copy locks they hold into the workers
+        process_pool = (ProcessPoolExecutor(max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn"))
+                        if needs_processes else None)
+        try:
+            while pending or running:
+                if failure is None:
+                    for name in list(pending):
+                        task = self.tasks[name]
+                        if not all(dependency in results for dependency in task.dependencies):
+                            continue
+                        self.timings.setdefault(name, TaskTiming(ready=time.perf_counter() - started))
+                        # a task larger than the budget still runs, alone
+                        if running and busy_cpus + task.cpus > self.max_cpus:
+                            continue
+                        kwargs = {argument: results[upstream] for argument, upstream in task.inputs.items()}
+                        self.timings[name].start = time.perf_counter() - started
+                        if task.executor == "process":
+                            running[process_pool.submit(_run_in_process, task.fn, kwargs)] = name
+                        else:
+                            running[thread_pool.submit(task.fn, **kwargs)] = name
+                        busy_cpus += task.cpus
+                        pending.remove(name)
+                        logging.info(f"Started task {name} on the {task.executor} pool")
+                if not running:
+                    break
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    busy_cpus -= self.tasks[name].cpus
+                    self.timings[name].end = time.perf_counter() - started
+                    try:
+                        if self.tasks[name].executor == "process":
+                            results[name], measurements = future.result()
+                            instrumentation.merge(measurements)
+                        else:
+                            results[name] = future.result()
+                        logging.info(f"Task {name} done in {self.timings[name].seconds:.2f} seconds")
+                    except BaseException as e:
+                        logging.info(f"Task {name} failed: {e}")
+                        failure = failure or e
+            self.wall_seconds = time.perf_counter() - started
+            if failure is not None:
+                raise failure
+            return results
+        except Exception as e:
+            raise visaException(e, sys) from e
+        finally:
+            thread_pool.shutdown(wait=True)
+            if process_pool is not None:
+                process_pool.shutdown(wait=True)
+
+    def critical_path(self) -> List[str]:
+        """
+        Returns the chain of finished tasks which ends with the last task to finish, where every task is preceded by
+        its dependency which finished last, the tasks which the wall time waited on.
+        """
+        finished = {name: timing for name, timing in self.timings.items() if timing.end > 0}
+        if not finished:
+            return []
+        path = [max(finished, key=lambda name: finished[name].end)]
+        while True:
+            dependencies = [name for name in self.tasks[path[-1]].dependencies if name in finished]
+            if not dependencies:
+                return path[::-1]
+            path.append(max(dependencies, key=lambda name: finished[name].end))
+
+    def report(self) -> dict:
+        """
+        Returns the timings of the last run: the seconds of every task and how long it waited for a free slot after
+        its dependencies were done, the wall time, the sum of the task times and the critical path.
+        """
+        critical_path = self.critical_path()
+        serial_seconds = sum(timing.seconds for timing in self.timings.values() if timing.end > 0)
+        return {
+            "wall_seconds": round(self.wall_seconds, 3),
+            "serial_seconds": round(serial_seconds, 3),
+            "critical_path": critical_path,
+            "critical_path_seconds": round(sum(self.timings[name].seconds for name in critical_path), 3),
+            "tasks": {name: {"executor": self.tasks[name].executor,
+                             "cpus": self.tasks[name].cpus,
+                             "start": round(timing.start, 3),
+                             "end": round(timing.end, 3),
+                             "seconds": round(timing.seconds, 3),
+                             "queued_seconds": round(max(0.0, timing.start - timing.ready), 3)}
+                      for name, timing in self.timings.items()},
+        }
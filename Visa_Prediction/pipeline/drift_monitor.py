@@ -0,0 +1,160 @@
+import sys
+import threading
+import time
+from typing import Callable, Dict, List, Sequence
+
+import numpy as np
+from pandas import DataFrame
+
+from Visa_Prediction.constants import (PREDICTION_DRIFT_REPORT_QUANTILES, PREDICTION_DRIFT_SKETCH_CAPACITY,
+                                       PREDICTION_DRIFT_WINDOW_SECONDS, PREDICTION_DRIFT_WINDOWS)
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.utils.drift_utils import CategoricalSketch, DatasetSketch, QuantileSketch, compare_sketches
+
+
+class TrafficSketch:
+    """
+    Sketch of scored features: one QuantileSketch of all the numerical columns, updated with a single call per
+    batch, and the count tables of the categorical columns. It is turned into a DatasetSketch over the bins of the
+    reference to be compared with it.
+    """
+
+    def __init__(self, numerical_columns: List[str], categorical: Dict[str, CategoricalSketch],
+                 capacity: int = PREDICTION_DRIFT_SKETCH_CAPACITY):
+        self.numerical_columns = list(numerical_columns)
+        self.numeric = QuantileSketch(len(self.numerical_columns), capacity)
+        self.categorical = categorical
+
+    @classmethod
+    def like(cls, reference_sketch: DatasetSketch, capacity: int = PREDICTION_DRIFT_SKETCH_CAPACITY) -> "TrafficSketch":
+        return cls(numerical_columns=list(reference_sketch.numeric),
+                   categorical={column: sketch.empty_like() for column, sketch in reference_sketch.categorical.items()},
+                   capacity=capacity)
+
+    def empty_like(self) -> "TrafficSketch":
+        return TrafficSketch(self.numerical_columns,
+                             {column: sketch.empty_like() for column, sketch in self.categorical.items()},
+                             self.numeric.capacity)
+
+    def update(self, features: DataFrame) -> "TrafficSketch":
+        if self.numerical_columns:
+            try:
+                values = np.array([features[column].to_numpy() for column in self.numerical_columns], dtype=np.float64)
+            except TypeError:
+                # nullable columns hold pd.NA, which is only turned into NaN by to_numpy with an na_value, a much
+                # slower call than the plain one
+                values = np.array([features[column].to_numpy(dtype=np.float64, na_value=np.nan)
+                                   for column in self.numerical_columns])
+            self.numeric.update(values.T)
+        for column, sketch in self.categorical.items():
+            sketch.update(features[column])
+        return self
+
+    def merge(self, other: "TrafficSketch") -> "TrafficSketch":
+        self.numeric.merge(other.numeric)
+        for column, sketch in self.categorical.items():
+            sketch.merge(other.categorical[column])
+        return self
+
+    def to_dataset_sketch(self, reference_sketch: DatasetSketch) -> DatasetSketch:
+        """
+        Returns the sketch as counts over the bins of the reference sketch.
+        """
+        edges = [reference_sketch.numeric[column].edges for column in self.numerical_columns]
+        numeric = {}
+        for column, counts, n_missing in zip(self.numerical_columns, self.numeric.histograms(edges), self.numeric.n_missing):
+            numeric[column] = reference_sketch.numeric[column].empty_like()
+            numeric[column].counts = counts
+            numeric[column].n_missing = int(n_missing)
+        return DatasetSketch(numeric=numeric, categorical=self.categorical)
+
+    def quantiles(self, qs: Sequence[float]) -> Dict[str, Dict[str, float]]:
+        values = self.numeric.quantiles(qs)
+        return {column: {f"q{q:g}": (None if np.isnan(value) else float(value)) for q, value in zip(qs, column_values)}
+                for column, column_values in zip(self.numerical_columns, values)}
+
+
+class DriftMonitor:
+    """
+    This class sketches the features of the scored records over rolling time windows and compares them with the
+    reference sketch of the training data. Every scoring thread updates its own shard of the current window, so
+    observe never takes a lock, the lock is only taken when a thread starts a new window and when a report merges
+    the shards. Memory is bounded by n_windows windows of one shard per scoring thread. The numerical columns are
+    kept in quantile sketches, so the report also gives the quantiles of the traffic and not only its counts over
+    the reference bins.
+    """
+
+    def __init__(self,
+                 reference_sketch: DatasetSketch,
+                 window_seconds: float = PREDICTION_DRIFT_WINDOW_SECONDS,
+                 n_windows: int = PREDICTION_DRIFT_WINDOWS,
+                 sketch_capacity: int = PREDICTION_DRIFT_SKETCH_CAPACITY,
+                 report_quantiles: Sequence[float] = PREDICTION_DRIFT_REPORT_QUANTILES,
+                 clock: Callable[[], float] = time.time) -> None:
+        """
+        :param reference_sketch: Sketch of the training features the traffic is compared with
+        :param window_seconds: Length of one window
+        :param n_windows: Number of windows kept, the report covers the last n_windows * window_seconds seconds
+        :param sketch_capacity: Values kept per level and column by the quantile sketches
+        :param report_quantiles: Quantiles of the numerical columns of the traffic given in the report
+        :param clock: Returns the current time in seconds
+        """
+        self.reference_sketch = reference_sketch
+        self.window_seconds = float(window_seconds)
+        self.n_windows = max(1, int(n_windows))
+        self.report_quantiles = tuple(report_quantiles)
+        self.clock = clock
+        self._template = TrafficSketch.like(reference_sketch, capacity=sketch_capacity)
+        self._windows: Dict[int, List[TrafficSketch]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def _shard(self, window_id: int) -> TrafficSketch:
+        """
+        Returns the shard of the calling thread for the window, registering a new shard when the thread enters a new window.
+        """
+        local = self._local
+        if getattr(local, "window_id", None) == window_id:
+            return local.shard
+        shard = self._template.empty_like()
+        with self._lock:
+            self._windows.setdefault(window_id, []).append(shard)
+            for expired_window_id in [key for key in self._windows if key <= window_id - self.n_windows]:
+                del self._windows[expired_window_id]
+        local.window_id, local.shard = window_id, shard
+        return shard
+
+    def observe(self, features: DataFrame) -> None:
+        """
+        Adds the feature rows of one scored batch to the current window.
+        """
+        try:
+            self._shard(int(self.clock() // self.window_seconds)).update(features)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def current_sketch(self) -> TrafficSketch:
+        """
+        Returns the merge of the shards of the windows which are still in the rolling span.
+        """
+        window_id = int(self.clock() // self.window_seconds)
+        with self._lock:
+            shards = [shard for key, window in self._windows.items() if key > window_id - self.n_windows for shard in window]
+        sketch = self._template.empty_like()
+        for shard in shards:
+            sketch.merge(shard)
+        return sketch
+
+    def report(self) -> dict:
+        """
+        Returns the drift report of the traffic of the rolling span against the reference.
+        """
+        try:
+            current_sketch = self.current_sketch()
+            report = compare_sketches(self.reference_sketch, current_sketch.to_dataset_sketch(self.reference_sketch))
+            report["data_drift"]["current_quantiles"] = current_sketch.quantiles(self.report_quantiles)
+            report["data_drift"]["window_seconds"] = self.window_seconds
+            report["data_drift"]["n_windows"] = self.n_windows
+            return report
+        except Exception as e:
+            raise visaException(e, sys) from e
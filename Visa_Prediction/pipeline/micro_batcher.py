@@ -0,0 +1,128 @@
+import asyncio
+import sys
+from concurrent.futures import Executor
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+
+# queued by stop after the last record, the collector scores the batch it holds and exits when it gets it
+_STOP = object()
+
+
+class MicroBatcher:
+    """
+    This class coalesces concurrent single record requests into one batch. Records are collected for up to
+    max_wait_ms milliseconds or until max_batch_size records are queued, then the batch is scored with a single
+    call of predict_fn on a worker thread so that the event loop is never blocked.
+    """
+
+    def __init__(self,
+                 predict_fn: Callable[[List[Any]], Sequence[Any]],
+                 max_batch_size: int,
+                 max_wait_ms: float,
+                 max_concurrent_batches: int = 1,
+                 executor: Optional[Executor] = None) -> None:
+        """
+        :param predict_fn: Function scoring a list of records and returning one result per record
+        :param max_batch_size: Maximum number of records scored in one call of predict_fn
+        :param max_wait_ms: Maximum time the first record of a batch waits for more records
+        :param max_concurrent_batches: Number of batches which can be scored at the same time
+        :param executor: Executor used to run predict_fn, the default loop executor when not given
+        """
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self.executor = executor
+        self._queue: Optional[asyncio.Queue] = None
+        self._collector: Optional[asyncio.Task] = None
+        self._batch_slots: Optional[asyncio.Semaphore] = None
+        self._running_batches: set = set()
+
+    async def start(self) -> None:
+        """
+        Starts the background task collecting the queued records into batches.
+        """
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._batch_slots = asyncio.Semaphore(self.max_concurrent_batches)
+            self._collector = asyncio.create_task(self._collect_batches())
+            logging.info(f"Started the micro batcher with max_batch_size={self.max_batch_size} "
+                         f"and max_wait_ms={self.max_wait * 1000}")
+
+    async def stop(self) -> None:
+        """
+        Stops accepting records, lets the collector score the records which are already queued and waits for the
+        batches being scored to finish, so that every submitted record gets its result.
+        """
+        if self._collector is not None:
+            collector, self._collector = self._collector, None
+            await self._queue.put(_STOP)
+            await collector
+        if self._running_batches:
+            await asyncio.gather(*self._running_batches, return_exceptions=True)
+        logging.info("Stopped the micro batcher")
+
+    async def submit(self, record: Any) -> Any:
+        """
+        Queues one record and waits for its result from the batch it gets scored in.
+        """
+        if self._collector is None:
+            raise RuntimeError("The micro batcher is not started")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((record, future))
+        return await future
+
+    async def _collect_batches(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopped = False
+        while not stopped:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopped = True
+                    break
+                batch.append(item)
+
+            await self._batch_slots.acquire()
+            task = asyncio.create_task(self._score_batch(batch))
+            self._running_batches.add(task)
+            task.add_done_callback(self._running_batches.discard)
+
+    async def _score_batch(self, batch: List[Tuple[Any, asyncio.Future]]) -> None:
+        try:
+            records = [record for record, _ in batch]
+            try:
+                results = await asyncio.get_running_loop().run_in_executor(self.executor, self.predict_fn, records)
+                if len(results) != len(records):
+                    raise ValueError(f"predict_fn returned {len(results)} results for {len(records)} records")
+            except Exception as e:
+                logging.info(f"Scoring a micro batch of {len(records)} records failed: {e}")
+                error = e if isinstance(e, visaException) else visaException(e, sys)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if future.done():
+                    continue
+                # predict_fn may return an exception for a record it rejected, only that record fails
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            self._batch_slots.release()
@@ -0,0 +1,234 @@
+import sys
+import threading
+from typing import List, Mapping, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from Visa_Prediction.constants import SCHEMA_FILE_PATH, CURRENT_YEAR, PREDICTION_WARMUP_RECORDS, TARGET_COLUMN
+from Visa_Prediction.entity.config_entity import VisaPredictionConfig
+from Visa_Prediction.entity.estimator import VisaModel, TargetValueMapping
+from Visa_Prediction.entity.s3_estimator import visaEstimator
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.pipeline.drift_monitor import DriftMonitor
+from Visa_Prediction.utils.main_utils import read_yaml_file, drop_columns
+from Visa_Prediction.utils.schema_validator import SchemaValidator, SchemaValidationError, SchemaValidationResult
+
+
+class VisaInputData:
+    """
+    This class converts raw applicant records into a single pandas DataFrame so that a whole batch
+    can be scored at once instead of building one DataFrame per record.
+    """
+
+    @staticmethod
+    def to_dataframe(records: Union[DataFrame, Sequence[Mapping], Mapping[str, Sequence], object]) -> DataFrame:
+        """
+        Accepts a DataFrame, a list of record dicts, a dict of columns (lists or NumPy arrays) or an
+        Arrow Table / RecordBatch and returns the records as one DataFrame.
+        """
+        try:
+            if isinstance(records, DataFrame):
+                return records
+            if hasattr(records, "to_pandas"):
+                return records.to_pandas()
+            if isinstance(records, Mapping):
+                return pd.DataFrame(dict(records))
+            return pd.DataFrame.from_records(list(records))
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+
+class VisaClassifier:
+    """
+    This class scores raw applicant records in batches using the trained VisaModel.
+    """
+
+    def __init__(self,
+                 prediction_pipeline_config: VisaPredictionConfig = VisaPredictionConfig(),
+                 visa_model: Optional[VisaModel] = None) -> None:
+        """
+        :param prediction_pipeline_config: Configuration holding the model location and the max batch size
+        :param visa_model: Already loaded model, when not given it is loaded from the s3 model registry
+        """
+        try:
+            self.prediction_pipeline_config = prediction_pipeline_config
+            self.visa_model = visa_model
+            self.visa_estimator: Optional[visaEstimator] = None
+            self.drift_monitor: Optional[DriftMonitor] = None
+            self._drift_monitor_lock = threading.Lock()
+            self._schema_config = read_yaml_file(file_path=SCHEMA_FILE_PATH)
+            # the raw input columns, the identifier and the target are not sent for scoring
+            input_columns = [column for column in SchemaValidator(self._schema_config).columns
+                             if column not in ("case_id", TARGET_COLUMN)]
+            self.schema_validator = SchemaValidator(self._schema_config, columns=input_columns)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def get_model(self) -> VisaModel:
+        """
+        Returns the model used for scoring, loading it from the s3 model registry on first use. A model from the
+        registry may be swapped by the model refresher, so callers should fetch it once per batch.
+        """
+        try:
+            if self.visa_model is not None:
+                return self.visa_model
+            if self.visa_estimator is None:
+                logging.info("Loading the model from the s3 model registry for batch prediction")
+                self.visa_estimator = visaEstimator(
+                    bucket_name=self.prediction_pipeline_config.model_bucket_patt,
+                    model_path=self.prediction_pipeline_config.model_file_path,
+                )
+            return self.visa_estimator.get_model()
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def start_model_refresher(self) -> None:
+        """
+        Starts polling the s3 model registry for new model versions, which are warmed up with the
+        PREDICTION_WARMUP_RECORDS before they replace the current model. Nothing is started for a model
+        given at construction time.
+        """
+        try:
+            interval_seconds = self.prediction_pipeline_config.model_refresh_interval_seconds
+            if self.visa_model is not None or not interval_seconds or interval_seconds <= 0:
+                return
+            self.get_model()
+            warmup_frame = self.prepare_features(VisaInputData.to_dataframe(PREDICTION_WARMUP_RECORDS))
+            self.visa_estimator.start_refresher(interval_seconds=interval_seconds, warmup_frame=warmup_frame)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def stop_model_refresher(self) -> None:
+        if self.visa_estimator is not None:
+            self.visa_estimator.stop_refresher()
+
+    def get_drift_monitor(self, model: VisaModel) -> Optional[DriftMonitor]:
+        """
+        Returns the drift monitor comparing the traffic with the reference sketch of the model, None for models
+        trained without one. A model with another reference sketch starts a new monitor, only one is started when
+        several scoring threads see the new model at once so that none of their observations go to a dropped monitor.
+        """
+        reference_sketch = getattr(model, "reference_sketch", None)
+        if reference_sketch is None:
+            return None
+        drift_monitor = self.drift_monitor
+        if drift_monitor is not None and drift_monitor.reference_sketch is reference_sketch:
+            return drift_monitor
+        with self._drift_monitor_lock:
+            drift_monitor = self.drift_monitor
+            if drift_monitor is None or drift_monitor.reference_sketch is not reference_sketch:
+                drift_monitor = DriftMonitor(
+                    reference_sketch=reference_sketch,
+                    window_seconds=self.prediction_pipeline_config.drift_window_seconds,
+                    n_windows=self.prediction_pipeline_config.drift_windows,
+                    sketch_capacity=self.prediction_pipeline_config.drift_sketch_capacity,
+                )
+                self.drift_monitor = drift_monitor
+            return drift_monitor
+
+    def drift_report(self) -> Optional[dict]:
+        """
+        Returns the drift report of the recent traffic against the training data of the current model.
+        """
+        try:
+            drift_monitor = self.get_drift_monitor(self.get_model())
+            return drift_monitor.report() if drift_monitor is not None else None
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def validate_inputs(self, dataframe: DataFrame) -> SchemaValidationResult:
+        """
+        Checks the raw records against the types, domains and ranges of schema.yaml, so that bad records are
+        rejected with the rules they violate instead of failing inside the preprocessing object.
+        """
+        try:
+            return self.schema_validator.validate_frame(dataframe)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def prepare_features(self, dataframe: DataFrame) -> DataFrame:
+        """
+        Builds the company_age feature and drops the schema drop_columns, the same way it is done
+        during data transformation.
+        """
+        try:
+            dataframe = dataframe.copy()
+            dataframe['company_age'] = CURRENT_YEAR - dataframe['yr_of_estab']
+            drop_cols = [col for col in self._schema_config['drop_columns'] if col in dataframe.columns]
+            return drop_columns(df=dataframe, cols=drop_cols)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def predict(self, records, validate: bool = True) -> np.ndarray:
+        """
+        Scores all the records, running preprocessing and the trained model once per batch of at most
+        max_batch_size rows. Unless validate is False the records are checked against the schema first and a
+        SchemaValidationError is raised when any of them is invalid.
+        """
+        try:
+            dataframe = VisaInputData.to_dataframe(records)
+            n_rows = len(dataframe)
+            if n_rows == 0:
+                return np.empty(0)
+
+            if validate and self.prediction_pipeline_config.validate_inputs:
+                result = self.validate_inputs(dataframe)
+                if not result.is_valid:
+                    raise SchemaValidationError(f"Records violate the schema: {result.summary()}")
+
+            features = self.prepare_features(dataframe)
+            model = self.get_model()
+            drift_monitor = self.get_drift_monitor(model)
+            if drift_monitor is not None:
+                drift_monitor.observe(features)
+            batch_size = max(1, int(self.prediction_pipeline_config.max_batch_size))
+
+            logging.info(f"Scoring {n_rows} records in batches of {batch_size}")
+            predictions: List[np.ndarray] = []
+            for start in range(0, n_rows, batch_size):
+                batch = features.iloc[start:start + batch_size]
+                predictions.append(np.asarray(model.predict(batch)))
+
+            return np.concatenate(predictions)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def predict_labels(self, records, validate: bool = True) -> List[str]:
+        """
+        Scores the records and maps the predictions back to the case_status labels.
+        """
+        try:
+            reverse_mapping = TargetValueMapping().reverse_mapping()
+            return [reverse_mapping[int(prediction)] for prediction in self.predict(records, validate=validate)]
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def predict_labels_or_errors(self, records) -> List[Union[str, SchemaValidationError]]:
+        """
+        Scores the valid records and returns a SchemaValidationError in place of the label of every invalid record,
+        so that one bad record does not fail the other records of a micro batch.
+        """
+        try:
+            dataframe = VisaInputData.to_dataframe(records)
+            if not self.prediction_pipeline_config.validate_inputs:
+                return self.predict_labels(dataframe, validate=False)
+            result = self.validate_inputs(dataframe)
+            if result.is_valid:
+                return self.predict_labels(dataframe, validate=False)
+            if result.missing_columns:
+                return [SchemaValidationError(f"Missing columns {result.missing_columns}")] * len(dataframe)
+
+            invalid = result.invalid_row_mask()
+            labels: List[Union[str, SchemaValidationError]] = [None] * len(dataframe)
+            if not invalid.all():
+                valid_labels = self.predict_labels(dataframe[~invalid], validate=False)
+                for position, label in zip(np.flatnonzero(~invalid), valid_labels):
+                    labels[position] = label
+            for position, rules in result.violated_rules().items():
+                labels[position] = SchemaValidationError(f"Record violates the schema rules {rules}")
+            return labels
+        except Exception as e:
+            raise visaException(e, sys) from e
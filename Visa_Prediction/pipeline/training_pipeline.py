@@ -1,8 +1,11 @@
+import os
 import sys
+from typing import Callable, List, Optional
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
 
-from Visa_Prediction.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig, ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig
+from Visa_Prediction.constants import SCHEMA_FILE_PATH, CURRENT_YEAR, TARGET_COLUMN
+from Visa_Prediction.entity.config_entity import DataIngestionConfig, DataValidationConfig, DataTransformationConfig, ModelTrainerConfig, ModelEvaluationConfig, ModelPusherConfig, StageCacheConfig, training_pipeline_config
 from Visa_Prediction.entity.artifact_entity import DataIngestionArtifact, DataValidationArtifact, DataTransformationArtifact, ModelTrainerArtifact, ModelEvaluationArtifact, ModelPusherArtifact
 
 from Visa_Prediction.components.data_ingestion import DataIngestion
@@ -11,12 +14,30 @@ from Visa_Prediction.components.data_transformation import DataTransformation
 from Visa_Prediction.components.model_trainer import ModelTrainer
 from Visa_Prediction.components.model_evaluation import ModelEvaluation
 from Visa_Prediction.components.model_pusher import ModelPusher
+from Visa_Prediction.entity.s3_estimator import visaEstimator
+from Visa_Prediction.pipeline.dag import DagScheduler, Task
+from Visa_Prediction.utils.artifact_cache import artifact_cache
+from Visa_Prediction.utils.drift_utils import DatasetSketch
+from Visa_Prediction.utils.schema_validator import SchemaValidator
+from Visa_Prediction.utils.resampling import Resampler
+from Visa_Prediction.utils.streaming_fit import StreamingPreprocessorFit
+from Visa_Prediction.utils.feature_matrix import save_feature_matrix
+from Visa_Prediction.utils.stage_cache import StageCache
+from Visa_Prediction.utils.model_search import ModelSearch
+from Visa_Prediction.utils.main_utils import write_yaml_file
+from Visa_Prediction.utils.instrumentation import instrumentation
 
 from dotenv import load_dotenv
 load_dotenv()
 
 class TrainPipeline:
-    def __init__(self):
+    def __init__(self, force: bool = False):
+        """
+        force: run every stage even when the stage cache has an artifact for the same inputs
+        """
+        self.force = force
+        self.training_pipeline_config = training_pipeline_config
+        self.stage_cache = StageCache(stage_cache_config=StageCacheConfig())
         self.data_ingestion_config = DataIngestionConfig()
         self.data_validation_config = DataValidationConfig()
         self.data_transformation_config = DataTransformationConfig()
@@ -24,6 +45,24 @@ class TrainPipeline:
         self.model_evaluation_config = ModelEvaluationConfig()
         self.model_pusher_config = ModelPusherConfig()
 
+    def run_memoized_stage(self, stage_name: str, run_stage: Callable[[], object], **key_inputs) -> object:
+        """
+        Runs a stage unless the stage cache has an artifact for the same inputs, key_inputs are passed on to
+        StageCache.compute_key.
+        """
+        try:
+            key = self.stage_cache.compute_key(stage_name, **key_inputs)
+            if not self.force:
+                artifact = self.stage_cache.load(stage_name, key)
+                if artifact is not None:
+                    logging.info(f"Inputs of {stage_name} are unchanged, skipping the stage")
+                    return artifact
+            artifact = run_stage()
+            self.stage_cache.save(stage_name, key, artifact)
+            return artifact
+        except Exception as e:
+            raise visaException(e, sys) from e
+
     def start_data_ingestion(self) -> DataIngestionArtifact:
         """
         Responsible for starting the data ingestion step of the training pipeline
@@ -49,16 +88,23 @@ class TrainPipeline:
                 data_validation_config = self.data_validation_config
             )
 
-            data_validation_artifact = data_validation.initiate_data_validation()
+            data_validation_artifact = self.run_memoized_stage(
+                "data_validation", data_validation.initiate_data_validation,
+                artifacts = [data_ingestion_artifact],
+                configs = [self.data_validation_config],
+                files = [SCHEMA_FILE_PATH],
+                components = [DataValidation, DatasetSketch, SchemaValidator]
+            )
 
             logging.info("Data Validaiton step completed")
             return data_validation_artifact
         except Exception as e:
             raise visaException(e, sys) from e
         
-    def start_data_transformation(self, data_ingestion_artifact: DataIngestionArtifact, data_validation_artifact: DataValidationArtifact) -> DataTransformationArtifact:
+    def start_data_transformation(self, data_ingestion_artifact: DataIngestionArtifact, data_validation_artifact: Optional[DataValidationArtifact] = None) -> DataTransformationArtifact:
         """ 
-        This function starts the data transformation step of the training pipeline
+        This function starts the data transformation step of the training pipeline, without a data validation
+        artifact when the validation runs concurrently
         """
         try:
             data_transformation = DataTransformation(
@@ -67,7 +113,14 @@ class TrainPipeline:
                 data_validation_artifact = data_validation_artifact
             )
         
-            data_transformation_artifact = data_transformation.initiate_data_transformation()
+            data_transformation_artifact = self.run_memoized_stage(
+                "data_transformation", data_transformation.initiate_data_transformation,
+                artifacts = [artifact for artifact in (data_ingestion_artifact, data_validation_artifact) if artifact is not None],
+                configs = [self.data_transformation_config],
+                files = [SCHEMA_FILE_PATH],
+                components = [DataTransformation, DatasetSketch, Resampler, StreamingPreprocessorFit, save_feature_matrix],
+                constants = {"CURRENT_YEAR": CURRENT_YEAR, "TARGET_COLUMN": TARGET_COLUMN}
+            )
             return data_transformation_artifact
         except Exception as e:
             raise visaException(e, sys) from e
@@ -82,12 +135,40 @@ class TrainPipeline:
                 model_trainer_config = self.model_trainer_config
             )
 
-            model_trainer_artifact = model_trainer.initiate_model_trainer()
+            model_trainer_artifact = self.run_memoized_stage(
+                "model_trainer", model_trainer.initiate_model_trainer,
+                artifacts = [data_transformation_artifact],
+                configs = [self.model_trainer_config],
+                files = [self.model_trainer_config.model_config_file_path],
+                components = [ModelTrainer, ModelSearch, save_feature_matrix]
+            )
             return model_trainer_artifact
         except Exception as e:
             raise visaException(e, sys) from e
     
-    def start_model_evaluation(self, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact) -> ModelEvaluationArtifact:
+    def check_data_validation(self, data_validation_artifact: DataValidationArtifact, data_transformation_artifact: DataTransformationArtifact) -> DataTransformationArtifact:
+        """
+        This function is the gate between the speculative data transformation and the model trainer, it passes the
+        transformation artifact on only when the data validation succeeded
+        """
+        try:
+            if not data_validation_artifact.validation_status:
+                raise Exception(data_validation_artifact.message)
+            return data_transformation_artifact
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def prefetch_best_model(self) -> Optional[visaEstimator]:
+        """
+        This function fetches the production model for the model evaluation step while the model is trained
+        """
+        try:
+            return ModelEvaluation.prefetch_best_model(model_eval_config = self.model_evaluation_config)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def start_model_evaluation(self, data_ingestion_artifact: DataIngestionArtifact, model_trainer_artifact: ModelTrainerArtifact,
+                               best_model: Optional[visaEstimator] = None) -> ModelEvaluationArtifact:
         """
         This function starts the model evaluation step of the training pipeline
         """
@@ -95,7 +176,8 @@ class TrainPipeline:
             model_evaluation = ModelEvaluation(
                 model_eval_config = self.model_evaluation_config,
                 data_ingestion_artifact = data_ingestion_artifact,
-                model_trainer_artifact = model_trainer_artifact
+                model_trainer_artifact = model_trainer_artifact,
+                best_model = best_model
             )
             model_evaluation_artifact = model_evaluation.initiate_model_evaluation()
             return model_evaluation_artifact
@@ -117,21 +199,64 @@ class TrainPipeline:
         except Exception as e:
             raise visaException(e, sys) from e
         
+    def start_model_pusher_if_accepted(self, model_evaluation_artifact: ModelEvaluationArtifact) -> Optional[ModelPusherArtifact]:
+        """
+        This function starts the model pusher step when the model evaluation accepted the trained model
+        """
+        if not model_evaluation_artifact.is_model_accepted:
+            logging.info("Trained model is not better than the best model present in S3. Hence, we are not pushing the model to S3")
+            return None
+        return self.start_model_pusher(model_evaluation_artifact = model_evaluation_artifact)
+
+    def get_pipeline_tasks(self) -> List[Task]:
+        """
+        This function returns the training pipeline as a graph of tasks. The validation and the transformation run
+        on threads of the pipeline process so that they share the parsed train and test frames through the artifact
+        cache, the trainer keeps all the cores busy with its own search workers and the production model is fetched
+        while it trains. With speculative transformation the transformation
+        does not wait for the validation, the trainer waits for both through the validation gate.
+        """
+        n_cpus = os.cpu_count() or 1
+        speculative = self.training_pipeline_config.speculative_transformation
+        tasks = [
+            Task("data_ingestion", self.start_data_ingestion, cpus = 1),
+            Task("data_validation", self.start_data_validation, inputs = {"data_ingestion_artifact": "data_ingestion"}),
+            Task("data_transformation", self.start_data_transformation,
+                 inputs = {"data_ingestion_artifact": "data_ingestion"} if speculative else
+                          {"data_ingestion_artifact": "data_ingestion", "data_validation_artifact": "data_validation"}),
+            Task("model_trainer", self.start_model_trainer,
+                 inputs = {"data_transformation_artifact": "validation_gate" if speculative else "data_transformation"},
+                 cpus = n_cpus),
+            Task("prefetch_best_model", self.prefetch_best_model, cpus = 0),
+            Task("model_evaluation", self.start_model_evaluation,
+                 inputs = {"data_ingestion_artifact": "data_ingestion", "model_trainer_artifact": "model_trainer",
+                           "best_model": "prefetch_best_model"}),
+            Task("model_pusher", self.start_model_pusher_if_accepted,
+                 inputs = {"model_evaluation_artifact": "model_evaluation"}, cpus = 0),
+        ]
+        if speculative:
+            tasks.append(Task("validation_gate", self.check_data_validation,
+                              inputs = {"data_validation_artifact": "data_validation",
+                                        "data_transformation_artifact": "data_transformation"}, cpus = 0))
+        return tasks
+
     def run_pipeline(self):
         """
-        Runs the entire training pipeline
+        Runs the entire training pipeline with the DAG scheduler and saves its timing report and the instrumentation
+        report of the stages, with the profiles of the profile_tracks
         """
         try:
-            data_ingestion_artifact = self.start_data_ingestion()
-            data_validation_artifact = self.start_data_validation(data_ingestion_artifact = data_ingestion_artifact)
-            data_transformation_artifact = self.start_data_transformation(data_ingestion_artifact = data_ingestion_artifact, data_validation_artifact = data_validation_artifact)
-            model_trainer_artifact = self.start_model_trainer(data_transformation_artifact = data_transformation_artifact)
-            model_evaluation_artifact = self.start_model_evaluation(data_ingestion_artifact = data_ingestion_artifact, model_trainer_artifact = model_trainer_artifact)
-
-            if not model_evaluation_artifact.is_model_accepted:
-                logging.info("Trained model is not better than the best model present in S3. Hence, we are not pushing the model to S3")
-                return None
-            model_pusher_artifact = self.start_model_pusher(model_evaluation_artifact = model_evaluation_artifact)
-            
+            instrumentation.configure_profiling(self.training_pipeline_config.profile_tracks, self.training_pipeline_config.profile_dir)
+            scheduler = DagScheduler(self.get_pipeline_tasks(), max_workers = self.training_pipeline_config.dag_max_workers)
+            try:
+                results = scheduler.run()
+            finally:
+                report = scheduler.report()
+                write_yaml_file(self.training_pipeline_config.dag_report_file_path, report)
+                instrumentation.save_report(self.training_pipeline_config.instrumentation_report_file_path)
+                logging.info(f"Pipeline wall time {report['wall_seconds']} seconds for {report['serial_seconds']} seconds of tasks, "
+                             f"critical path {' -> '.join(report['critical_path'])}")
+            logging.info(f"Artifact cache statistics of the run: {artifact_cache.stats()}")
+            return results["model_pusher"]
         except Exception as e:
             raise visaException(e, sys)
\ No newline at end of file
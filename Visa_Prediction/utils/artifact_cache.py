@@ -0,0 +1,193 @@
+import copy
+import os
+import sys
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+from pandas import Categorical, CategoricalDtype, DataFrame
+
+from Visa_Prediction.constants import ARTIFACT_CACHE_MAX_BYTES
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.main_utils import read_yaml_file, read_dataframe, load_numpy_array_data
+
+
+def _size_of(obj: object) -> int:
+    """
+    Estimates the memory held by a cached object in bytes.
+    """
+    if isinstance(obj, DataFrame):
+        return int(obj.memory_usage(index=True, deep=True).sum())
+    if isinstance(obj, np.ndarray):
+        return int(obj.nbytes)
+    return sys.getsizeof(obj)
+
+
+def _read_only_frame(frame: DataFrame, columns: Optional[List[str]] = None) -> DataFrame:
+    """
+    Returns a DataFrame over the column buffers of frame, only the given columns when set, without copying them.
+    The buffers are read only views, so an in place edit raises instead of reaching frame, while adding, replacing
+    or dropping columns only changes the returned DataFrame.
+    """
+    data = {}
+    for column in (frame.columns if columns is None else columns):
+        series = frame[column]
+        if isinstance(series.dtype, CategoricalDtype):
+            # the codes of a Categorical are already a read only view
+            data[column] = Categorical.from_codes(series.array.codes, dtype=series.dtype, validate=False)
+        elif isinstance(series.dtype, np.dtype):
+            values = series.to_numpy().view()
+            values.flags.writeable = False
+            data[column] = values
+        else:
+            data[column] = series.array.copy()
+    return DataFrame(data, index=frame.index, copy=False)
+
+
+def _shared_view(obj: object) -> object:
+    """
+    Returns what a caller gets for a cached object. DataFrames and arrays share the cached buffers through read
+    only views, anything else is a deep copy.
+    """
+    if isinstance(obj, DataFrame):
+        return _read_only_frame(obj)
+    if isinstance(obj, np.ndarray):
+        view = obj.view()
+        view.flags.writeable = False
+        return view
+    return copy.deepcopy(obj)
+
+
+class ArtifactCache:
+    """
+    This class keeps the artifacts read by the pipeline stages (train / test frames, transformed arrays, schema.yaml)
+    in memory so that a file which is read by several stages of one run is only parsed once.
+    Entries are keyed by the file path together with its modification time and size, so a rewritten file is read
+    again, and the least recently used entries are evicted once the cache holds more than max_bytes.
+    Stages running on threads at the same time which miss on the same file wait for the one load in flight
+    instead of reading it again.
+    """
+
+    def __init__(self, max_bytes: int = ARTIFACT_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Tuple, Tuple[object, int]]" = OrderedDict()
+        self._loading: Dict[Tuple, threading.Event] = {}
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _file_key(file_path: str, kind: str, extra: Hashable = None) -> Tuple:
+        stat = os.stat(file_path)
+        return (kind, os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, extra)
+
+    def _lookup(self, key: Tuple) -> Optional[object]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            logging.info(f"Artifact cache hit for {key[1]} (hits: {self.hits}, misses: {self.misses})")
+            return entry[0]
+
+    def _store(self, key: Tuple, obj: object) -> None:
+        size = _size_of(obj)
+        with self._lock:
+            if size > self.max_bytes:
+                logging.info(f"Artifact {key[1]} of {size} bytes is larger than the cache, not caching it")
+                return
+            # entries of an older version of the same file can never be hit again
+            for stale_key in [k for k in self._entries if k[:2] == key[:2] and k[2:4] != key[2:4]]:
+                self._evict(stale_key)
+            self._entries[key] = (obj, size)
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: Tuple) -> None:
+        _, size = self._entries.pop(key)
+        self.current_bytes -= size
+        self.evictions += 1
+        logging.info(f"Evicted {key[1]} from the artifact cache ({self.current_bytes} bytes cached)")
+
+    def _wait_for(self, key: Tuple) -> Optional[object]:
+        """
+        Returns the cached object of key, waiting for its load when one is in flight, else None.
+        """
+        while True:
+            with self._lock:
+                obj = self._lookup(key)
+                pending = self._loading.get(key)
+            if obj is not None or pending is None:
+                return obj
+            pending.wait()
+
+    def get(self, file_path: str, loader: Callable[[str], object], kind: str = "object", extra: Hashable = None) -> object:
+        """
+        Returns the artifact at file_path, loading it with loader on a miss.
+        """
+        try:
+            key = self._file_key(file_path, kind, extra)
+            while True:
+                with self._lock:
+                    obj = self._lookup(key)
+                    if obj is not None:
+                        return _shared_view(obj)
+                    pending = self._loading.get(key)
+                    if pending is None:
+                        # this thread loads the file, the others missing on it wait for the load
+                        self._loading[key] = threading.Event()
+                        self.misses += 1
+                        break
+                # the object is not cached when its load failed or it was too large, the next waiter loads it then
+                pending.wait()
+
+            logging.info(f"Artifact cache miss for {key[1]} (hits: {self.hits}, misses: {self.misses})")
+            try:
+                obj = loader(file_path)
+                self._store(key, obj)
+            finally:
+                with self._lock:
+                    self._loading.pop(key).set()
+            return _shared_view(obj)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def read_dataframe(self, file_path: str, columns: Optional[List[str]] = None) -> DataFrame:
+        """
+        Returns the Parquet file at file_path as a DataFrame. When the whole file is already cached, or being read
+        by another stage, the requested columns are selected from it instead of reading the file again.
+        """
+        try:
+            if columns is not None:
+                full_frame = self._wait_for(self._file_key(file_path, "dataframe"))
+                if full_frame is not None:
+                    return _read_only_frame(full_frame, list(columns))
+            extra = tuple(columns) if columns is not None else None
+            return self.get(file_path, lambda path: read_dataframe(path, columns=columns), kind="dataframe", extra=extra)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def read_yaml(self, file_path: str) -> dict:
+        return self.get(file_path, read_yaml_file, kind="yaml")
+
+    def load_numpy_array(self, file_path: str) -> np.ndarray:
+        return self.get(file_path, load_numpy_array_data, kind="numpy")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self.current_bytes}
+
+
+artifact_cache = ArtifactCache()
@@ -0,0 +1,65 @@
+import asyncio
+import functools
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional
+
+from Visa_Prediction.constants import ASYNC_IO_MAX_WORKERS, ASYNC_IO_MAX_CONCURRENCY, ASYNC_IO_TIMEOUT_SECONDS
+from Visa_Prediction.exception import visaException
+
+
+class BoundedThreadRunner:
+    """
+    This class runs blocking I/O calls (boto3, pymongo) on a bounded thread pool from asyncio code. At most
+    max_concurrency calls are in flight at once and every call is awaited with a timeout, so a slow backend
+    neither blocks the event loop nor piles up an unbounded number of threads.
+    A call which times out raises asyncio.TimeoutError in the caller, its thread runs to completion in the
+    background since blocking calls can not be interrupted, and it keeps its slot until then so that calls left
+    running by timeouts still count against max_concurrency.
+    """
+
+    def __init__(self, max_workers: int = ASYNC_IO_MAX_WORKERS, max_concurrency: int = ASYNC_IO_MAX_CONCURRENCY,
+                 timeout_seconds: Optional[float] = ASYNC_IO_TIMEOUT_SECONDS, executor: Optional[ThreadPoolExecutor] = None,
+                 thread_name_prefix: str = "visa-io"):
+        self.timeout_seconds = timeout_seconds
+        self.max_concurrency = max_concurrency
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=thread_name_prefix)
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def run(self, fn: Callable, *args, timeout_seconds: Optional[float] = None, **kwargs):
+        """
+        Runs fn(*args, **kwargs) on the thread pool and returns its result, timeout_seconds overrides the default
+        timeout of the runner for this call.
+        """
+        if self._semaphore is None:
+            # created lazily so that it belongs to the running event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        timeout_seconds = self.timeout_seconds if timeout_seconds is None else timeout_seconds
+        loop = asyncio.get_running_loop()
+        # the timeout covers the wait for a slot as well, slots can be held by calls which already timed out
+        deadline = None if timeout_seconds is None else loop.time() + timeout_seconds
+        await asyncio.wait_for(self._semaphore.acquire(), timeout=timeout_seconds)
+        try:
+            future = self.executor.submit(functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            self._semaphore.release()
+            raise
+        # the slot is released when the call finishes, not when the caller stops waiting for it
+        future.add_done_callback(lambda _: self._release(loop))
+        remaining = None if deadline is None else max(0.0, deadline - loop.time())
+        return await asyncio.wait_for(asyncio.wrap_future(future), timeout=remaining)
+
+    def _release(self, loop: asyncio.AbstractEventLoop) -> None:
+        try:
+            loop.call_soon_threadsafe(self._semaphore.release)
+        except RuntimeError:
+            # the event loop was closed while the call was still running, there is nothing left to release
+            pass
+
+    def shutdown(self, wait: bool = True) -> None:
+        try:
+            if self._owns_executor:
+                self.executor.shutdown(wait=wait)
+        except Exception as e:
+            raise visaException(e, sys) from e
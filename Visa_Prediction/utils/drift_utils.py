@@ -0,0 +1,395 @@
+import bisect
+import sys
+from collections import Counter
+from itertools import zip_longest
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+from scipy import stats
+
+from Visa_Prediction.constants import (DATA_VALIDATION_DRIFT_BINS, DATA_VALIDATION_DRIFT_MAX_CATEGORIES,
+                                       DATA_VALIDATION_DRIFT_P_VALUE_THRESHOLD, DATA_VALIDATION_DRIFT_SHARE_THRESHOLD,
+                                       PREDICTION_DRIFT_SKETCH_CAPACITY)
+from Visa_Prediction.exception import visaException
+
+"""
+Drift is computed from sketches, small summaries of a dataset which are updated one chunk at a time and can be
+merged, so that the reference and the current data never have to be held in memory at once:
+    numerical columns   -> counts over fixed bins whose edges are quantiles of the reference data, used for the
+                           population stability index and a binned Kolmogorov-Smirnov test
+    categorical columns -> counts per category, capped at max_categories, used for a chi-square test
+Live traffic, whose distribution is not known in advance, is sketched with a mergeable quantile sketch which is
+turned into counts over the bins of the reference when the drift report is built.
+"""
+
+PSI_EPSILON = 1e-4
+# below this many rows values are counted in a plain loop, which is cheaper than the vectorized path for tiny chunks
+SMALL_CHUNK_ROWS = 64
+
+
+class NumericSketch:
+    """
+    Histogram of a numerical column over the bins (-inf, edges[0]), [edges[0], edges[1]), ..., [edges[-1], inf).
+    """
+
+    def __init__(self, edges: np.ndarray):
+        self.edges = np.asarray(edges, dtype=np.float64)
+        self.counts = np.zeros(len(self.edges) + 1, dtype=np.int64)
+        self.n_missing = 0
+
+    @classmethod
+    def from_values(cls, values, n_bins: int = DATA_VALIDATION_DRIFT_BINS) -> "NumericSketch":
+        """
+        Returns an empty sketch whose edges are the n_bins quantiles of values.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        values = values[np.isfinite(values)]
+        if len(values) == 0:
+            return cls(np.empty(0))
+        return cls(np.unique(np.quantile(values, np.linspace(0, 1, n_bins + 1)[1:-1])))
+
+    @property
+    def n(self) -> int:
+        return int(self.counts.sum())
+
+    def empty_like(self) -> "NumericSketch":
+        return NumericSketch(self.edges)
+
+    def update(self, values) -> "NumericSketch":
+        if len(values) < SMALL_CHUNK_ROWS:
+            edges = self.edges.tolist()
+            for value in (values.tolist() if hasattr(values, "tolist") else values):
+                if value is None or value is pd.NA or value != value:
+                    self.n_missing += 1
+                else:
+                    self.counts[bisect.bisect_right(edges, value)] += 1
+            return self
+        values = np.asarray(values, dtype=np.float64)
+        missing = np.isnan(values)
+        self.n_missing += int(missing.sum())
+        bins = np.searchsorted(self.edges, values[~missing], side="right")
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+        return self
+
+    def merge(self, other: "NumericSketch") -> "NumericSketch":
+        if not np.array_equal(self.edges, other.edges):
+            raise ValueError("Can not merge numeric sketches with different bin edges")
+        self.counts += other.counts.copy()
+        self.n_missing += other.n_missing
+        return self
+
+
+class QuantileSketch:
+    """
+    Mergeable quantile sketch of several numerical columns, updated for all of them in one vectorized call. It is a
+    hierarchy of compactors in the style of KLL: level h holds values of weight 2**h, and once a level holds more
+    than capacity values per column they are sorted and every other one, from a random offset, is promoted to the
+    next level. Memory grows with the number of levels, log2(n / capacity), and the rank error of a quantile is
+    within a few n / capacity. Missing values are counted exactly, they are sorted last and left out of the
+    quantiles and histograms.
+    The whole state is replaced as one tuple by every update and the arrays it holds are never written once
+    published, so another thread can merge the sketch while it is being updated.
+    """
+
+    def __init__(self, n_columns: int, capacity: int = PREDICTION_DRIFT_SKETCH_CAPACITY, seed: Optional[int] = None):
+        self.n_columns = int(n_columns)
+        self.capacity = max(2, int(capacity))
+        self._rng = np.random.default_rng(seed)
+        # (level 0 buffer, filled length of the buffer, levels 1 and up, missing values per column, rows)
+        self._state = (np.empty((self.n_columns, self.capacity)), 0, (), np.zeros(self.n_columns, dtype=np.int64), 0)
+
+    @property
+    def n(self) -> int:
+        return self._state[4]
+
+    @property
+    def n_missing(self) -> np.ndarray:
+        return self._state[3]
+
+    def empty_like(self) -> "QuantileSketch":
+        return QuantileSketch(self.n_columns, self.capacity)
+
+    def _compact(self, level: np.ndarray):
+        """
+        Returns the values left on a level and the values promoted to the next one.
+        """
+        level = np.sort(level, axis=1)
+        n_pairs = level.shape[1] // 2
+        offsets = self._rng.integers(0, 2, size=(self.n_columns, 1))
+        promoted = np.take_along_axis(level, offsets + 2 * np.arange(n_pairs), axis=1)
+        return level[:, 2 * n_pairs:], promoted
+
+    def _compress(self, levels: List[np.ndarray], n_missing: np.ndarray, n_rows: int) -> tuple:
+        h = 0
+        while h < len(levels):
+            if levels[h].shape[1] > self.capacity:
+                levels[h], promoted = self._compact(levels[h])
+                if h + 1 == len(levels):
+                    levels.append(promoted)
+                else:
+                    levels[h + 1] = np.concatenate([levels[h + 1], promoted], axis=1)
+            h += 1
+        buffer = np.empty((self.n_columns, self.capacity))
+        buffer[:, :levels[0].shape[1]] = levels[0]
+        return buffer, levels[0].shape[1], tuple(levels[1:]), n_missing, n_rows
+
+    def update(self, values: np.ndarray) -> "QuantileSketch":
+        """
+        Adds rows of values, an array of shape (n_rows, n_columns).
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.n_columns)
+        buffer, fill, levels, n_missing, n_rows = self._state
+        n_missing = n_missing + np.isnan(values).sum(axis=0)
+        if fill + len(values) <= self.capacity:
+            # the values land past the filled length, which no published state reads
+            buffer[:, fill:fill + len(values)] = values.T
+            self._state = (buffer, fill + len(values), levels, n_missing, n_rows + len(values))
+        else:
+            level_0 = np.concatenate([buffer[:, :fill], values.T], axis=1)
+            self._state = self._compress([level_0, *levels], n_missing, n_rows + len(values))
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.n_columns != self.n_columns:
+            raise ValueError("Can not merge quantile sketches of a different number of columns")
+        buffer, fill, levels, n_missing, n_rows = self._state
+        other_buffer, other_fill, other_levels, other_n_missing, other_n_rows = other._state
+        empty = np.empty((self.n_columns, 0))
+        merged = [np.concatenate([buffer[:, :fill], other_buffer[:, :other_fill]], axis=1)]
+        merged += [np.concatenate(pair, axis=1) for pair in zip_longest(levels, other_levels, fillvalue=empty)]
+        self._state = self._compress(merged, n_missing + other_n_missing, n_rows + other_n_rows)
+        return self
+
+    def _weighted_values(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the values held by the sketch, an array of shape (n_columns, n_values), with the weight of each.
+        """
+        buffer, fill, levels, _, _ = self._state
+        values = np.concatenate([buffer[:, :fill], *levels], axis=1)
+        weights = np.concatenate([np.ones(fill, dtype=np.int64)] +
+                                 [np.full(level.shape[1], 2 ** h, dtype=np.int64) for h, level in enumerate(levels, start=1)])
+        return values, weights
+
+    def histograms(self, edges: Sequence[np.ndarray]) -> List[np.ndarray]:
+        """
+        Returns the estimated counts of every column over the bins of its edges, laid out like NumericSketch.counts.
+        """
+        values, weights = self._weighted_values()
+        counts = []
+        for column_values, column_edges in zip(values, edges):
+            present = ~np.isnan(column_values)
+            bins = np.searchsorted(column_edges, column_values[present], side="right")
+            counts.append(np.bincount(bins, weights=weights[present], minlength=len(column_edges) + 1).astype(np.int64))
+        return counts
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """
+        Returns the estimated quantiles qs of every column, an array of shape (n_columns, len(qs)), NaN for columns
+        without values.
+        """
+        values, weights = self._weighted_values()
+        result = np.full((self.n_columns, len(qs)), np.nan)
+        for column, column_values in enumerate(values):
+            present = ~np.isnan(column_values)
+            if not present.any():
+                continue
+            order = np.argsort(column_values[present], kind="stable")
+            sorted_values = column_values[present][order]
+            cumulative = np.cumsum(weights[present][order])
+            positions = np.searchsorted(cumulative, np.asarray(qs) * cumulative[-1], side="left")
+            result[column] = sorted_values[np.minimum(positions, len(sorted_values) - 1)]
+        return result
+
+
+class CategoricalSketch:
+    """
+    Counts of the categories of a column. Once max_categories categories are known the counts of new categories
+    are added up in n_other, a sketch with n_other > 0 has overflowed and is not used for drift detection.
+    """
+
+    def __init__(self, max_categories: int = DATA_VALIDATION_DRIFT_MAX_CATEGORIES):
+        self.max_categories = max_categories
+        self.counts: Dict[str, int] = {}
+        self.n_other = 0
+        self.n_missing = 0
+
+    @property
+    def n(self) -> int:
+        return sum(self.counts.values()) + self.n_other
+
+    @property
+    def overflowed(self) -> bool:
+        return self.n_other > 0
+
+    def empty_like(self) -> "CategoricalSketch":
+        return CategoricalSketch(self.max_categories)
+
+    def _add(self, category, count: int) -> None:
+        if category in self.counts:
+            self.counts[category] += count
+        elif len(self.counts) < self.max_categories:
+            self.counts[category] = count
+        else:
+            self.n_other += count
+
+    def update(self, values) -> "CategoricalSketch":
+        if isinstance(getattr(values, "dtype", None), pd.CategoricalDtype):
+            # a Categorical is counted from its codes, missing values have the code -1
+            codes = np.asarray(values.cat.codes if isinstance(values, pd.Series) else values.codes)
+            counts = np.bincount(codes + 1, minlength=len(values.dtype.categories) + 1)
+            self.n_missing += int(counts[0])
+            for index in np.flatnonzero(counts[1:]):
+                self._add(str(values.dtype.categories[index]), int(counts[index + 1]))
+            return self
+        # hashing the values in a Counter is much cheaper than value_counts for the small batches of the scoring path
+        for value, count in Counter(values.tolist() if hasattr(values, "tolist") else values).items():
+            if value is None or value is pd.NA or value != value:
+                self.n_missing += count
+            else:
+                self._add(str(value), count)
+        return self
+
+    def merge(self, other: "CategoricalSketch") -> "CategoricalSketch":
+        # a copy of the counts, other may be updated by another thread while it is merged
+        for category, count in dict(other.counts).items():
+            self._add(category, count)
+        self.n_other += other.n_other
+        self.n_missing += other.n_missing
+        return self
+
+
+class DatasetSketch:
+    """
+    The sketches of the numerical and categorical columns of a dataset.
+    """
+
+    def __init__(self, numeric: Dict[str, NumericSketch], categorical: Dict[str, CategoricalSketch]):
+        self.numeric = numeric
+        self.categorical = categorical
+
+    @classmethod
+    def from_reference(cls, reference_chunk: DataFrame, numerical_columns: List[str], categorical_columns: List[str],
+                       n_bins: int = DATA_VALIDATION_DRIFT_BINS,
+                       max_categories: int = DATA_VALIDATION_DRIFT_MAX_CATEGORIES) -> "DatasetSketch":
+        """
+        Returns an empty sketch whose bin edges are the quantiles of the reference chunk.
+        """
+        return cls(numeric={column: NumericSketch.from_values(reference_chunk[column], n_bins)
+                            for column in numerical_columns},
+                   categorical={column: CategoricalSketch(max_categories) for column in categorical_columns})
+
+    def empty_like(self) -> "DatasetSketch":
+        return DatasetSketch(numeric={column: sketch.empty_like() for column, sketch in self.numeric.items()},
+                             categorical={column: sketch.empty_like() for column, sketch in self.categorical.items()})
+
+    @property
+    def n(self) -> int:
+        sketches = list(self.numeric.values()) + list(self.categorical.values())
+        return sketches[0].n + sketches[0].n_missing if sketches else 0
+
+    def update(self, chunk: DataFrame) -> "DatasetSketch":
+        small_chunk = len(chunk) < SMALL_CHUNK_ROWS
+        for column, sketch in self.numeric.items():
+            sketch.update(chunk[column].tolist() if small_chunk
+                          else chunk[column].to_numpy(dtype=np.float64, na_value=np.nan))
+        for column, sketch in self.categorical.items():
+            sketch.update(chunk[column])
+        return self
+
+    def merge(self, other: "DatasetSketch") -> "DatasetSketch":
+        for column, sketch in self.numeric.items():
+            sketch.merge(other.numeric[column])
+        for column, sketch in self.categorical.items():
+            sketch.merge(other.categorical[column])
+        return self
+
+
+def iter_frame_chunks(df: DataFrame, chunk_rows: int) -> Iterator[DataFrame]:
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows]
+
+
+def sketch_chunks(chunks: Iterable[DataFrame], template: Optional[DatasetSketch] = None,
+                  numerical_columns: Optional[List[str]] = None, categorical_columns: Optional[List[str]] = None,
+                  n_bins: int = DATA_VALIDATION_DRIFT_BINS,
+                  max_categories: int = DATA_VALIDATION_DRIFT_MAX_CATEGORIES) -> DatasetSketch:
+    """
+    Sketches a dataset given as chunks in one pass. The sketch takes its bin edges from template, e.g. the reference
+    sketch when sketching the current data, else from the quantiles of the first chunk.
+    """
+    try:
+        sketch = None if template is None else template.empty_like()
+        for chunk in chunks:
+            if sketch is None:
+                sketch = DatasetSketch.from_reference(chunk, numerical_columns, categorical_columns, n_bins, max_categories)
+            sketch.update(chunk)
+        if sketch is None:
+            raise ValueError("Can not sketch a dataset without chunks")
+        return sketch
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+def _numeric_drift(reference: NumericSketch, current: NumericSketch, p_value_threshold: float) -> dict:
+    if reference.n == 0 or current.n == 0:
+        return {"column_type": "num", "stattest": "ks", "p_value": 1.0, "psi": 0.0, "drift_detected": False}
+    expected = reference.counts / reference.n
+    actual = current.counts / current.n
+    clipped_expected = np.clip(expected, PSI_EPSILON, None)
+    clipped_actual = np.clip(actual, PSI_EPSILON, None)
+    psi = float(np.sum((clipped_actual - clipped_expected) * np.log(clipped_actual / clipped_expected)))
+    # the KS statistic over the bin edges is a lower bound of the exact statistic
+    ks_statistic = float(np.max(np.abs(np.cumsum(expected) - np.cumsum(actual))))
+    n_effective = max(1, round(reference.n * current.n / (reference.n + current.n)))
+    p_value = float(stats.kstwo.sf(ks_statistic, n_effective))
+    return {"column_type": "num", "stattest": "ks", "ks_statistic": round(ks_statistic, 6), "p_value": p_value,
+            "psi": round(psi, 6), "drift_detected": p_value < p_value_threshold}
+
+
+def _categorical_drift(reference: CategoricalSketch, current: CategoricalSketch, p_value_threshold: float) -> dict:
+    if reference.overflowed or current.overflowed:
+        return {"column_type": "cat", "stattest": "skipped", "reason": f"more than {reference.max_categories} categories",
+                "drift_detected": False}
+    categories = sorted(set(reference.counts) | set(current.counts))
+    table = np.array([[reference.counts.get(category, 0) for category in categories],
+                      [current.counts.get(category, 0) for category in categories]])
+    if len(categories) < 2 or table.sum(axis=1).min() == 0:
+        p_value = 1.0
+    else:
+        p_value = float(stats.chi2_contingency(table)[1])
+    return {"column_type": "cat", "stattest": "chisquare", "n_categories": len(categories), "p_value": p_value,
+            "drift_detected": p_value < p_value_threshold}
+
+
+def compare_sketches(reference: DatasetSketch, current: DatasetSketch,
+                     p_value_threshold: float = DATA_VALIDATION_DRIFT_P_VALUE_THRESHOLD,
+                     drift_share_threshold: float = DATA_VALIDATION_DRIFT_SHARE_THRESHOLD) -> dict:
+    """
+    Returns the drift report of current against reference. The dataset has drifted when at least
+    drift_share_threshold of the tested columns have drifted. The numbers are kept under
+    data_drift.data.metrics like in the evidently profile the report replaces.
+    """
+    try:
+        columns = {}
+        for column, sketch in reference.numeric.items():
+            columns[column] = _numeric_drift(sketch, current.numeric[column], p_value_threshold)
+        for column, sketch in reference.categorical.items():
+            columns[column] = _categorical_drift(sketch, current.categorical[column], p_value_threshold)
+
+        tested = [result for result in columns.values() if result["stattest"] != "skipped"]
+        n_drifted_features = sum(result["drift_detected"] for result in tested)
+        share_drifted_features = n_drifted_features / len(tested) if tested else 0.0
+        metrics = {
+            "n_features": len(tested),
+            "n_drifted_features": n_drifted_features,
+            "share_drifted_features": share_drifted_features,
+            "dataset_drift": bool(tested) and share_drifted_features >= drift_share_threshold,
+            "reference_rows": reference.n,
+            "current_rows": current.n,
+            "columns": columns,
+        }
+        return {"data_drift": {"data": {"metrics": metrics}}}
+    except Exception as e:
+        raise visaException(e, sys) from e
@@ -0,0 +1,119 @@
+import os
+import sys
+from typing import Optional
+
+import numpy as np
+from scipy import sparse
+from sklearn.utils import get_tags
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.main_utils import save_numpy_array_data, load_numpy_array_data
+
+"""
+Layouts of the transformed feature matrices:
+    dense -> a 2D NumPy array, saved as .npy and memory mapped when loaded
+    csr   -> the whole matrix as one scipy CSR matrix, saved as .npz. Only the non zero values of the one hot
+             columns are stored, the standardized and Yeo-Johnson columns are dense and are stored with a column
+             index per value. The estimators take a single matrix, so a separate dense block would be stacked
+             with the one hot block into this same CSR matrix on every load.
+Estimators which do not accept sparse input get the matrix densified, see as_estimator_input.
+"""
+
+FEATURE_LAYOUTS = ("dense", "csr")
+SPARSE_FILE_EXTENSION = ".npz"
+# rows densified or sparsified at once when converting a matrix between layouts
+CONVERSION_CHUNK_ROWS = 100_000
+
+
+def check_feature_layout(layout: str) -> str:
+    if layout not in FEATURE_LAYOUTS:
+        raise ValueError(f"Unknown feature layout {layout}, expected one of {list(FEATURE_LAYOUTS)}")
+    return layout
+
+
+def get_feature_layout(X) -> str:
+    return "csr" if sparse.issparse(X) else "dense"
+
+
+def feature_matrix_file_path(file_path: str, layout: str) -> str:
+    """
+    Returns the file path of a matrix of the layout, the .npy file path of the config with the extension of the layout.
+    """
+    root, _ = os.path.splitext(file_path)
+    return root + SPARSE_FILE_EXTENSION if check_feature_layout(layout) == "csr" else file_path
+
+
+def to_feature_matrix(X, layout: str, dtype: Optional[str] = None):
+    """
+    Returns X in the layout and with the dtype when given. Dense matrices, e.g. memory mapped ones, are converted to
+    CSR CONVERSION_CHUNK_ROWS rows at a time so that no second dense copy is made.
+    """
+    try:
+        if check_feature_layout(layout) == "csr":
+            if sparse.issparse(X):
+                X = X.tocsr()
+                return X if dtype is None else X.astype(dtype, copy=False)
+            if len(X) <= CONVERSION_CHUNK_ROWS:
+                return sparse.csr_matrix(np.asarray(X, dtype=dtype))
+            return sparse.vstack([sparse.csr_matrix(np.asarray(X[start:start + CONVERSION_CHUNK_ROWS], dtype=dtype))
+                                  for start in range(0, len(X), CONVERSION_CHUNK_ROWS)], format="csr")
+        if sparse.issparse(X):
+            X = X.toarray()
+        return np.asarray(X) if dtype is None else np.asarray(X).astype(dtype, copy=False)
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+# estimator classes whose densified input was already logged, so that the scoring path logs it only once
+_densified_estimators: set = set()
+
+
+def accepts_sparse(estimator) -> bool:
+    try:
+        return bool(get_tags(estimator).input_tags.sparse)
+    except AttributeError:
+        # estimators which do not implement the sklearn tags, they are given dense input
+        logging.info(f"{type(estimator).__name__} does not implement the sklearn tags, assuming it needs dense input")
+        return False
+
+
+def as_estimator_input(estimator, X):
+    """
+    Returns X as it is for estimators which accept it, sparse matrices are densified for the other estimators.
+    """
+    if sparse.issparse(X) and not accepts_sparse(estimator):
+        name = type(estimator).__name__
+        if name not in _densified_estimators:
+            _densified_estimators.add(name)
+            logging.info(f"{name} does not accept sparse input, the {X.shape} CSR feature matrix is densified for it")
+        return X.toarray()
+    return X
+
+
+def save_feature_matrix(file_path: str, X, dtype: Optional[str] = None) -> None:
+    """
+    Saves a dense matrix with save_numpy_array_data and a sparse matrix as .npz.
+    """
+    try:
+        if not sparse.issparse(X):
+            save_numpy_array_data(file_path, array=X, dtype=dtype)
+            return
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file_obj:
+            sparse.save_npz(file_obj, X if dtype is None else X.astype(dtype, copy=False), compressed=False)
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+def load_feature_matrix(file_path: str, mmap_mode: Optional[str] = None):
+    """
+    Loads a matrix saved with save_feature_matrix, the layout is given by the file extension. mmap_mode only
+    applies to dense matrices.
+    """
+    try:
+        if file_path.endswith(SPARSE_FILE_EXTENSION):
+            return sparse.load_npz(file_path).tocsr()
+        return load_numpy_array_data(file_path, mmap_mode=mmap_mode)
+    except Exception as e:
+        raise visaException(e, sys) from e
@@ -0,0 +1,257 @@
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+import psutil
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+
+try:
+    import resource
+except ImportError:
+    # not available on Windows, the peak RSS then falls back to the RSS sampled at the start and end of a track
+    resource = None
+
+"""
+Measurements of the pipeline stages and of the utilities they call. A track measures a block of code:
+    wall_seconds          elapsed time
+    cpu_seconds           CPU time of the thread running the track, so concurrent tracks on other threads are not counted
+    children_cpu_seconds  CPU time of the child processes which ended during the track, e.g. the search workers
+    peak_rss_bytes        high water mark of the resident memory of the process at the end of the track
+    peak_rss_growth_bytes how much the track raised that high water mark
+    rows                  rows processed, added by the code of the track
+    bytes                 bytes moved, added by the code of the track or by its nested tracks
+The measurements are aggregated per track name, so that hot utilities called many times stay cheap to record.
+"""
+
+
+def _peak_rss_bytes() -> int:
+    if resource is None:
+        return psutil.Process().memory_info().rss
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _children_cpu_seconds() -> float:
+    times = os.times()
+    return times.children_user + times.children_system
+
+
+@dataclass
+class TrackStats:
+    calls: int = 0
+    errors: int = 0
+    wall_seconds: float = 0.0
+    cpu_seconds: float = 0.0
+    children_cpu_seconds: float = 0.0
+    peak_rss_bytes: int = 0
+    peak_rss_growth_bytes: int = 0
+    rows: int = 0
+    bytes: int = 0
+
+    def add(self, other: "TrackStats") -> "TrackStats":
+        self.calls += other.calls
+        self.errors += other.errors
+        self.wall_seconds += other.wall_seconds
+        self.cpu_seconds += other.cpu_seconds
+        self.children_cpu_seconds += other.children_cpu_seconds
+        self.peak_rss_bytes = max(self.peak_rss_bytes, other.peak_rss_bytes)
+        self.peak_rss_growth_bytes = max(self.peak_rss_growth_bytes, other.peak_rss_growth_bytes)
+        self.rows += other.rows
+        self.bytes += other.bytes
+        return self
+
+    def to_dict(self) -> dict:
+        report = asdict(self)
+        report["rows_per_second"] = self.rows / self.wall_seconds if self.wall_seconds else None
+        report["bytes_per_second"] = self.bytes / self.wall_seconds if self.wall_seconds else None
+        return report
+
+
+class Track:
+    """
+    The running measurement of one block, the code of the block adds the rows it processed and the bytes it moved.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.rows = 0
+        self.bytes = 0
+
+    def add_rows(self, rows: int) -> None:
+        self.rows += int(rows)
+
+    def add_bytes(self, n_bytes: int) -> None:
+        self.bytes += int(n_bytes)
+
+
+class Instrumentation:
+    """
+    This class collects the measurements of the tracks of a process. Tracks nest per thread, the bytes of a nested
+    track are added to the enclosing one. The tracks whose name is in profile_names are also run under
+    cProfile and their profile is dumped in pstats format to profile_dir, which snakeviz, pyprof2calltree and the
+    pstats module read.
+    """
+
+    def __init__(self):
+        self.stats: Dict[str, TrackStats] = {}
+        self.profile_names: set = set()
+        self.profile_dir: Optional[str] = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def configure_profiling(self, profile_names: Iterable[str], profile_dir: str) -> None:
+        self.profile_names = set(profile_names)
+        self.profile_dir = profile_dir
+
+    def _stack(self) -> List[Track]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self) -> Optional[Track]:
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    def add_rows(self, rows: int) -> None:
+        """
+        Adds rows to the innermost track of the calling thread, if any.
+        """
+        track = self.current()
+        if track is not None:
+            track.add_rows(rows)
+
+    def add_bytes(self, n_bytes: int) -> None:
+        """
+        Adds bytes to the innermost track of the calling thread, if any.
+        """
+        track = self.current()
+        if track is not None:
+            track.add_bytes(n_bytes)
+
+    def _dump_profile(self, name: str, profiler: cProfile.Profile) -> None:
+        os.makedirs(self.profile_dir, exist_ok=True)
+        file_path = os.path.join(self.profile_dir, f"{name}_{os.getpid()}_{time.strftime('%H_%M_%S')}.prof")
+        profiler.dump_stats(file_path)
+        logging.info(f"Saved the profile of {name} to {file_path}")
+
+    @contextmanager
+    def track(self, name: str, log: bool = False) -> Iterator[Track]:
+        """
+        Measures the block, which can add rows and bytes to the yielded track. log writes the measurement to the log.
+        """
+        track = Track(name)
+        stack = self._stack()
+        stack.append(track)
+        profiler = cProfile.Profile() if name in self.profile_names and self.profile_dir else None
+        failed = False
+        peak_rss_start = _peak_rss_bytes()
+        children_cpu_start = _children_cpu_seconds()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield track
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            if profiler is not None:
+                profiler.disable()
+            wall_seconds = time.perf_counter() - wall_start
+            cpu_seconds = time.thread_time() - cpu_start
+            peak_rss = _peak_rss_bytes()
+            stats = TrackStats(calls=1, errors=int(failed), wall_seconds=wall_seconds, cpu_seconds=cpu_seconds,
+                               children_cpu_seconds=_children_cpu_seconds() - children_cpu_start,
+                               peak_rss_bytes=peak_rss, peak_rss_growth_bytes=peak_rss - peak_rss_start,
+                               rows=track.rows, bytes=track.bytes)
+            stack.pop()
+            if stack:
+                stack[-1].add_bytes(track.bytes)
+            with self._lock:
+                self.stats.setdefault(name, TrackStats()).add(stats)
+            if profiler is not None:
+                self._dump_profile(name, profiler)
+            if log:
+                logging.info(f"Instrumentation of {name}: {stats.to_dict()}")
+
+    def instrument(self, name: Optional[str] = None, rows: Optional[Callable] = None, nbytes: Optional[Callable] = None,
+                   log: bool = False) -> Callable:
+        """
+        Decorator tracking every call of the function under name, by default its qualified name. rows and nbytes are
+        called with the result and the bound arguments of the call, as a dict, and return the rows processed and the
+        bytes moved by the call.
+        """
+        def decorator(fn: Callable) -> Callable:
+            track_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__qualname__}"
+            signature = inspect.signature(fn)
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.track(track_name, log=log) as track:
+                    result = fn(*args, **kwargs)
+                    if rows is not None or nbytes is not None:
+                        arguments = signature.bind(*args, **kwargs).arguments
+                        if rows is not None:
+                            track.add_rows(rows(result, arguments) or 0)
+                        if nbytes is not None:
+                            track.add_bytes(nbytes(result, arguments) or 0)
+                    return result
+            return wrapper
+        return decorator
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats = {}
+
+    def export(self) -> Dict[str, dict]:
+        with self._lock:
+            return {name: asdict(stats) for name, stats in self.stats.items()}
+
+    def merge(self, exported: Dict[str, dict]) -> None:
+        """
+        Adds the measurements exported by another process, e.g. a pipeline task run in a worker process.
+        """
+        with self._lock:
+            for name, stats in exported.items():
+                self.stats.setdefault(name, TrackStats()).add(TrackStats(**stats))
+
+    def report(self) -> dict:
+        with self._lock:
+            return {
+                "pid": os.getpid(),
+                "rss_bytes": psutil.Process().memory_info().rss,
+                "peak_rss_bytes": _peak_rss_bytes(),
+                "tracks": {name: stats.to_dict() for name, stats in sorted(self.stats.items())},
+            }
+
+    def save_report(self, file_path: str) -> None:
+        """
+        Saves the report as JSON.
+        """
+        try:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "w") as file_obj:
+                json.dump(self.report(), file_obj, indent=2)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+
+# the instrumentation of the process, shared by all the modules
+instrumentation = Instrumentation()
+
+
+def file_size(file_path: str) -> int:
+    return os.path.getsize(file_path) if os.path.exists(file_path) else 0
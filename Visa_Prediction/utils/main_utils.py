@@ -4,10 +4,15 @@ import sys
 import numpy as np
 import dill
 import yaml
+import pyarrow as pa
+import pyarrow.parquet as pq
 from pandas import DataFrame
+from typing import Iterator, List, Optional
 
 from Visa_Prediction.exception import visaException
 from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.model_bundle import is_model_bundle, load_model_bundle, save_model_bundle
+from Visa_Prediction.utils.instrumentation import instrumentation, file_size
 
 
 def read_yaml_file(file_path: str) -> dict:
@@ -34,11 +39,19 @@ def write_yaml_file(file_path: str, content: object, replace: bool = False) -> N
 
 
 
+@instrumentation.instrument(nbytes = lambda result, arguments: file_size(arguments["file_path"]))
 def load_object(file_path: str) -> object:
+    """
+    Loads an object saved with save_object, model bundles are recognised by their header and get their arrays
+    memory mapped, anything else is loaded with dill.
+    """
     logging.info("Entered the load_object method of utils")
 
     try:
 
+        if is_model_bundle(file_path):
+            return load_model_bundle(file_path)
+
         with open(file_path, "rb") as file_obj:
             obj = dill.load(file_obj)
 
@@ -51,30 +64,51 @@ def load_object(file_path: str) -> object:
     
 
 
-def save_numpy_array_data(file_path: str, array: np.array):
+@instrumentation.instrument(rows = lambda result, arguments: len(arguments["array"]), nbytes = lambda result, arguments: file_size(arguments["file_path"]))
+def save_numpy_array_data(file_path: str, array: np.array, dtype: Optional[str] = None):
     """
     Save numpy array data to file
     file_path: str location of file to save
     array: np.array data to save
+    dtype: the array is stored with this dtype when given, e.g. float32 to halve the size of feature matrices
     """
     try:
         dir_path = os.path.dirname(file_path)
         os.makedirs(dir_path, exist_ok=True)
+        if dtype is not None:
+            array = np.asarray(array).astype(dtype, copy=False)
         with open(file_path, 'wb') as file_obj:
-            np.save(file_obj, array)
+            np.save(file_obj, np.ascontiguousarray(array))
     except Exception as e:
         raise visaException(e, sys) from e
     
 
 
 
-def load_numpy_array_data(file_path: str) -> np.array:
+def open_numpy_array_memmap(file_path: str, shape: tuple, dtype: str) -> np.memmap:
+    """
+    Create a .npy file of the given shape and dtype and return it memory mapped for writing, so that an array
+    larger than memory can be filled one chunk at a time
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        return np.lib.format.open_memmap(file_path, mode="w+", dtype=dtype, shape=shape)
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+@instrumentation.instrument(rows = lambda result, arguments: len(result), nbytes = lambda result, arguments: file_size(arguments["file_path"]))
+def load_numpy_array_data(file_path: str, mmap_mode: Optional[str] = None) -> np.array:
     """
     load numpy array data from file
     file_path: str location of file to load
+    mmap_mode: the file is memory mapped instead of read into memory when given, "r" maps it read only so that
+    every process reading the file shares the same pages
     return: np.array data loaded
     """
     try:
+        if mmap_mode is not None:
+            return np.load(file_path, mmap_mode=mmap_mode)
         with open(file_path, 'rb') as file_obj:
             return np.load(file_obj)
     except Exception as e:
@@ -83,11 +117,23 @@ def load_numpy_array_data(file_path: str) -> np.array:
 
 
 
-def save_object(file_path: str, obj: object) -> None:
+@instrumentation.instrument(nbytes = lambda result, arguments: file_size(arguments["file_path"]))
+def save_object(file_path: str, obj: object, bundle: bool = False) -> None:
+    """
+    Saves an object with dill, or with bundle as a model bundle whose arrays can be memory mapped on load.
+    If the object can not be bundled it is saved with dill.
+    """
     logging.info("Entered the save_object method of utils")
 
     try:
         os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if bundle:
+            try:
+                save_model_bundle(file_path, obj)
+                logging.info("Exited the save_object method of utils")
+                return
+            except Exception as e:
+                logging.info(f"Could not save the object as a model bundle, saving it with dill: {e}")
         with open(file_path, "wb") as file_obj:
             dill.dump(obj, file_obj)
 
@@ -98,6 +144,68 @@ def save_object(file_path: str, obj: object) -> None:
 
 
 
+@instrumentation.instrument(rows = lambda result, arguments: len(arguments["df"]), nbytes = lambda result, arguments: file_size(arguments["file_path"]))
+def save_dataframe(file_path: str, df: DataFrame, category_columns: Optional[List[str]] = None) -> None:
+    """
+    Save a pandas DataFrame as a Parquet file
+    file_path: str location of file to save
+    df: pandas DataFrame to save
+    category_columns: columns stored with dictionary encoding, the categorical columns of schema.yaml
+    """
+    try:
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        for column in category_columns or []:
+            if column in table.column_names:
+                index = table.schema.get_field_index(column)
+                table = table.set_column(index, column, table.column(index).dictionary_encode())
+        pq.write_table(table, file_path)
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+
+@instrumentation.instrument(rows = lambda result, arguments: len(result), nbytes = lambda result, arguments: file_size(arguments["file_path"]))
+def read_dataframe(file_path: str, columns: Optional[List[str]] = None) -> DataFrame:
+    """
+    Load a Parquet file saved with save_dataframe as a pandas DataFrame
+    file_path: str location of file to load
+    columns: only these columns are read from the file when given
+    return: pandas DataFrame with the dictionary encoded columns as pandas Categoricals, which share one copy of
+            every category instead of a Python string per row
+    """
+    try:
+        return pq.read_table(file_path, columns=columns).to_pandas()
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+def iter_dataframe_batches(file_path: str, columns: Optional[List[str]] = None, batch_rows: int = 100_000) -> Iterator[DataFrame]:
+    """
+    Read a Parquet file saved with save_dataframe as pandas DataFrames of at most batch_rows rows, so that files
+    larger than memory can be processed one batch at a time
+    file_path: str location of file to read
+    columns: only these columns are read from the file when given
+    """
+    try:
+        parquet_file = pq.ParquetFile(file_path)
+        for batch in parquet_file.iter_batches(batch_size=batch_rows, columns=columns):
+            yield pa.Table.from_batches([batch]).to_pandas()
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+def count_dataframe_rows(file_path: str) -> int:
+    """
+    Return the number of rows of a Parquet file from its metadata, without reading the data
+    """
+    try:
+        return pq.ParquetFile(file_path).metadata.num_rows
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+
 def drop_columns(df: DataFrame, cols: list)-> DataFrame:
 
     """
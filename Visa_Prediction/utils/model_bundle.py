@@ -0,0 +1,145 @@
+import io
+import json
+import os
+import struct
+import sys
+from typing import List, Tuple
+
+import dill
+import numpy as np
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+
+"""
+A model bundle is one file made of
+    MAGIC | uint64 manifest length | JSON manifest | skeleton pickle | raw arrays, each aligned to ARRAY_ALIGNMENT
+The skeleton is the dill pickle of the object with every large numeric NumPy array replaced by a reference into
+the manifest, so loading only unpickles the small Python object graph and maps the arrays from the file.
+"""
+
+MAGIC = b"VISABND1"
+ARRAY_ALIGNMENT = 64
+MIN_ARRAY_BYTES = 1024
+
+
+def _align(offset: int) -> int:
+    return (offset + ARRAY_ALIGNMENT - 1) // ARRAY_ALIGNMENT * ARRAY_ALIGNMENT
+
+
+class _BundlePickler(dill.Pickler):
+    """
+    Pickles the object graph, moving the numeric arrays of at least min_array_bytes out of the pickle stream.
+    """
+
+    def __init__(self, file, min_array_bytes: int):
+        super().__init__(file, protocol=4)
+        self.min_array_bytes = min_array_bytes
+        self.arrays: List[np.ndarray] = []
+        self._array_ids = {}
+
+    def persistent_id(self, obj):
+        if (isinstance(obj, np.ndarray) and not obj.dtype.hasobject and obj.nbytes >= self.min_array_bytes):
+            index = self._array_ids.get(id(obj))
+            if index is None:
+                index = len(self.arrays)
+                self._array_ids[id(obj)] = index
+                # keeping the array referenced keeps its id unique for the whole dump
+                self.arrays.append(obj)
+            return ("ndarray", index)
+        return None
+
+
+class _BundleUnpickler(dill.Unpickler):
+    def __init__(self, file, arrays: List[np.ndarray]):
+        super().__init__(file)
+        self.arrays = arrays
+
+    def persistent_load(self, pid):
+        kind, index = pid
+        if kind != "ndarray":
+            raise ValueError(f"Unknown persistent reference {pid} in model bundle")
+        return self.arrays[index]
+
+
+def is_model_bundle(file_path: str) -> bool:
+    with open(file_path, "rb") as file_obj:
+        return file_obj.read(len(MAGIC)) == MAGIC
+
+
+def save_model_bundle(file_path: str, obj: object, min_array_bytes: int = MIN_ARRAY_BYTES) -> None:
+    """
+    Saves the object as a model bundle. The file is written next to its destination and moved in place, so readers
+    never see a partially written bundle.
+    """
+    try:
+        skeleton_buffer = io.BytesIO()
+        pickler = _BundlePickler(skeleton_buffer, min_array_bytes=min_array_bytes)
+        pickler.dump(obj)
+        skeleton = skeleton_buffer.getvalue()
+
+        entries, offset = [], _align(len(skeleton))
+        for array in pickler.arrays:
+            fortran_order = bool(array.flags.f_contiguous and not array.flags.c_contiguous)
+            entries.append({"dtype": np.lib.format.dtype_to_descr(array.dtype), "shape": list(array.shape),
+                            "fortran_order": fortran_order, "offset": offset, "nbytes": int(array.nbytes)})
+            offset = _align(offset + array.nbytes)
+        manifest = json.dumps({"format_version": 1, "object_type": f"{type(obj).__module__}.{type(obj).__name__}",
+                               "skeleton_bytes": len(skeleton), "arrays": entries}).encode()
+
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        tmp_file_path = f"{file_path}.tmp{os.getpid()}"
+        with open(tmp_file_path, "wb") as file_obj:
+            file_obj.write(MAGIC)
+            file_obj.write(struct.pack("<Q", len(manifest)))
+            file_obj.write(manifest)
+            data_start = _align(file_obj.tell())
+            file_obj.write(b"\0" * (data_start - file_obj.tell()))
+            file_obj.write(skeleton)
+            for array, entry in zip(pickler.arrays, entries):
+                file_obj.write(b"\0" * (data_start + entry["offset"] - file_obj.tell()))
+                file_obj.write(np.asfortranarray(array).tobytes(order="F") if entry["fortran_order"]
+                               else np.ascontiguousarray(array).tobytes(order="C"))
+        os.replace(tmp_file_path, file_path)
+        logging.info(f"Saved model bundle {file_path} with {len(entries)} arrays and a {len(skeleton)} byte skeleton")
+    except Exception as e:
+        raise visaException(e, sys) from e
+
+
+def _read_manifest(file_obj) -> Tuple[dict, int]:
+    if file_obj.read(len(MAGIC)) != MAGIC:
+        raise ValueError("File is not a model bundle")
+    (manifest_length,) = struct.unpack("<Q", file_obj.read(8))
+    manifest = json.loads(file_obj.read(manifest_length))
+    return manifest, _align(len(MAGIC) + 8 + manifest_length)
+
+
+def load_model_bundle(file_path: str, mmap: bool = True) -> object:
+    """
+    Loads a model bundle. With mmap the arrays are copy on write memory maps of the file, so they are paged in
+    lazily and shared between the processes loading the same file, else they are read into memory.
+    """
+    try:
+        with open(file_path, "rb") as file_obj:
+            manifest, data_start = _read_manifest(file_obj)
+            file_obj.seek(data_start)
+            skeleton = file_obj.read(manifest["skeleton_bytes"])
+
+            arrays = []
+            for entry in manifest["arrays"]:
+                dtype = np.lib.format.descr_to_dtype(entry["dtype"])
+                shape = tuple(entry["shape"])
+                order = "F" if entry["fortran_order"] else "C"
+                if entry["nbytes"] == 0:
+                    arrays.append(np.empty(shape, dtype=dtype, order=order))
+                elif mmap:
+                    arrays.append(np.memmap(file_path, dtype=dtype, mode="c", offset=data_start + entry["offset"],
+                                            shape=shape, order=order).view(np.ndarray))
+                else:
+                    file_obj.seek(data_start + entry["offset"])
+                    buffer = bytearray(file_obj.read(entry["nbytes"]))
+                    arrays.append(np.ndarray(shape, dtype=dtype, buffer=buffer, order=order))
+
+        return _BundleUnpickler(io.BytesIO(skeleton), arrays).load()
+    except Exception as e:
+        raise visaException(e, sys) from e
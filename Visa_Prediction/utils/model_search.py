@@ -0,0 +1,242 @@
+import importlib
+import math
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+from threadpoolctl import threadpool_limits
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.main_utils import read_yaml_file
+from Visa_Prediction.utils.feature_matrix import as_estimator_input, load_feature_matrix, save_feature_matrix
+
+
+@dataclass
+class SearchCandidate:
+    model_serial_number: str
+    module: str
+    class_name: str
+    params: dict
+
+    def build(self) -> object:
+        model_class = getattr(importlib.import_module(self.module), self.class_name)
+        return model_class(**self.params)
+
+
+@dataclass
+class SearchedBestModel:
+    model_serial_number: str
+    best_model: object
+    best_parameters: dict
+    best_score: float
+    search_report: dict = field(default_factory=dict)
+
+
+# arrays of the search, set once in every worker process (or in the trainer process when running inline)
+_search_data: Dict[str, object] = {}
+
+
+def _init_search_worker(x_file_path: str, y_file_path: str, folds: List[Tuple[np.ndarray, np.ndarray]],
+                        scoring: str, threads_per_worker: Optional[int]) -> None:
+    """
+    Opens the memory mapped training arrays in a worker, so the workers share the page cache instead of each
+    receiving a pickled copy, and caps the BLAS / OpenMP threads of the worker. Sparse matrices are loaded.
+    """
+    _search_data["X"] = load_feature_matrix(x_file_path, mmap_mode="r")
+    _search_data["y"] = np.load(y_file_path, mmap_mode="r")
+    _search_data["folds"] = folds
+    _search_data["scorer"] = get_scorer(scoring)
+    if threads_per_worker is not None:
+        _search_data["thread_limits"] = threadpool_limits(limits=threads_per_worker)
+
+
+def _evaluate_candidate(candidate_index: int, candidate: SearchCandidate, fold_index: int) -> Tuple[int, int, float, float]:
+    """
+    Fits the candidate on the training part of one fold and scores it on the held out part.
+    """
+    X, y = _search_data["X"], _search_data["y"]
+    train_index, test_index = _search_data["folds"][fold_index]
+    started = time.perf_counter()
+    model = candidate.build()
+    model.fit(as_estimator_input(model, X[train_index]), y[train_index])
+    score = _search_data["scorer"](model, as_estimator_input(model, X[test_index]), y[test_index])
+    return candidate_index, fold_index, float(score), time.perf_counter() - started
+
+
+class ModelSearch:
+    """
+    This class searches the parameter grids of all the models of model.yaml at once. Every (candidate, fold) fit is a
+    task of one shared queue which is run on a process pool, the training arrays are memory mapped into the workers
+    and with successive halving only the best fraction of the candidates goes on to the next fold.
+    """
+
+    def __init__(self, model_config_path: str):
+        try:
+            self.config = read_yaml_file(file_path=model_config_path)
+            engine_config = self.config.get("search_engine", {}) or {}
+            self.cv = self.config.get("grid_search", {}).get("params", {}).get("cv", 3)
+            self.n_jobs = engine_config.get("n_jobs", -1)
+            self.threads_per_worker = engine_config.get("threads_per_worker", 1)
+            self.scoring = engine_config.get("scoring", "accuracy")
+            self.successive_halving = engine_config.get("successive_halving", True)
+            self.min_folds = engine_config.get("min_folds", 1)
+            self.halving_factor = engine_config.get("halving_factor", 2)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def get_candidates(self, class_weight: Optional[dict] = None) -> List[SearchCandidate]:
+        """
+        Flattens the parameter grids of all the modules of model.yaml into one list of candidates. class_weight is
+        set on the models which support it, unless model.yaml sets it.
+        """
+        try:
+            candidates = []
+            for model_serial_number, model_config in self.config["model_selection"].items():
+                base_params = dict(model_config.get("params", {}) or {})
+                if class_weight is not None and "class_weight" not in base_params:
+                    model_class = getattr(importlib.import_module(model_config["module"]), model_config["class"])
+                    if "class_weight" in model_class().get_params():
+                        base_params["class_weight"] = class_weight
+                for grid_params in ParameterGrid(model_config.get("search_param_grid", {}) or {}):
+                    candidates.append(SearchCandidate(model_serial_number=model_serial_number,
+                                                      module=model_config["module"],
+                                                      class_name=model_config["class"],
+                                                      params={**base_params, **grid_params}))
+            return candidates
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def _n_workers(self, n_tasks: int) -> int:
+        n_jobs = self.n_jobs if self.n_jobs and self.n_jobs > 0 else (os.cpu_count() or 1)
+        return max(1, min(n_jobs, n_tasks))
+
+    @staticmethod
+    def _shared_file_path(array: np.ndarray, tmp_dir: str, name: str) -> str:
+        """
+        Returns a .npy file holding the array which the workers can memory map, the file the array is already
+        mapped from when it is a whole memory mapped .npy file. Sparse matrices are saved to a .npz file.
+        """
+        if sparse.issparse(array):
+            file_path = os.path.join(tmp_dir, f"{name}.npz")
+            save_feature_matrix(file_path, array)
+            return file_path
+        file_path = getattr(array, "filename", None)
+        if isinstance(array, np.memmap) and file_path and str(file_path).endswith(".npy"):
+            mapped = np.load(file_path, mmap_mode="r")
+            if mapped.shape == array.shape and mapped.dtype == array.dtype and mapped.offset == array.offset:
+                return str(file_path)
+        file_path = os.path.join(tmp_dir, f"{name}.npy")
+        np.save(file_path, np.ascontiguousarray(array))
+        return file_path
+
+    def _run_tasks(self, tasks: List[Tuple[int, int]], candidates: List[SearchCandidate], executor) -> List[Tuple]:
+        if executor is None:
+            with threadpool_limits(limits=self.threads_per_worker):
+                return [_evaluate_candidate(index, candidates[index], fold) for index, fold in tasks]
+        futures = [executor.submit(_evaluate_candidate, index, candidates[index], fold) for index, fold in tasks]
+        return [future.result() for future in futures]
+
+    def search(self, X: np.ndarray, y: np.ndarray,
+               class_weight: Optional[dict] = None) -> Tuple[List[SearchCandidate], np.ndarray, dict]:
+        """
+        Scores the candidates with cross validation and returns them with their fold scores (NaN for the folds a
+        candidate was dropped before) and a report of the search.
+        """
+        try:
+            candidates = self.get_candidates(class_weight=class_weight)
+            folds = list(StratifiedKFold(n_splits=self.cv).split(np.zeros(len(y)), y))
+            scores = np.full((len(candidates), len(folds)), np.nan)
+            alive = np.arange(len(candidates))
+            fit_seconds, rungs = 0.0, []
+            started = time.perf_counter()
+
+            if self.successive_halving:
+                # rung r scores the surviving candidates on fold r, and from the min_folds-th rung on only the best
+                # 1 / halving_factor of them go on to the next fold
+                schedule = [[fold] for fold in range(len(folds))]
+            else:
+                schedule = [list(range(len(folds)))]
+
+            with tempfile.TemporaryDirectory(prefix="visa_search_") as tmp_dir:
+                x_file_path = self._shared_file_path(X, tmp_dir, "X")
+                y_file_path = self._shared_file_path(y, tmp_dir, "y")
+                n_workers = self._n_workers(len(candidates) * len(folds))
+                init_args = (x_file_path, y_file_path, folds, self.scoring, self.threads_per_worker)
+                logging.info(f"Searching {len(candidates)} candidates with {len(folds)} folds on {n_workers} workers")
+
+                if n_workers == 1:
+                    executor = None
+                    _init_search_worker(*init_args[:4], threads_per_worker=None)
+                else:
+                    # the trainer runs on a thread of the pipeline, the workers are spawned as forking a multithreaded
+                    # process can copy locks held by the other threads into them
+                    executor = ProcessPoolExecutor(max_workers=n_workers, mp_context=multiprocessing.get_context("spawn"),
+                                                   initializer=_init_search_worker, initargs=init_args)
+                try:
+                    for rung, rung_folds in enumerate(schedule):
+                        is_last_rung = rung == len(schedule) - 1
+                        tasks = [(index, fold) for index in alive for fold in rung_folds]
+                        for index, fold, score, seconds in self._run_tasks(tasks, candidates, executor):
+                            scores[index, fold] = score
+                            fit_seconds += seconds
+                        rungs.append({"folds": rung_folds, "candidates": int(len(alive))})
+                        logging.info(f"Search rung {rung}: scored {len(alive)} candidates on folds {rung_folds}")
+
+                        if self.successive_halving and not is_last_rung and rung + 1 >= self.min_folds:
+                            mean_scores = np.nanmean(scores[alive], axis=1)
+                            n_keep = max(1, math.ceil(len(alive) / self.halving_factor))
+                            alive = alive[np.argsort(-mean_scores, kind="stable")[:n_keep]]
+                finally:
+                    _search_data.clear()
+                    if executor is not None:
+                        executor.shutdown(wait=True)
+
+            report = {
+                "candidates": len(candidates),
+                "folds": len(folds),
+                "workers": n_workers,
+                "fits": int(np.isfinite(scores).sum()),
+                "full_grid_fits": len(candidates) * len(folds),
+                "fit_seconds": fit_seconds,
+                "wall_seconds": time.perf_counter() - started,
+                "rungs": rungs,
+            }
+            logging.info(f"Model search report: {report}")
+            return candidates, scores, report
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def get_best_model(self, X: np.ndarray, y: np.ndarray, base_accuracy: float = 0.6,
+                       class_weight: Optional[dict] = None) -> SearchedBestModel:
+        """
+        Returns the candidate with the best mean cross validation score among the ones scored on every fold,
+        refitted on the whole training data.
+        """
+        try:
+            candidates, scores, report = self.search(X, y, class_weight=class_weight)
+            complete = np.flatnonzero(np.isfinite(scores).all(axis=1))
+            mean_scores = scores[complete].mean(axis=1)
+            best_index = int(complete[np.argmax(mean_scores)])
+            best_score = float(mean_scores.max())
+            best_candidate = candidates[best_index]
+            logging.info(f"Best candidate: {best_candidate} with a mean {self.scoring} of {best_score}")
+            if best_score < base_accuracy:
+                raise Exception(f"None of the models has a score above the base accuracy of {base_accuracy}, "
+                                f"the best one scored {best_score}")
+
+            best_model = best_candidate.build()
+            best_model.fit(as_estimator_input(best_model, X if sparse.issparse(X) else np.asarray(X)), np.asarray(y))
+            return SearchedBestModel(model_serial_number=best_candidate.model_serial_number, best_model=best_model,
+                                     best_parameters=best_candidate.params, best_score=best_score, search_report=report)
+        except Exception as e:
+            raise visaException(e, sys) from e
@@ -0,0 +1,196 @@
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+from imblearn.over_sampling import SMOTE
+from imblearn.under_sampling import EditedNearestNeighbours
+from sklearn.base import BaseEstimator
+from sklearn.neighbors import NearestNeighbors
+from sklearn.random_projection import GaussianRandomProjection
+from sklearn.utils.class_weight import compute_class_weight
+
+from Visa_Prediction.constants import (DATA_TRANSFORMATION_RESAMPLING_N_JOBS, DATA_TRANSFORMATION_RESAMPLING_NEIGHBORS_ALGORITHM,
+                                       DATA_TRANSFORMATION_RESAMPLING_MAX_CHUNK_BYTES)
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+
+
+@dataclass
+class ResamplingResult:
+    X: np.ndarray
+    y: np.ndarray
+    class_weight: Optional[Dict[int, float]] = None
+    report: dict = field(default_factory=dict)
+
+
+class ProjectedNearestNeighbors(BaseEstimator):
+    """
+    Approximate nearest neighbours: the rows are projected on n_components random Gaussian directions and the
+    neighbours are searched in the projected space, where a kd tree stays efficient. It implements the kneighbors
+    interface used by SMOTE and EditedNearestNeighbours, which only use the neighbour indices.
+    """
+
+    def __init__(self, n_neighbors: int = 5, n_components: int = 8, algorithm: str = "kd_tree",
+                 n_jobs: Optional[int] = None, random_state: Optional[int] = None):
+        self.n_neighbors = n_neighbors
+        self.n_components = n_components
+        self.algorithm = algorithm
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+
+    def fit(self, X, y=None) -> "ProjectedNearestNeighbors":
+        n_components = min(self.n_components, X.shape[1])
+        self.projection_ = GaussianRandomProjection(n_components=n_components, random_state=self.random_state).fit(X)
+        self.nn_ = NearestNeighbors(n_neighbors=self.n_neighbors, algorithm=self.algorithm,
+                                    n_jobs=self.n_jobs).fit(self.projection_.transform(X))
+        return self
+
+    def _project(self, X):
+        return None if X is None else self.projection_.transform(X)
+
+    def kneighbors(self, X=None, n_neighbors=None, return_distance=True):
+        return self.nn_.kneighbors(self._project(X), n_neighbors=n_neighbors, return_distance=return_distance)
+
+    def kneighbors_graph(self, X=None, n_neighbors=None, mode="connectivity"):
+        return self.nn_.kneighbors_graph(self._project(X), n_neighbors=n_neighbors, mode=mode)
+
+
+def _class_counts(y: np.ndarray) -> Dict[int, int]:
+    classes, counts = np.unique(y, return_counts=True)
+    return {int(label): int(count) for label, count in zip(classes, counts)}
+
+
+def stratified_chunks(y: np.ndarray, n_chunks: int, random_state: Optional[int] = None) -> List[np.ndarray]:
+    """
+    Splits the row indices into n_chunks chunks of about the same size which keep the class proportions of y.
+    """
+    rng = np.random.default_rng(random_state)
+    chunks = [[] for _ in range(n_chunks)]
+    for label in np.unique(y):
+        indices = rng.permutation(np.flatnonzero(y == label))
+        for chunk, part in zip(chunks, np.array_split(indices, n_chunks)):
+            chunk.append(part)
+    return [np.sort(np.concatenate(chunk)) for chunk in chunks]
+
+
+class Resampler:
+    """
+    Base class of the resampling strategies of the data transformation. resample returns the rows to train on and
+    the report of the stage, which is timed by run.
+    """
+
+    name = "none"
+
+    def resample(self, X: np.ndarray, y: np.ndarray) -> ResamplingResult:
+        return ResamplingResult(X=X, y=y)
+
+    def run(self, X: np.ndarray, y: np.ndarray) -> ResamplingResult:
+        try:
+            started = time.perf_counter()
+            result = self.resample(X, y)
+            report = {
+                "strategy": self.name,
+                "seconds": time.perf_counter() - started,
+                "rows_before": int(len(y)),
+                "rows_after": int(len(result.y)),
+                "rows_added": 0,
+                "rows_removed": 0,
+                "class_counts_before": _class_counts(y),
+                "class_counts_after": _class_counts(result.y),
+            }
+            report.update(result.report)
+            result.report = report
+            logging.info(f"Resampling report: {report}")
+            return result
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+
+class ClassWeightResampler(Resampler):
+    """
+    Keeps the rows as they are and returns balanced class weights instead, which the model search passes to the
+    models supporting class_weight.
+    """
+
+    name = "class_weight"
+
+    def resample(self, X: np.ndarray, y: np.ndarray) -> ResamplingResult:
+        classes = np.unique(y)
+        weights = compute_class_weight(class_weight="balanced", classes=classes, y=y)
+        class_weight = {int(label): float(weight) for label, weight in zip(classes, weights)}
+        return ResamplingResult(X=X, y=y, class_weight=class_weight, report={"class_weight": class_weight})
+
+
+class SmoteEnnResampler(Resampler):
+    """
+    SMOTE over sampling of the minority class followed by edited nearest neighbours cleaning of all the classes,
+    the same as SMOTEENN(sampling_strategy="minority"), with
+        - the neighbour searches of both steps run on n_jobs threads with the given tree algorithm
+        - approximate neighbours searched in a random projection of the rows
+        - matrices larger than max_chunk_bytes resampled in stratified chunks, each of at most max_chunk_bytes
+    """
+
+    name = "smoteenn"
+
+    def __init__(self, n_jobs: Optional[int] = DATA_TRANSFORMATION_RESAMPLING_N_JOBS,
+                 neighbors_algorithm: str = DATA_TRANSFORMATION_RESAMPLING_NEIGHBORS_ALGORITHM,
+                 approximate_neighbors: bool = False, max_chunk_bytes: int = DATA_TRANSFORMATION_RESAMPLING_MAX_CHUNK_BYTES,
+                 smote_k_neighbors: int = 5, enn_n_neighbors: int = 3, random_state: Optional[int] = None):
+        self.n_jobs = n_jobs
+        self.neighbors_algorithm = neighbors_algorithm
+        self.approximate_neighbors = approximate_neighbors
+        self.max_chunk_bytes = max_chunk_bytes
+        self.smote_k_neighbors = smote_k_neighbors
+        self.enn_n_neighbors = enn_n_neighbors
+        self.random_state = random_state
+
+    def _neighbors(self, n_neighbors: int):
+        if self.approximate_neighbors:
+            return ProjectedNearestNeighbors(n_neighbors=n_neighbors, n_jobs=self.n_jobs, random_state=self.random_state)
+        return NearestNeighbors(n_neighbors=n_neighbors, algorithm=self.neighbors_algorithm, n_jobs=self.n_jobs)
+
+    def _resample_chunk(self, X: np.ndarray, y: np.ndarray):
+        # both samplers count the row itself as a neighbour, hence the + 1
+        smote = SMOTE(sampling_strategy="minority", k_neighbors=self._neighbors(self.smote_k_neighbors + 1),
+                      random_state=self.random_state)
+        enn = EditedNearestNeighbours(sampling_strategy="all", n_neighbors=self._neighbors(self.enn_n_neighbors + 1),
+                                      n_jobs=self.n_jobs)
+        X_over, y_over = smote.fit_resample(X, y)
+        X_clean, y_clean = enn.fit_resample(X_over, y_over)
+        return X_clean, y_clean, len(y_over) - len(y), len(y_over) - len(y_clean)
+
+    def resample(self, X: np.ndarray, y: np.ndarray) -> ResamplingResult:
+        X, y = np.asarray(X), np.asarray(y)
+        n_chunks = max(1, int(np.ceil(X.nbytes / self.max_chunk_bytes)))
+        chunks = [np.arange(len(y))] if n_chunks == 1 else stratified_chunks(y, n_chunks, self.random_state)
+        X_parts, y_parts, rows_added, rows_removed = [], [], 0, 0
+        for chunk in chunks:
+            X_chunk, y_chunk, added, removed = self._resample_chunk(X[chunk], y[chunk])
+            X_parts.append(X_chunk)
+            y_parts.append(y_chunk)
+            rows_added += added
+            rows_removed += removed
+        return ResamplingResult(X=np.concatenate(X_parts), y=np.concatenate(y_parts),
+                                report={"rows_added": rows_added, "rows_removed": rows_removed, "chunks": len(chunks),
+                                        "approximate_neighbors": self.approximate_neighbors})
+
+
+RESAMPLING_STRATEGIES = {
+    Resampler.name: Resampler,
+    ClassWeightResampler.name: ClassWeightResampler,
+    SmoteEnnResampler.name: SmoteEnnResampler,
+}
+
+
+def get_resampler(strategy: str, **options) -> Resampler:
+    """
+    Returns the resampler of the strategy, options are passed on to the strategies taking them.
+    """
+    try:
+        resampler_class = RESAMPLING_STRATEGIES[strategy]
+        return resampler_class(**options) if resampler_class is SmoteEnnResampler else resampler_class()
+    except KeyError:
+        raise visaException(ValueError(f"Unknown resampling strategy {strategy}, expected one of "
+                                       f"{sorted(RESAMPLING_STRATEGIES)}"), sys)
@@ -0,0 +1,207 @@
+import sys
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pandas import DataFrame
+
+from Visa_Prediction.constants import SCHEMA_FILE_PATH
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.utils.main_utils import read_yaml_file
+
+
+class SchemaValidationError(ValueError):
+    """
+    Raised for records which violate the schema.
+    """
+
+
+@dataclass
+class SchemaValidationResult:
+    """
+    Outcome of a validation. rule_counts counts the offending rows per rule, named <column>:<check>, and
+    invalid_row_bitmap has one bit per row (np.packbits order) set for the rows violating any rule. rule_bitmaps
+    holds a bitmap of the same layout for every rule violated by at least one row.
+    """
+    n_rows: int
+    rule_counts: Dict[str, int]
+    missing_columns: List[str]
+    invalid_row_bitmap: np.ndarray = field(repr=False)
+    rule_bitmaps: Dict[str, np.ndarray] = field(default_factory=dict, repr=False)
+
+    @property
+    def n_invalid_rows(self) -> int:
+        return int(np.unpackbits(self.invalid_row_bitmap, count=self.n_rows).sum())
+
+    @property
+    def is_valid(self) -> bool:
+        return not self.missing_columns and not self.invalid_row_bitmap.any()
+
+    def invalid_row_mask(self) -> np.ndarray:
+        return np.unpackbits(self.invalid_row_bitmap, count=self.n_rows).astype(bool)
+
+    def invalid_rows(self) -> np.ndarray:
+        return np.flatnonzero(self.invalid_row_mask())
+
+    def violated_rules(self) -> Dict[int, List[str]]:
+        """
+        Returns the sorted rules violated by every invalid row, keyed by the position of the row.
+        """
+        violations: Dict[int, List[str]] = {}
+        for rule in sorted(self.rule_bitmaps):
+            for position in np.flatnonzero(np.unpackbits(self.rule_bitmaps[rule], count=self.n_rows)).tolist():
+                violations.setdefault(position, []).append(rule)
+        return violations
+
+    def summary(self, max_rows: int = 10) -> dict:
+        """
+        Returns the counts of the violated rules and the first max_rows offending rows, for reports and error messages.
+        """
+        return {
+            "n_rows": self.n_rows,
+            "n_invalid_rows": self.n_invalid_rows,
+            "missing_columns": self.missing_columns,
+            "rule_counts": {rule: count for rule, count in self.rule_counts.items() if count},
+            "invalid_rows": self.invalid_rows()[:max_rows].tolist(),
+        }
+
+
+def _pack_positions(positions: np.ndarray, n_rows: int) -> np.ndarray:
+    """
+    Returns the bitmap of n_rows bits, in np.packbits order, with the bits at positions set.
+    """
+    bitmap = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+    np.bitwise_or.at(bitmap, positions // 8, (np.uint8(128) >> (positions % 8)).astype(np.uint8))
+    return bitmap
+
+
+class SchemaValidator:
+    """
+    This class compiles the columns, domains and ranges sections of schema.yaml into per column checks which are
+    applied with vectorized masks, one chunk at a time:
+        <column>:null   the value is missing
+        <column>:type   the value of a numerical column is not a number
+        <column>:domain the value of a categorical column is not one of its domain values
+        <column>:range  the value of a numerical column is outside its [min, max] range
+    """
+
+    def __init__(self, schema_config: dict, columns: Optional[List[str]] = None):
+        """
+        :param schema_config: Content of schema.yaml
+        :param columns: Columns to validate, all the schema columns when not given
+        """
+        try:
+            column_types = {}
+            for column in schema_config["columns"]:
+                column_types.update(column)
+            self.columns = list(columns) if columns is not None else list(column_types)
+            self.column_types = {column: column_types[column] for column in self.columns}
+            self.domains = {column: np.array(values, dtype=object)
+                            for column, values in (schema_config.get("domains") or {}).items() if column in self.column_types}
+            self.ranges = {column: (bounds.get("min"), bounds.get("max"))
+                           for column, bounds in (schema_config.get("ranges") or {}).items() if column in self.column_types}
+            self.nullable_columns = set(schema_config.get("nullable_columns") or [])
+            self.rules = self._compile_rules()
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    @classmethod
+    def from_schema_file(cls, file_path: str = SCHEMA_FILE_PATH, columns: Optional[List[str]] = None) -> "SchemaValidator":
+        return cls(read_yaml_file(file_path=file_path), columns=columns)
+
+    def _compile_rules(self) -> List[str]:
+        rules = []
+        for column, column_type in self.column_types.items():
+            if column not in self.nullable_columns:
+                rules.append(f"{column}:null")
+            if column_type != "category":
+                rules.append(f"{column}:type")
+            if column in self.domains:
+                rules.append(f"{column}:domain")
+            if column in self.ranges:
+                rules.append(f"{column}:range")
+        return rules
+
+    def _column_masks(self, column: str, series: pd.Series) -> Dict[str, np.ndarray]:
+        """
+        Returns the mask of offending rows of every rule of the column. The masks are computed on the NumPy values of
+        the column, which keeps the fixed cost per chunk low enough for single record batches.
+        """
+        masks = {}
+        if isinstance(series.dtype, pd.CategoricalDtype) and column in self.domains:
+            # only the categories are looked up, the rows take the result of their category code
+            codes = series.cat.codes.to_numpy()
+            missing = codes < 0
+            if column not in self.nullable_columns:
+                masks[f"{column}:null"] = missing
+            unknown_categories = ~pd.Index(series.cat.categories).isin(self.domains[column])
+            masks[f"{column}:domain"] = unknown_categories[codes] & ~missing if len(unknown_categories) else np.zeros(len(codes), dtype=bool)
+            return masks
+        values = series.to_numpy()
+        missing = pd.isna(values)
+        if column not in self.nullable_columns:
+            masks[f"{column}:null"] = missing
+        if self.column_types[column] != "category":
+            if values.dtype.kind in "iuf":
+                numbers = values.astype(np.float64, copy=False)
+            elif values.dtype.kind == "b":
+                numbers = np.full(len(values), np.nan)
+            else:
+                numbers = np.asarray(pd.to_numeric(values, errors="coerce"), dtype=np.float64)
+            masks[f"{column}:type"] = np.isnan(numbers) & ~missing
+            if column in self.ranges:
+                lower, upper = self.ranges[column]
+                out_of_range = np.zeros(len(values), dtype=bool)
+                if lower is not None:
+                    out_of_range |= numbers < lower
+                if upper is not None:
+                    out_of_range |= numbers > upper
+                masks[f"{column}:range"] = out_of_range
+        if column in self.domains:
+            masks[f"{column}:domain"] = ~pd.Index(values).isin(self.domains[column]) & ~missing
+        return masks
+
+    def validate_chunk(self, chunk: DataFrame) -> Tuple[Dict[str, np.ndarray], List[str]]:
+        """
+        Validates one chunk, returns the mask of offending rows per rule and the missing columns.
+        """
+        rule_masks = {}
+        missing_columns = [column for column in self.columns if column not in chunk.columns]
+        for column in self.columns:
+            if column not in missing_columns:
+                rule_masks.update(self._column_masks(column, chunk[column]))
+        return rule_masks, missing_columns
+
+    def validate(self, chunks: Iterable[DataFrame]) -> SchemaValidationResult:
+        """
+        Validates a dataset given as chunks in one pass. Only the positions of the offending rows of every rule are
+        kept while chunks are validated, the bitmaps are built at the end.
+        """
+        try:
+            rule_positions: Dict[str, List[np.ndarray]] = {rule: [] for rule in self.rules}
+            missing_columns: List[str] = []
+            n_rows = 0
+            for chunk in chunks:
+                rule_masks, chunk_missing_columns = self.validate_chunk(chunk)
+                for rule, mask in rule_masks.items():
+                    positions = np.flatnonzero(mask)
+                    if len(positions):
+                        rule_positions[rule].append(positions + n_rows)
+                missing_columns.extend(column for column in chunk_missing_columns if column not in missing_columns)
+                n_rows += len(chunk)
+
+            rule_counts = {rule: sum(len(chunk_positions) for chunk_positions in positions)
+                           for rule, positions in rule_positions.items()}
+            rule_bitmaps = {rule: _pack_positions(np.concatenate(positions), n_rows)
+                            for rule, positions in rule_positions.items() if positions}
+            bitmap = np.zeros((n_rows + 7) // 8, dtype=np.uint8)
+            for rule_bitmap in rule_bitmaps.values():
+                bitmap |= rule_bitmap
+            return SchemaValidationResult(n_rows=n_rows, rule_counts=rule_counts, missing_columns=missing_columns,
+                                          invalid_row_bitmap=bitmap, rule_bitmaps=rule_bitmaps)
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def validate_frame(self, dataframe: DataFrame) -> SchemaValidationResult:
+        return self.validate([dataframe])
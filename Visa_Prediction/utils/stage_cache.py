@@ -0,0 +1,173 @@
+import dataclasses
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from typing import Iterable, List, Optional
+
+from Visa_Prediction.constants import ARTIFACT_DIR
+from Visa_Prediction.entity.config_entity import StageCacheConfig, training_pipeline_config
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.logger import logging
+from Visa_Prediction.utils.main_utils import load_object, save_object
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """
+    Returns the sha256 of the content of a file.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as file_obj:
+        for chunk in iter(lambda: file_obj.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_file_paths(artifact: object) -> List[str]:
+    """
+    Returns the local file paths referenced by an artifact dataclass, the fields named *_file_path, including the ones
+    of nested artifacts.
+    """
+    paths = []
+    for field in dataclasses.fields(artifact):
+        value = getattr(artifact, field.name)
+        if dataclasses.is_dataclass(value):
+            paths.extend(artifact_file_paths(value))
+        elif field.name.endswith("file_path") and isinstance(value, str):
+            paths.append(value)
+    return paths
+
+
+class StageCache:
+    """
+    This class memoizes the artifacts of the training pipeline stages on disk. Each stage output is stored under a
+    key which is the sha256 of everything the stage reads: the content of the files referenced by the upstream
+    artifacts, the config files, the stage config (without the paths of the current run) and the source of the
+    component. Since the key depends on content and not on the run timestamp, a rerun with unchanged inputs finds
+    the artifact of the previous run and the stage can be skipped.
+    """
+
+    def __init__(self, stage_cache_config: StageCacheConfig = StageCacheConfig()):
+        self.stage_cache_config = stage_cache_config
+
+    @staticmethod
+    def _config_content(config: object) -> dict:
+        # the paths under the current run directory change on every run and are not inputs of the stage
+        return {name: value for name, value in dataclasses.asdict(config).items()
+                if not (isinstance(value, str) and value.startswith(training_pipeline_config.artifact_dir))}
+
+    def compute_key(self, stage_name: str, artifacts: Iterable[object] = (), configs: Iterable[object] = (),
+                    files: Iterable[str] = (), components: Iterable[type] = (), constants: Optional[dict] = None) -> str:
+        """
+        Computes the content address of one execution of a stage from its inputs.
+        """
+        try:
+            digest = hashlib.sha256(stage_name.encode())
+            for artifact in artifacts:
+                # reports describe how an upstream stage ran, e.g. its timings, they are not inputs of the stage
+                fields = {name: value for name, value in dataclasses.asdict(artifact).items()
+                          if not name.endswith(("file_path", "_report"))}
+                digest.update(json.dumps(fields, sort_keys=True, default=str).encode())
+                for file_path in artifact_file_paths(artifact):
+                    digest.update(hash_file(file_path).encode())
+            for config in configs:
+                digest.update(json.dumps(self._config_content(config), sort_keys=True, default=str).encode())
+            for file_path in files:
+                digest.update(hash_file(file_path).encode())
+            for component in components:
+                digest.update(hash_file(inspect.getsourcefile(component)).encode())
+            digest.update(json.dumps(constants or {}, sort_keys=True, default=str).encode())
+            return digest.hexdigest()
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def _entry_path(self, stage_name: str, key: str) -> str:
+        return os.path.join(self.stage_cache_config.stage_cache_dir, stage_name, f"{key}.pkl")
+
+    def load(self, stage_name: str, key: str) -> Optional[object]:
+        """
+        Returns the stored artifact of the stage for the key, None when there is no entry or when a file referenced
+        by the stored artifact does not exist anymore.
+        """
+        try:
+            entry_path = self._entry_path(stage_name, key)
+            if not os.path.exists(entry_path):
+                logging.info(f"Stage cache miss for {stage_name} with key {key[:12]}")
+                return None
+            artifact = load_object(entry_path)["artifact"]
+            missing = [path for path in artifact_file_paths(artifact) if not os.path.exists(path)]
+            if missing:
+                logging.info(f"Stage cache entry of {stage_name} references missing files {missing}, removing it")
+                os.remove(entry_path)
+                return None
+            os.utime(entry_path)
+            logging.info(f"Stage cache hit for {stage_name} with key {key[:12]}, reusing {artifact}")
+            return artifact
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def save(self, stage_name: str, key: str, artifact: object) -> None:
+        try:
+            save_object(self._entry_path(stage_name, key), {"artifact": artifact, "created_at": time.time()})
+            logging.info(f"Stored the {stage_name} artifact in the stage cache with key {key[:12]}")
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def gc(self, keep_per_stage: Optional[int] = None, remove_unreferenced_runs: bool = True) -> dict:
+        """
+        Removes the entries whose files are gone and all but the keep_per_stage (by default the configured number)
+        most recently used entries of every stage. With remove_unreferenced_runs the run directories under the
+        artifact directory which are not referenced by any remaining entry are removed as well, except the directory
+        of the current run.
+        """
+        try:
+            cache_dir = self.stage_cache_config.stage_cache_dir
+            if keep_per_stage is None:
+                keep_per_stage = self.stage_cache_config.keep_per_stage
+            removed_entries, referenced_runs = 0, set()
+            stage_names = os.listdir(cache_dir) if os.path.isdir(cache_dir) else []
+            for stage_name in stage_names:
+                stage_dir = os.path.join(cache_dir, stage_name)
+                entry_paths = sorted((os.path.join(stage_dir, name) for name in os.listdir(stage_dir)),
+                                     key=os.path.getmtime, reverse=True)
+                for rank, entry_path in enumerate(entry_paths):
+                    try:
+                        paths = artifact_file_paths(load_object(entry_path)["artifact"])
+                    except Exception:
+                        paths = None
+                    if paths is None or rank >= keep_per_stage or not all(os.path.exists(path) for path in paths):
+                        os.remove(entry_path)
+                        removed_entries += 1
+                        continue
+                    for path in paths:
+                        relative = os.path.relpath(os.path.abspath(path), os.path.abspath(ARTIFACT_DIR))
+                        referenced_runs.add(relative.split(os.sep)[0])
+
+            removed_runs = []
+            if remove_unreferenced_runs and os.path.isdir(ARTIFACT_DIR):
+                keep = referenced_runs | {os.path.basename(training_pipeline_config.artifact_dir),
+                                          os.path.basename(os.path.normpath(cache_dir))}
+                for name in os.listdir(ARTIFACT_DIR):
+                    run_dir = os.path.join(ARTIFACT_DIR, name)
+                    # run directories are named by the pipeline timestamp, anything else is left alone
+                    if name in keep or not os.path.isdir(run_dir) or not self._is_run_dir_name(name):
+                        continue
+                    shutil.rmtree(run_dir)
+                    removed_runs.append(name)
+
+            report = {"removed_entries": removed_entries, "removed_runs": removed_runs}
+            logging.info(f"Stage cache garbage collection: {report}")
+            return report
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    @staticmethod
+    def _is_run_dir_name(name: str) -> bool:
+        try:
+            time.strptime(name, "%m_%d_%Y_%H_%M_%S")
+            return True
+        except ValueError:
+            return False
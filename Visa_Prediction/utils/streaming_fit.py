@@ -0,0 +1,113 @@
+import sys
+from typing import Dict, List, Optional
+
+import numpy as np
+from pandas import DataFrame
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import StandardScaler
+
+from Visa_Prediction.constants import DATA_TRANSFORMATION_STREAMING_SAMPLE_ROWS
+from Visa_Prediction.exception import visaException
+
+"""
+The statistics of the preprocessor are fitted in one pass over a dataset given as chunks, so that the training data
+never has to be held in memory at once:
+    categorical columns -> the vocabularies of the one hot and ordinal encoders, exact
+    numerical columns   -> the mean and variance of the StandardScaler, exact, updated per chunk with partial_fit
+    transform columns   -> the Yeo-Johnson lambdas, estimated on a uniform reservoir sample of the rows
+"""
+
+
+class ReservoirSample:
+    """
+    Uniform sample of at most n_rows rows of a dataset given as chunks (reservoir sampling, algorithm R). The rows
+    are kept as one NumPy array per column.
+    """
+
+    def __init__(self, n_rows: int = DATA_TRANSFORMATION_STREAMING_SAMPLE_ROWS, random_state: Optional[int] = None):
+        self.n_rows = n_rows
+        self.n_seen = 0
+        self._rng = np.random.default_rng(random_state)
+        self._columns: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return min(self.n_seen, self.n_rows)
+
+    def update(self, chunk: DataFrame) -> "ReservoirSample":
+        n_fill = min(self.n_rows - len(self), len(chunk))
+        if n_fill:
+            for column in chunk.columns:
+                values = chunk[column].to_numpy()[:n_fill]
+                self._columns[column] = (np.concatenate([self._columns[column], values]) if column in self._columns
+                                         else values.copy())
+        n_rest = len(chunk) - n_fill
+        if n_rest:
+            # row t of the stream replaces a uniformly chosen slot with probability n_rows / (t + 1)
+            positions = np.arange(self.n_seen + n_fill, self.n_seen + len(chunk))
+            slots = self._rng.integers(0, positions + 1)
+            rows = np.flatnonzero(slots < self.n_rows)
+            slots = slots[rows]
+            # a slot drawn by several rows of the chunk takes the last of them
+            _, last = np.unique(slots[::-1], return_index=True)
+            rows, slots = rows[::-1][last] + n_fill, slots[::-1][last]
+            for column in chunk.columns:
+                self._columns[column][slots] = chunk[column].to_numpy()[rows]
+        self.n_seen += len(chunk)
+        return self
+
+    @property
+    def sample(self) -> DataFrame:
+        return DataFrame(self._columns)
+
+
+class StreamingPreprocessorFit:
+    """
+    Accumulates the statistics of the preprocessor of the data transformation over chunks of the training features.
+    finalize fits the preprocessor on the reservoir sample with the accumulated vocabularies and replaces its
+    StandardScaler by the one fitted on all the rows, the result is a fitted ColumnTransformer like the one of an in
+    memory fit. When the dataset is not larger than the sample the result is the same as the in memory fit.
+    """
+
+    def __init__(self, oh_columns: List[str], or_columns: List[str], num_features: List[str],
+                 sample_rows: int = DATA_TRANSFORMATION_STREAMING_SAMPLE_ROWS, random_state: Optional[int] = None):
+        self.num_features = list(num_features)
+        self.vocabularies: Dict[str, set] = {column: set() for column in dict.fromkeys(list(oh_columns) + list(or_columns))}
+        self.scaler = StandardScaler()
+        self.reservoir = ReservoirSample(sample_rows, random_state)
+
+    @property
+    def n_rows(self) -> int:
+        return self.reservoir.n_seen
+
+    def partial_fit(self, chunk: DataFrame) -> "StreamingPreprocessorFit":
+        try:
+            for column, vocabulary in self.vocabularies.items():
+                vocabulary.update(chunk[column].dropna().unique().tolist())
+            self.scaler.partial_fit(chunk[self.num_features])
+            self.reservoir.update(chunk)
+            return self
+        except Exception as e:
+            raise visaException(e, sys) from e
+
+    def categories(self) -> Dict[str, list]:
+        """
+        Returns the sorted vocabulary of every categorical column, the order in which the encoders of an in memory
+        fit number the categories.
+        """
+        return {column: sorted(vocabulary) for column, vocabulary in self.vocabularies.items()}
+
+    def finalize(self, preprocessor: ColumnTransformer) -> ColumnTransformer:
+        """
+        Fits preprocessor, built with the categories of this fit, on the reservoir sample and swaps in the streamed
+        StandardScaler of the numerical features.
+        """
+        try:
+            if self.n_rows == 0:
+                raise ValueError("Can not fit the preprocessor without rows")
+            preprocessor.fit(self.reservoir.sample)
+            for index, (name, transformer, columns) in enumerate(preprocessor.transformers_):
+                if isinstance(transformer, StandardScaler) and list(columns) == self.num_features:
+                    preprocessor.transformers_[index] = (name, self.scaler, columns)
+            return preprocessor
+        except Exception as e:
+            raise visaException(e, sys) from e
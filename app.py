@@ -0,0 +1,142 @@
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import List, Optional
+import asyncio
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from Visa_Prediction.cloud_storage.async_storage import AsyncSimpleStorageService
+from Visa_Prediction.constants import APP_HOST, APP_PORT
+from Visa_Prediction.entity.config_entity import VisaPredictionConfig
+from Visa_Prediction.logger import logging
+from Visa_Prediction.pipeline.micro_batcher import MicroBatcher
+from Visa_Prediction.pipeline.prediction_pipeline import VisaClassifier
+from Visa_Prediction.utils.schema_validator import SchemaValidationError
+
+from dotenv import load_dotenv
+load_dotenv()
+
+
+class VisaApplication(BaseModel):
+    case_id: Optional[str] = None
+    continent: str
+    education_of_employee: str
+    has_job_experience: str
+    requires_job_training: str
+    no_of_employees: int
+    yr_of_estab: int
+    region_of_employment: str
+    prevailing_wage: float
+    unit_of_wage: str
+    full_time_position: str
+
+
+prediction_config = VisaPredictionConfig()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Loads the model off the event loop, starts the model refresher and the micro batcher, then drains them on shutdown.
+    """
+    executor = ThreadPoolExecutor(max_workers=prediction_config.worker_threads, thread_name_prefix="visa-predict")
+    classifier = VisaClassifier(prediction_pipeline_config=prediction_config)
+    await asyncio.get_running_loop().run_in_executor(executor, classifier.get_model)
+    classifier.start_model_refresher()
+
+    batcher = MicroBatcher(
+        predict_fn=classifier.predict_labels_or_errors,
+        max_batch_size=prediction_config.micro_batch_max_size,
+        max_wait_ms=prediction_config.micro_batch_max_wait_ms,
+        max_concurrent_batches=prediction_config.worker_threads,
+        executor=executor,
+    )
+    await batcher.start()
+
+    app.state.storage = AsyncSimpleStorageService()
+    app.state.executor = executor
+    app.state.classifier = classifier
+    app.state.batcher = batcher
+    try:
+        yield
+    finally:
+        await batcher.stop()
+        classifier.stop_model_refresher()
+        app.state.storage.close()
+        executor.shutdown(wait=True)
+
+
+app = FastAPI(lifespan=lifespan)
+
+
+@app.post("/predict")
+async def predict(application: VisaApplication):
+    """
+    Scores one application, coalescing it with the other concurrent requests into one micro batch.
+    """
+    try:
+        case_status = await app.state.batcher.submit(dict(application))
+        return {"case_status": case_status}
+    except SchemaValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except Exception as e:
+        # the exception message names server files and lines, it is only logged
+        logging.error(f"Prediction failed: {e}")
+        raise HTTPException(status_code=500, detail="Prediction failed")
+
+
+@app.post("/predict/batch")
+async def predict_batch(applications: List[VisaApplication]):
+    """
+    Scores a list of applications in one call on a worker thread. When any application violates the schema the
+    request is rejected with the errors of the invalid applications and their positions.
+    """
+    try:
+        records = [dict(application) for application in applications]
+        case_status = await asyncio.get_running_loop().run_in_executor(
+            app.state.executor, app.state.classifier.predict_labels_or_errors, records
+        )
+    except Exception as e:
+        logging.error(f"Batch prediction failed: {e}")
+        raise HTTPException(status_code=500, detail="Batch prediction failed")
+    errors = [{"index": index, "error": str(label)} for index, label in enumerate(case_status)
+              if isinstance(label, SchemaValidationError)]
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
+    return {"case_status": case_status}
+
+
+@app.get("/model")
+async def model_status():
+    """
+    Compares the model being served with the latest model in the s3 model registry without blocking the event loop.
+    """
+    try:
+        head = await app.state.storage.head_object(bucket_name=prediction_config.model_bucket_patt,
+                                                   s3_key=prediction_config.model_file_path)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Timed out reaching the s3 model registry")
+    except Exception as e:
+        logging.error(f"Model registry check failed: {e}")
+        raise HTTPException(status_code=503, detail="Could not reach the s3 model registry")
+    estimator = app.state.classifier.visa_estimator
+    loaded_etag = estimator.loaded_etag if estimator is not None else None
+    registry_etag = head["ETag"].strip('"')
+    return {"loaded_etag": loaded_etag, "registry_etag": registry_etag, "up_to_date": loaded_etag == registry_etag}
+
+
+@app.get("/monitoring/drift")
+async def drift_report():
+    """
+    Returns the drift of the recent prediction traffic against the training data of the served model.
+    """
+    report = await asyncio.get_running_loop().run_in_executor(app.state.executor, app.state.classifier.drift_report)
+    if report is None:
+        raise HTTPException(status_code=404, detail="The served model has no reference sketch")
+    return report
+
+
+if __name__ == "__main__":
+    uvicorn.run(app, host=APP_HOST, port=APP_PORT)
@@ -1,6 +1,22 @@
+import argparse
+
 from Visa_Prediction.pipeline.training_pipeline import TrainPipeline
 from dotenv import load_dotenv
 load_dotenv()
 
-obj = TrainPipeline()
-obj.run_pipeline()
\ No newline at end of file
+if __name__ == "__main__":
+    # the search workers are spawned and import this module again, only the main process runs the pipeline
+    parser = argparse.ArgumentParser(description="Runs the visa prediction training pipeline")
+    parser.add_argument("--force", action="store_true", help="rerun every stage even when its inputs are unchanged")
+    parser.add_argument("--gc", action="store_true", help="remove stale stage cache entries and unreferenced runs, then exit")
+    parser.add_argument("--profile", action="append", default=[], metavar="TRACK",
+                        help="run the track, e.g. data_transformation, under cProfile and save its profile, can be repeated")
+    args = parser.parse_args()
+
+    obj = TrainPipeline(force=args.force)
+    if args.profile:
+        obj.training_pipeline_config.profile_tracks = tuple(args.profile)
+    if args.gc:
+        obj.stage_cache.gc()
+    else:
+        obj.run_pipeline()
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from Visa_Prediction.components.data_transformation import DataTransformation
+from Visa_Prediction.constants import SCHEMA_FILE_PATH, TARGET_COLUMN
+from Visa_Prediction.entity.artifact_entity import DataIngestionArtifact
+from Visa_Prediction.entity.config_entity import DataTransformationConfig
+from Visa_Prediction.entity.estimator import VisaModel
+from Visa_Prediction.utils.main_utils import read_yaml_file
+
+
+def make_visa_frame(n_rows: int, seed: int = 0) -> pd.DataFrame:
+    """
+    Returns n_rows raw visa applications with the columns of schema.yaml and values inside its domains and ranges.
+    """
+    rng = np.random.default_rng(seed)
+    domains = read_yaml_file(SCHEMA_FILE_PATH)["domains"]
+    frame = pd.DataFrame({
+        "case_id": [f"EZYV{index}" for index in range(n_rows)],
+        "continent": rng.choice(domains["continent"], n_rows),
+        "education_of_employee": rng.choice(domains["education_of_employee"], n_rows),
+        "has_job_experience": rng.choice(domains["has_job_experience"], n_rows),
+        "requires_job_training": rng.choice(domains["requires_job_training"], n_rows),
+        "no_of_employees": rng.integers(1, 50_000, n_rows),
+        "yr_of_estab": rng.integers(1850, 2016, n_rows),
+        "region_of_employment": rng.choice(domains["region_of_employment"], n_rows),
+        "prevailing_wage": rng.integers(100, 300_000, n_rows),
+        "unit_of_wage": rng.choice(domains["unit_of_wage"], n_rows),
+        "full_time_position": rng.choice(domains["full_time_position"], n_rows),
+    })
+    # the label depends on the features so that the models have something to learn
+    denied = (frame["education_of_employee"] == "High School") | (rng.random(n_rows) < 0.2)
+    frame[TARGET_COLUMN] = np.where(denied, "Denied", "Certified")
+    return frame
+
+
+@pytest.fixture(scope="session")
+def visa_frame() -> pd.DataFrame:
+    return make_visa_frame(600)
+
+
+@pytest.fixture(scope="session")
+def data_transformation() -> DataTransformation:
+    return DataTransformation(data_ingestion_artifact=DataIngestionArtifact("train.parquet", "test.parquet"),
+                              data_transformation_config=DataTransformationConfig(),
+                              data_validation_artifact=None)
+
+
+@pytest.fixture(scope="session")
+def training_data(visa_frame, data_transformation):
+    """
+    The fitted preprocessor with the transformed features and labels of visa_frame.
+    """
+    features, target = data_transformation.prepare_features(visa_frame)
+    preprocessor = data_transformation.get_data_transformer_object().fit(features)
+    return preprocessor, preprocessor.transform(features), target.to_numpy().astype(int)
+
+
+@pytest.fixture(scope="session")
+def visa_model(training_data) -> VisaModel:
+    preprocessor, X, y = training_data
+    model = RandomForestClassifier(n_estimators=10, max_depth=6, random_state=0).fit(X, y)
+    return VisaModel(preprocessing_object=preprocessor, trained_model_object=model)
+
+
+@pytest.fixture
+def s3_bucket(monkeypatch):
+    """
+    A bucket of an in process S3 stand-in, the shared S3Client is rebuilt against it.
+    """
+    moto = pytest.importorskip("moto")
+    from Visa_Prediction.configuration.aws_connection import S3Client
+
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+    monkeypatch.setattr(S3Client, "s3_client", None)
+    monkeypatch.setattr(S3Client, "s3_resource", None)
+    with moto.mock_aws():
+        S3Client().s3_client.create_bucket(Bucket="visa-models")
+        yield "visa-models"
+
+
+@pytest.fixture
+def mongo_client(monkeypatch):
+    """
+    An in process MongoDB stand-in shared by every MongoDBClient, with the database name of the tests.
+    """
+    mongomock = pytest.importorskip("mongomock")
+    from Visa_Prediction.configuration.mongo_db_conn import MongoDBClient
+    from Visa_Prediction.data_access import visa_data
+
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(MongoDBClient, "client", client)
+    monkeypatch.setattr(visa_data, "DB_NAME", "visa")
+    return client
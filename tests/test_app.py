@@ -0,0 +1,69 @@
+import pytest
+
+from Visa_Prediction.constants import TARGET_COLUMN
+from Visa_Prediction.pipeline.prediction_pipeline import VisaClassifier
+
+testclient = pytest.importorskip("fastapi.testclient")
+
+
+@pytest.fixture
+def client(monkeypatch, s3_bucket, visa_model):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, "VisaClassifier",
+                        lambda prediction_pipeline_config: VisaClassifier(prediction_pipeline_config, visa_model=visa_model))
+    with testclient.TestClient(app_module.app) as client:
+        yield client
+
+
+@pytest.fixture
+def applications(visa_frame):
+    return visa_frame.drop(columns=[TARGET_COLUMN]).head(5).to_dict(orient="records")
+
+
+def test_predict_returns_the_case_status(client, applications):
+    response = client.post("/predict", json=applications[0])
+
+    assert response.status_code == 200
+    assert response.json()["case_status"] in ("Certified", "Denied")
+
+
+def test_predict_batch_returns_one_case_status_per_application(client, applications):
+    response = client.post("/predict/batch", json=applications)
+
+    assert response.status_code == 200
+    assert len(response.json()["case_status"]) == len(applications)
+
+
+@pytest.mark.parametrize("path, single", [("/predict", True), ("/predict/batch", False)])
+def test_server_errors_do_not_expose_server_details(monkeypatch, client, visa_model, applications, path, single):
+    def fail(dataframe):
+        raise RuntimeError("model unavailable")
+
+    monkeypatch.setattr(visa_model, "predict", fail)
+    response = client.post(path, json=applications[0] if single else applications)
+
+    assert response.status_code == 500
+    assert ".py" not in response.json()["detail"]
+    assert "model unavailable" not in response.json()["detail"]
+
+
+def test_registry_errors_do_not_expose_server_details(client):
+    # no model was pushed to the bucket, the HEAD request of the registry fails
+    response = client.get("/model")
+
+    assert response.status_code == 503
+    assert response.json()["detail"] == "Could not reach the s3 model registry"
+
+
+def test_predict_batch_rejects_records_violating_the_schema(client, applications):
+    applications[1] = {**applications[1], "continent": "Atlantis"}
+    applications[3] = {**applications[3], "yr_of_estab": 1700}
+
+    response = client.post("/predict/batch", json=applications)
+
+    assert response.status_code == 422
+    errors = response.json()["detail"]
+    assert [error["index"] for error in errors] == [1, 3]
+    assert "continent:domain" in errors[0]["error"]
+    assert "yr_of_estab:range" in errors[1]["error"]
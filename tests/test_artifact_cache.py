@@ -0,0 +1,172 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from Visa_Prediction.utils import artifact_cache as artifact_cache_module
+from Visa_Prediction.utils.artifact_cache import ArtifactCache
+from Visa_Prediction.utils.main_utils import read_dataframe, save_dataframe, save_numpy_array_data
+
+
+@pytest.fixture
+def parquet_file(tmp_path, visa_frame):
+    file_path = str(tmp_path / "train.parquet")
+    save_dataframe(file_path, visa_frame)
+    return file_path
+
+
+def test_second_read_is_a_hit(parquet_file, visa_frame):
+    cache = ArtifactCache()
+
+    cache.read_dataframe(parquet_file)
+    dataframe = cache.read_dataframe(parquet_file)
+
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+    pd.testing.assert_frame_equal(dataframe, visa_frame)
+
+
+def test_frames_share_the_cached_buffers(tmp_path, visa_frame):
+    file_path = str(tmp_path / "train.parquet")
+    save_dataframe(file_path, visa_frame, category_columns=["continent"])
+    cache = ArtifactCache()
+
+    first, second = cache.read_dataframe(file_path), cache.read_dataframe(file_path)
+    columns = cache.read_dataframe(file_path, columns=["continent", "prevailing_wage"])
+
+    for column in ("prevailing_wage", "unit_of_wage"):
+        assert np.shares_memory(first[column].to_numpy(), second[column].to_numpy())
+    assert np.shares_memory(first["continent"].array.codes, second["continent"].array.codes)
+    assert np.shares_memory(first["prevailing_wage"].to_numpy(), columns["prevailing_wage"].to_numpy())
+    # the cap counts one copy of the frame, there are no others
+    assert cache.stats()["entries"] == 1
+
+
+def test_edits_do_not_reach_the_cached_frame(tmp_path, visa_frame):
+    file_path = str(tmp_path / "train.parquet")
+    save_dataframe(file_path, visa_frame, category_columns=["continent"])
+    cache = ArtifactCache()
+    dataframe = cache.read_dataframe(file_path)
+
+    # setting a whole column replaces it in this frame only, setting values inside a shared buffer raises
+    dataframe.loc[:, "prevailing_wage"] = -1
+    with pytest.raises(ValueError):
+        dataframe.loc[0, "yr_of_estab"] = 0
+    with pytest.raises(ValueError):
+        dataframe["unit_of_wage"].to_numpy()[:] = "Nowhere"
+    with pytest.raises(ValueError):
+        dataframe["continent"].array.codes[:] = 0
+    dataframe["no_of_employees"] = 0
+    dataframe["company_age"] = 1
+    dataframe.drop(columns=["case_id"], inplace=True)
+
+    pd.testing.assert_frame_equal(cache.read_dataframe(file_path), read_dataframe(file_path))
+
+
+def test_columns_are_selected_from_the_cached_frame(parquet_file, visa_frame):
+    cache = ArtifactCache()
+    cache.read_dataframe(parquet_file)
+
+    dataframe = cache.read_dataframe(parquet_file, columns=["continent"])
+
+    assert cache.stats()["misses"] == 1
+    pd.testing.assert_frame_equal(dataframe, visa_frame[["continent"]])
+
+
+def test_cached_arrays_are_read_only(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+    save_numpy_array_data(file_path, np.arange(10.0))
+    cache = ArtifactCache()
+
+    array = cache.load_numpy_array(file_path)
+
+    with pytest.raises(ValueError):
+        array[0] = 1.0
+
+
+def test_rewritten_file_is_read_again(parquet_file, visa_frame):
+    cache = ArtifactCache()
+    cache.read_dataframe(parquet_file)
+
+    save_dataframe(parquet_file, visa_frame.head(10))
+    os.utime(parquet_file, ns=(0, 10 ** 18))
+
+    assert len(cache.read_dataframe(parquet_file)) == 10
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    paths = []
+    for index in range(3):
+        paths.append(str(tmp_path / f"{index}.npy"))
+        save_numpy_array_data(paths[-1], np.zeros(100))
+    cache = ArtifactCache(max_bytes=2 * 800)
+
+    cache.load_numpy_array(paths[0])
+    cache.load_numpy_array(paths[1])
+    cache.load_numpy_array(paths[0])
+    cache.load_numpy_array(paths[2])
+
+    assert cache.stats()["evictions"] == 1
+    cache.load_numpy_array(paths[0])
+    assert cache.stats()["hits"] == 2
+
+
+def test_concurrent_misses_on_one_file_load_it_once(tmp_path):
+    cache = ArtifactCache()
+    file_path = str(tmp_path / "schema.yaml")
+    with open(file_path, "w") as file:
+        file.write("columns: []\n")
+    loads = []
+
+    def slow_loader(path):
+        loads.append(path)
+        time.sleep(0.2)
+        return {"columns": []}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(lambda _: cache.get(file_path, slow_loader, kind="yaml"), range(4)))
+
+    assert len(loads) == 1
+    assert results == [{"columns": []}] * 4
+    assert cache.stats()["misses"] == 1 and cache.stats()["hits"] == 3
+
+
+def test_column_read_waits_for_the_whole_frame_in_flight(parquet_file, visa_frame, monkeypatch):
+    cache = ArtifactCache()
+    reads = []
+    full_read_started = threading.Event()
+
+    def slow_read_dataframe(path, columns=None):
+        reads.append(columns)
+        full_read_started.set()
+        time.sleep(0.2)
+        return pd.read_parquet(path, columns=columns)
+
+    monkeypatch.setattr(artifact_cache_module, "read_dataframe", slow_read_dataframe)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        full_frame = executor.submit(cache.read_dataframe, parquet_file)
+        full_read_started.wait()
+        columns = executor.submit(cache.read_dataframe, parquet_file, ["continent", "prevailing_wage"])
+
+        pd.testing.assert_frame_equal(columns.result(), visa_frame[["continent", "prevailing_wage"]])
+        pd.testing.assert_frame_equal(full_frame.result(), visa_frame)
+    assert reads == [None]
+
+
+def test_failed_load_lets_the_next_reader_load_again(tmp_path):
+    cache = ArtifactCache()
+    file_path = str(tmp_path / "schema.yaml")
+    with open(file_path, "w") as file:
+        file.write("columns: []\n")
+
+    def failing_loader(path):
+        raise OSError("disk error")
+
+    with pytest.raises(Exception):
+        cache.get(file_path, failing_loader, kind="yaml")
+
+    assert cache.get(file_path, lambda path: {"columns": []}, kind="yaml") == {"columns": []}
@@ -0,0 +1,74 @@
+import asyncio
+import threading
+
+import pytest
+
+from Visa_Prediction.utils.async_utils import BoundedThreadRunner
+
+
+class BlockingCall:
+    """
+    A blocking call which holds its thread until released and records how many calls run at once.
+    """
+
+    def __init__(self):
+        self.released = threading.Event()
+        self.lock = threading.Lock()
+        self.running = 0
+        self.max_running = 0
+
+    def __call__(self, value):
+        with self.lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        self.released.wait(5)
+        with self.lock:
+            self.running -= 1
+        return value
+
+
+def test_results_are_returned():
+    runner = BoundedThreadRunner(max_workers=2, max_concurrency=2, timeout_seconds=5)
+
+    async def main():
+        return await asyncio.gather(*(runner.run(pow, value, 2) for value in range(5)))
+
+    try:
+        assert asyncio.run(main()) == [0, 1, 4, 9, 16]
+    finally:
+        runner.shutdown()
+
+
+def test_calls_left_running_by_timeouts_keep_their_slots():
+    runner = BoundedThreadRunner(max_workers=8, max_concurrency=2, timeout_seconds=0.1)
+    call = BlockingCall()
+
+    async def main():
+        for _ in range(3):
+            results = await asyncio.gather(*(runner.run(call, index) for index in range(4)), return_exceptions=True)
+            assert all(isinstance(result, asyncio.TimeoutError) for result in results)
+        assert call.max_running == 2
+
+        call.released.set()
+        return await runner.run(call, "done", timeout_seconds=5)
+
+    try:
+        assert asyncio.run(main()) == "done"
+        assert call.max_running == 2
+    finally:
+        call.released.set()
+        runner.shutdown()
+
+
+def test_exceptions_of_the_call_are_raised():
+    runner = BoundedThreadRunner(max_workers=1, max_concurrency=1, timeout_seconds=5)
+
+    async def main():
+        with pytest.raises(ZeroDivisionError):
+            await runner.run(divmod, 1, 0)
+        return await runner.run(divmod, 7, 2)
+
+    try:
+        assert asyncio.run(main()) == (3, 1)
+    finally:
+        runner.shutdown()
@@ -0,0 +1,47 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from boto3.s3.transfer import TransferConfig
+
+from Visa_Prediction.cloud_storage.aws_storage import SimpleStorageService
+from Visa_Prediction.exception import visaException
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def storage(s3_bucket):
+    # objects above 5 MB are sent in 5 MB parts, the smallest part size S3 accepts
+    return SimpleStorageService(TransferConfig(multipart_threshold=5 * MB, multipart_chunksize=5 * MB, max_concurrency=4))
+
+
+@pytest.mark.parametrize("size", [1000, 12 * MB])
+def test_file_round_trips_through_s3(storage, s3_bucket, tmp_path, size):
+    content = np.random.default_rng(0).bytes(size)
+    (tmp_path / "model.pkl").write_bytes(content)
+
+    storage.upload_file(str(tmp_path / "model.pkl"), "models/model.pkl", s3_bucket, remove=False)
+    downloaded = storage.download_file("models/model.pkl", str(tmp_path / "download" / "model.pkl"), s3_bucket)
+
+    assert open(downloaded, "rb").read() == content
+    assert os.listdir(tmp_path / "download") == ["model.pkl"]
+
+
+def test_failed_download_leaves_no_file(storage, s3_bucket, tmp_path):
+    with pytest.raises(visaException):
+        storage.download_file("missing.pkl", str(tmp_path / "model.pkl"), s3_bucket)
+
+    assert not os.listdir(tmp_path)
+
+
+@pytest.mark.parametrize("multipart_threshold", [5 * MB, 1])
+def test_read_csv_parses_small_and_large_objects(storage, s3_bucket, visa_frame, multipart_threshold):
+    frame = visa_frame.copy()
+    frame.loc[0, "prevailing_wage"] = np.nan
+    storage.s3_client.put_object(Bucket=s3_bucket, Key="data/visa.csv",
+                                 Body=frame.to_csv(index=False, na_rep="na").encode())
+    storage.transfer_config.multipart_threshold = multipart_threshold
+
+    pd.testing.assert_frame_equal(storage.read_csv("data/visa.csv", s3_bucket), frame, check_dtype=False)
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.neighbors import KNeighborsClassifier
+
+from Visa_Prediction.entity import compiled_model
+from Visa_Prediction.entity.compiled_model import CompiledForest, CompiledKNN, compile_model, with_missing_values
+
+
+@pytest.fixture(scope="module")
+def dataset():
+    rng = np.random.default_rng(0)
+    X = rng.normal(size=(1500, 6))
+    y = (X[:, 0] + X[:, 1] * X[:, 2] > 0).astype(int)
+    return X, y
+
+
+@pytest.mark.parametrize("train_with_missing", [False, True])
+@pytest.mark.parametrize("dtype", [np.float64, np.float32])
+def test_compiled_forest_matches_sklearn_on_clean_and_missing_values(dataset, train_with_missing, dtype):
+    X, y = dataset
+    X_train = with_missing_values(X, random_state=1) if train_with_missing else X
+    model = RandomForestClassifier(n_estimators=15, max_depth=8, random_state=0).fit(X_train, y)
+    compiled = CompiledForest.from_estimator(model)
+
+    for X_test in (X.astype(dtype), with_missing_values(X, random_state=2).astype(dtype)):
+        np.testing.assert_array_equal(compiled.predict_proba(X_test), model.predict_proba(X_test))
+        np.testing.assert_array_equal(compiled.predict(X_test), model.predict(X_test))
+
+
+@pytest.mark.parametrize("weights", ["uniform", "distance"])
+def test_compiled_knn_matches_sklearn(dataset, weights):
+    X, y = dataset
+    model = KNeighborsClassifier(n_neighbors=5, weights=weights).fit(X[:1000], y[:1000])
+
+    np.testing.assert_array_equal(CompiledKNN.from_estimator(model).predict(X[1000:]), model.predict(X[1000:]))
+
+
+def test_compile_model_skips_models_without_a_compiled_predictor(dataset):
+    X, y = dataset
+
+    assert compile_model(LogisticRegression().fit(X, y), X[:100]) is None
+
+
+def test_compile_model_rejects_a_predictor_which_differs_on_missing_values(monkeypatch, dataset):
+    X, y = dataset
+    model = RandomForestClassifier(n_estimators=5, max_depth=6, random_state=0).fit(X, y)
+    predict = CompiledForest.predict
+
+    def predict_missing_wrong(self, X_test):
+        return predict(self, np.nan_to_num(X_test, nan=1e9))
+
+    monkeypatch.setattr(CompiledForest, "predict", predict_missing_wrong)
+
+    report = {}
+
+    assert compile_model(model, X[:300], batch_sizes=(1,), report=report) is None
+    assert report["reason"] == "predictions differ on missing values"
+
+
+def test_compile_model_rejects_a_predictor_slower_at_any_batch_size(monkeypatch, dataset):
+    X, y = dataset
+    model = RandomForestClassifier(n_estimators=5, max_depth=6, random_state=0).fit(X, y)
+    # faster than the model at every batch size but the last one
+    speedups = {1: 3.0, 64: 2.0, 10000: 0.9}
+
+    def fake_throughput(predict_fn, X_sample, batch_sizes, min_seconds=0.2):
+        factor = speedups if isinstance(getattr(predict_fn, "__self__", None), CompiledForest) else {}
+        return {batch_size: 1000.0 * factor.get(batch_size, 1.0) for batch_size in batch_sizes}
+
+    monkeypatch.setattr(compiled_model, "measure_throughput", fake_throughput)
+    report = {}
+
+    assert compile_model(model, X[:300], report=report) is None
+    assert report["speedups"] == speedups and report["compiled"] is False
+
+    speedups[10000] = 1.1
+    assert isinstance(compile_model(model, X[:300], report=report), CompiledForest)
+    assert report["compiled"] is True
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.preprocessing import FunctionTransformer
+
+from Visa_Prediction.entity.compiled_preprocessor import CompiledPreprocessor, compile_preprocessor
+from Visa_Prediction.exception import visaException
+from tests.conftest import make_visa_frame
+
+
+@pytest.fixture(scope="module")
+def features(visa_frame, data_transformation):
+    return data_transformation.prepare_features(visa_frame)[0]
+
+
+def test_compiled_preprocessor_is_bit_identical_to_the_fitted_one(training_data, features):
+    preprocessor, expected, _ = training_data
+
+    actual = compile_preprocessor(preprocessor).transform(features)
+
+    assert actual.dtype == expected.dtype
+    np.testing.assert_array_equal(actual, expected)
+
+
+def test_compiled_preprocessor_matches_on_unseen_rows(training_data, data_transformation):
+    preprocessor, _, _ = training_data
+    unseen = data_transformation.prepare_features(make_visa_frame(200, seed=7))[0]
+
+    np.testing.assert_array_equal(compile_preprocessor(preprocessor).transform(unseen), preprocessor.transform(unseen))
+
+
+def test_categorical_columns_are_encoded_from_their_codes(training_data, features):
+    preprocessor, expected, _ = training_data
+    categorical = features.astype({column: "category" for column in features.select_dtypes(object).columns})
+    # a category the preprocessor never saw, and a missing value, in the categories of one column
+    categorical["unit_of_wage"] = categorical["unit_of_wage"].cat.add_categories(["Decade"])
+    compiled = compile_preprocessor(preprocessor)
+
+    np.testing.assert_array_equal(compiled.transform(categorical), expected)
+    with pytest.raises(ValueError):
+        compiled.transform(categorical.head(3).assign(continent=pd.Categorical(["Atlantis", "Asia", None])))
+
+
+def test_unknown_categories_raise_like_the_fitted_preprocessor(training_data, features):
+    preprocessor, _, _ = training_data
+    unknown = features.head(3).copy()
+    unknown["continent"] = "Atlantis"
+
+    with pytest.raises(ValueError):
+        preprocessor.transform(unknown)
+    with pytest.raises(ValueError):
+        compile_preprocessor(preprocessor).transform(unknown)
+
+
+def test_unsupported_steps_are_not_compiled(features):
+    preprocessor = ColumnTransformer([("log", FunctionTransformer(np.log1p), ["prevailing_wage"])]).fit(features)
+
+    with pytest.raises(ValueError):
+        CompiledPreprocessor.compile(preprocessor)
+    with pytest.raises(visaException):
+        compile_preprocessor(preprocessor)
@@ -0,0 +1,141 @@
+import threading
+import time
+
+import pytest
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.pipeline.dag import DagScheduler, Task
+from Visa_Prediction.utils.instrumentation import instrumentation
+
+
+def add_in_process(a: int, b: int) -> int:
+    """
+    A process task, defined at module level so that the spawned worker can import it.
+    """
+    with instrumentation.track("test_dag.add_in_process") as track:
+        track.add_rows(1)
+        return a + b
+
+
+def test_tasks_get_the_results_of_their_inputs():
+    tasks = [
+        Task("a", lambda: 1),
+        Task("b", lambda: 2),
+        Task("sum", lambda x, y: x + y, inputs={"x": "a", "y": "b"}),
+        Task("double", lambda total: 2 * total, inputs={"total": "sum"}),
+    ]
+
+    results = DagScheduler(tasks, max_workers=2, max_cpus=2).run()
+
+    assert results == {"a": 1, "b": 2, "sum": 3, "double": 6}
+
+
+def test_after_orders_tasks_without_passing_results():
+    calls = []
+    tasks = [
+        Task("second", lambda: calls.append("second"), after=["first"]),
+        Task("first", lambda: calls.append("first")),
+    ]
+
+    DagScheduler(tasks, max_workers=2, max_cpus=2).run()
+
+    assert calls == ["first", "second"]
+
+
+def test_independent_tasks_run_at_the_same_time():
+    barrier = threading.Barrier(2, timeout=5)
+    tasks = [Task("a", barrier.wait, cpus=0), Task("b", barrier.wait, cpus=0)]
+
+    # each task waits for the other one, the run only finishes if both are running at once
+    DagScheduler(tasks, max_workers=2, max_cpus=1).run()
+
+
+def test_cpu_budget_serializes_tasks():
+    running, overlaps = [], []
+    lock = threading.Lock()
+
+    def busy():
+        with lock:
+            running.append(1)
+            overlaps.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+
+    tasks = [Task(name, busy, cpus=1) for name in ("a", "b", "c")]
+
+    DagScheduler(tasks, max_workers=3, max_cpus=1).run()
+
+    assert max(overlaps) == 1
+
+
+def test_failure_is_raised_and_stops_downstream_tasks():
+    calls = []
+
+    def fail():
+        raise ValueError("boom")
+
+    tasks = [
+        Task("fail", fail),
+        Task("downstream", lambda upstream: calls.append(upstream), inputs={"upstream": "fail"}),
+    ]
+
+    with pytest.raises(visaException, match="boom"):
+        DagScheduler(tasks, max_workers=2).run()
+    assert calls == []
+
+
+def test_cycle_is_rejected():
+    tasks = [Task("a", lambda: None, after=["b"]), Task("b", lambda: None, after=["a"])]
+
+    with pytest.raises(visaException, match="cycle"):
+        DagScheduler(tasks)
+
+
+def test_unknown_dependency_is_rejected():
+    with pytest.raises(visaException, match="unknown tasks"):
+        DagScheduler([Task("a", lambda: None, after=["missing"])])
+
+
+def test_unknown_executor_is_rejected():
+    with pytest.raises(visaException, match="unknown executor"):
+        DagScheduler([Task("a", lambda: None, executor="gpu")])
+
+
+def test_report_has_the_critical_path():
+    tasks = [
+        Task("fast", lambda: time.sleep(0.01), cpus=0),
+        Task("slow", lambda: time.sleep(0.2), cpus=0),
+        Task("last", lambda: None, after=["fast", "slow"], cpus=0),
+    ]
+    scheduler = DagScheduler(tasks, max_workers=2)
+
+    scheduler.run()
+    report = scheduler.report()
+
+    assert report["critical_path"] == ["slow", "last"]
+    assert set(report["tasks"]) == {"fast", "slow", "last"}
+    assert report["wall_seconds"] < report["serial_seconds"] + 0.1
+    assert report["critical_path_seconds"] >= 0.2
+
+
+def test_process_task_result_and_measurements_come_back():
+    instrumentation.reset()
+    tasks = [
+        Task("a", lambda: 2),
+        Task("add", add_in_process, inputs={"a": "a", "b": "a"}, executor="process"),
+    ]
+
+    results = DagScheduler(tasks, max_workers=1).run()
+
+    assert results["add"] == 4
+    assert instrumentation.export()["test_dag.add_in_process"]["rows"] == 1
+
+
+def test_pipeline_reads_the_train_and_test_frames_on_threads():
+    from Visa_Prediction.pipeline.training_pipeline import TrainPipeline
+
+    executors = {task.name: task.executor for task in TrainPipeline().get_pipeline_tasks()}
+
+    # a process task would parse the frames again instead of sharing them through the artifact cache
+    assert executors["data_validation"] == executors["data_transformation"] == "thread"
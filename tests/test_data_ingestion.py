@@ -0,0 +1,82 @@
+import os
+
+import pytest
+
+from Visa_Prediction.components.data_ingestion import DataIngestion
+from Visa_Prediction.data_access.visa_data import VisaData
+from Visa_Prediction.entity.config_entity import DataIngestionConfig
+from tests.conftest import make_visa_frame
+
+
+@pytest.fixture
+def ingestion_config(tmp_path):
+    store_dir = str(tmp_path / "feature_store")
+    return DataIngestionConfig(
+        data_ingestion_dir=str(tmp_path / "data_ingestion"),
+        feature_store_file_path=str(tmp_path / "data_ingestion" / "visadata.parquet"),
+        training_file_path=str(tmp_path / "data_ingestion" / "train.parquet"),
+        testing_file_path=str(tmp_path / "data_ingestion" / "test.parquet"),
+        collection_name="visa_data",
+        num_workers=1,
+        incremental=True,
+        persistent_feature_store_dir=store_dir,
+        high_water_mark_file_path=os.path.join(store_dir, "high_water_mark.yaml"),
+    )
+
+
+@pytest.fixture
+def collection(mongo_client):
+    return mongo_client["visa"]["visa_data"]
+
+
+def test_only_documents_above_the_high_water_mark_are_fetched(collection, ingestion_config):
+    frame = make_visa_frame(85)
+    collection.insert_many(frame.head(60).to_dict(orient="records"))
+    data_ingestion = DataIngestion(ingestion_config)
+
+    visa_data = VisaData()
+    assert len(data_ingestion.export_incremental_data(visa_data)) == 60
+
+    collection.insert_many(frame.tail(25).to_dict(orient="records"))
+    visa_data = VisaData()
+    dataframe = data_ingestion.export_incremental_data(visa_data)
+
+    assert visa_data.export_metrics["rows"] == 25
+    assert dataframe["case_id"].tolist() == frame["case_id"].tolist()
+    high_water_mark = data_ingestion.read_high_water_mark()
+    assert high_water_mark["n_rows"] == 85 and len(high_water_mark["partitions"]) == 2
+
+
+def test_a_run_without_new_documents_adds_no_partition(collection, ingestion_config):
+    collection.insert_many(make_visa_frame(30).to_dict(orient="records"))
+    data_ingestion = DataIngestion(ingestion_config)
+    data_ingestion.export_incremental_data(VisaData())
+
+    dataframe = data_ingestion.export_incremental_data(VisaData())
+
+    assert len(dataframe) == 30
+    assert data_ingestion.read_high_water_mark()["partitions"] == ["part-00000.parquet"]
+
+
+def test_non_incremental_ingestion_rebuilds_the_store(collection, ingestion_config):
+    frame = make_visa_frame(40)
+    collection.insert_many(frame.head(20).to_dict(orient="records"))
+    DataIngestion(ingestion_config).export_incremental_data(VisaData())
+    collection.insert_many(frame.tail(20).to_dict(orient="records"))
+
+    ingestion_config.incremental = False
+    data_ingestion = DataIngestion(ingestion_config)
+    visa_data = VisaData()
+    dataframe = data_ingestion.export_incremental_data(visa_data)
+
+    assert visa_data.export_metrics["rows"] == 40 and len(dataframe) == 40
+    assert sorted(name for name in os.listdir(ingestion_config.persistent_feature_store_dir) if name.startswith("part-")) == ["part-00000.parquet"]
+
+
+def test_the_high_water_mark_of_another_collection_is_ignored(collection, ingestion_config):
+    collection.insert_many(make_visa_frame(10).to_dict(orient="records"))
+    DataIngestion(ingestion_config).export_incremental_data(VisaData())
+
+    ingestion_config.collection_name = "other_collection"
+
+    assert DataIngestion(ingestion_config).read_high_water_mark() == {}
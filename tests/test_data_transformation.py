@@ -0,0 +1,71 @@
+import threading
+
+import numpy as np
+import pytest
+
+from Visa_Prediction.components.data_transformation import DataTransformation
+from Visa_Prediction.constants import SCHEMA_FILE_PATH
+from Visa_Prediction.entity.artifact_entity import DataIngestionArtifact
+from Visa_Prediction.entity.config_entity import DataTransformationConfig
+from Visa_Prediction.utils.main_utils import (load_numpy_array_data, load_object, read_yaml_file, save_dataframe,
+                                              read_dataframe)
+from tests.conftest import make_visa_frame
+
+
+@pytest.fixture
+def ingestion_artifact(tmp_path):
+    category_columns = read_yaml_file(SCHEMA_FILE_PATH)["categorical_columns"]
+    train_file_path, test_file_path = str(tmp_path / "train.parquet"), str(tmp_path / "test.parquet")
+    save_dataframe(train_file_path, make_visa_frame(400, seed=1), category_columns=category_columns)
+    save_dataframe(test_file_path, make_visa_frame(150, seed=2), category_columns=category_columns)
+    return DataIngestionArtifact(train_file_path, test_file_path)
+
+
+def transformation_config(tmp_path, **options) -> DataTransformationConfig:
+    output_dir = tmp_path / "data_transformation"
+    return DataTransformationConfig(
+        transformed_train_file_path=str(output_dir / "train.npy"),
+        transformed_test_file_path=str(output_dir / "test.npy"),
+        transformed_train_label_file_path=str(output_dir / "train_labels.npy"),
+        transformed_test_label_file_path=str(output_dir / "test_labels.npy"),
+        transformed_object_file_path=str(output_dir / "preprocessing.pkl"),
+        reference_sketch_file_path=str(output_dir / "reference_sketch.pkl"),
+        resampling_report_file_path=str(output_dir / "resampling_report.yaml"),
+        resampling_strategy="none", streaming_batch_rows=64, streaming_sample_rows=1000, **options)
+
+
+@pytest.mark.parametrize("streaming_fit", [False, True])
+def test_test_rows_are_transformed_on_a_second_thread(tmp_path, ingestion_artifact, monkeypatch, streaming_fit):
+    config = transformation_config(tmp_path, streaming_fit=streaming_fit, resample_test=False)
+    data_transformation = DataTransformation(ingestion_artifact, config, data_validation_artifact=None)
+    method = "transform_file_and_resample" if streaming_fit else "transform_and_resample"
+    transform = getattr(DataTransformation, method)
+    threads = {}
+
+    def record_thread(self, preprocessor, *args, **kwargs):
+        threads[len(threads)] = threading.current_thread()
+        return transform(self, preprocessor, *args, **kwargs)
+
+    monkeypatch.setattr(DataTransformation, method, record_thread)
+
+    artifact = data_transformation.initiate_data_transformation()
+
+    assert {thread is threading.main_thread() for thread in threads.values()} == {True, False}
+    preprocessor = load_object(artifact.transformed_object_file_path)
+    for data_file_path, feature_file_path, label_file_path in (
+            (ingestion_artifact.train_file_path, artifact.transformed_train_file_path, artifact.transformed_train_label_file_path),
+            (ingestion_artifact.test_file_path, artifact.transformed_test_file_path, artifact.transformed_test_label_file_path)):
+        features, labels = data_transformation.prepare_features(read_dataframe(data_file_path))
+        np.testing.assert_allclose(load_numpy_array_data(feature_file_path), preprocessor.transform(features))
+        np.testing.assert_array_equal(load_numpy_array_data(label_file_path), labels.to_numpy())
+
+
+def test_resampling_report_covers_the_test_rows_only_when_resampled(tmp_path, ingestion_artifact):
+    for resample_test in (True, False):
+        config = transformation_config(tmp_path, resample_test=resample_test)
+        DataTransformation(ingestion_artifact, config, data_validation_artifact=None).initiate_data_transformation()
+
+        report = read_yaml_file(config.resampling_report_file_path)
+
+        assert report["train"]["rows_before"] == 400
+        assert ("test" in report) == resample_test
@@ -0,0 +1,135 @@
+import threading
+import timeit
+
+import numpy as np
+import pytest
+
+from Visa_Prediction.pipeline.drift_monitor import DriftMonitor
+from tests.conftest import make_visa_frame
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def features(data_transformation):
+    return data_transformation.prepare_features(make_visa_frame(3000, seed=2))[0]
+
+
+@pytest.fixture
+def reference_sketch(data_transformation, features):
+    return data_transformation.get_reference_sketch(features)
+
+
+def test_traffic_like_the_reference_does_not_drift(reference_sketch, data_transformation):
+    monitor = DriftMonitor(reference_sketch, window_seconds=60, n_windows=2, clock=Clock())
+    traffic = data_transformation.prepare_features(make_visa_frame(2000, seed=3))[0]
+    for start in range(0, len(traffic), 10):
+        monitor.observe(traffic.iloc[start:start + 10])
+
+    report = monitor.report()["data_drift"]
+
+    assert not report["data"]["metrics"]["dataset_drift"]
+    assert report["data"]["metrics"]["current_rows"] == pytest.approx(2000, rel=0.01)
+    median = report["current_quantiles"]["prevailing_wage"]["q0.5"]
+    assert median == pytest.approx(np.median(traffic["prevailing_wage"]), rel=0.05)
+
+
+def test_shifted_traffic_drifts(reference_sketch, data_transformation):
+    monitor = DriftMonitor(reference_sketch, window_seconds=60, n_windows=2, clock=Clock())
+    traffic = data_transformation.prepare_features(make_visa_frame(2000, seed=3))[0]
+    traffic["prevailing_wage"] = traffic["prevailing_wage"] * 5
+    traffic["company_age"] = traffic["company_age"] + 100
+    traffic["continent"] = "Asia"
+    traffic["unit_of_wage"] = "Hour"
+    monitor.observe(traffic)
+
+    columns = monitor.report()["data_drift"]["data"]["metrics"]["columns"]
+
+    assert columns["prevailing_wage"]["drift_detected"]
+    assert columns["company_age"]["drift_detected"]
+    assert not columns["no_of_employees"]["drift_detected"]
+
+
+def test_old_windows_leave_the_report(reference_sketch, features):
+    clock = Clock()
+    monitor = DriftMonitor(reference_sketch, window_seconds=60, n_windows=2, clock=clock)
+    monitor.observe(features.head(100))
+    clock.now = 70
+    monitor.observe(features.head(50))
+
+    assert monitor.current_sketch().numeric.n == 150
+    clock.now = 130
+    assert monitor.current_sketch().numeric.n == 50
+    clock.now = 190
+    assert monitor.current_sketch().numeric.n == 0
+
+
+def test_every_thread_observes_into_its_own_shard(reference_sketch, features):
+    monitor = DriftMonitor(reference_sketch, clock=Clock())
+
+    def observe():
+        for start in range(0, 500, 5):
+            monitor.observe(features.iloc[start:start + 5])
+
+    threads = [threading.Thread(target=observe) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(monitor._windows[0]) == 4
+    sketch = monitor.current_sketch()
+    assert sketch.numeric.n == 2000
+    assert sum(sketch.categorical["continent"].counts.values()) == 2000
+
+
+@pytest.mark.parametrize("rows, budget_us", [(1, 250), (64, 600)])
+def test_observe_stays_within_the_scoring_budget(reference_sketch, features, rows, budget_us):
+    monitor = DriftMonitor(reference_sketch, clock=Clock())
+    batch = features.head(rows)
+    monitor.observe(batch)
+
+    # the best of several runs, so that a busy machine does not fail the test
+    seconds = min(timeit.repeat(lambda: monitor.observe(batch), number=100, repeat=5)) / 100
+
+    assert seconds * 1e6 < budget_us
+
+
+def test_threads_seeing_a_new_model_share_one_monitor(visa_model, reference_sketch, monkeypatch):
+    from Visa_Prediction.entity.config_entity import VisaPredictionConfig
+    from Visa_Prediction.pipeline import prediction_pipeline
+    from Visa_Prediction.pipeline.prediction_pipeline import VisaClassifier
+
+    classifier = VisaClassifier(VisaPredictionConfig(), visa_model=visa_model)
+    monkeypatch.setattr(visa_model, "reference_sketch", reference_sketch)
+    created = []
+
+    class SlowDriftMonitor(DriftMonitor):
+        def __init__(self, *args, **kwargs):
+            created.append(self)
+            # widens the window in which a second thread could build its own monitor
+            threading.Event().wait(0.05)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(prediction_pipeline, "DriftMonitor", SlowDriftMonitor)
+    barrier = threading.Barrier(4)
+    monitors = []
+
+    def get_monitor():
+        barrier.wait()
+        monitors.append(classifier.get_drift_monitor(visa_model))
+
+    threads = [threading.Thread(target=get_monitor) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(created) == 1
+    assert all(monitor is created[0] for monitor in monitors)
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Visa_Prediction.utils.drift_utils import (CategoricalSketch, DatasetSketch, NumericSketch, QuantileSketch,
+                                               compare_sketches, iter_frame_chunks, sketch_chunks)
+from tests.conftest import make_visa_frame
+
+NUMERICAL_COLUMNS = ["no_of_employees", "yr_of_estab", "prevailing_wage"]
+CATEGORICAL_COLUMNS = ["continent", "education_of_employee", "unit_of_wage"]
+
+
+@pytest.fixture
+def reference_sketch(visa_frame):
+    return sketch_chunks(iter_frame_chunks(visa_frame, 200), numerical_columns=NUMERICAL_COLUMNS,
+                         categorical_columns=CATEGORICAL_COLUMNS)
+
+
+def test_merged_chunk_sketches_equal_one_pass(reference_sketch, visa_frame):
+    one_pass = reference_sketch.empty_like().update(visa_frame)
+    merged = reference_sketch.empty_like()
+    for chunk in iter_frame_chunks(visa_frame, 37):
+        merged.merge(reference_sketch.empty_like().update(chunk))
+
+    for column in NUMERICAL_COLUMNS:
+        np.testing.assert_array_equal(merged.numeric[column].counts, one_pass.numeric[column].counts)
+    for column in CATEGORICAL_COLUMNS:
+        assert merged.categorical[column].counts == one_pass.categorical[column].counts
+    assert merged.n == one_pass.n == len(visa_frame)
+
+
+def test_small_and_large_chunks_are_counted_alike():
+    values = np.array([1.0, 2.0, np.nan, 5.0, 9.0] * 20)
+    large = NumericSketch(np.array([2.0, 5.0])).update(values)
+    small = NumericSketch(np.array([2.0, 5.0]))
+    for start in range(0, len(values), 5):
+        small.update(values[start:start + 5])
+
+    np.testing.assert_array_equal(small.counts, large.counts)
+    assert small.n_missing == large.n_missing == 20
+
+
+@pytest.mark.parametrize("convert", [
+    lambda values: values,
+    lambda values: values.to_numpy(),
+    lambda values: values.astype("category"),
+])
+def test_categories_are_counted_alike_from_every_input(convert):
+    values = pd.Series(["Asia", "Europe", None, "Asia", np.nan] * 30, dtype=object)
+
+    sketch = CategoricalSketch().update(convert(values))
+
+    assert sketch.counts == {"Asia": 60, "Europe": 30}
+    assert sketch.n_missing == 60
+
+
+def test_same_distribution_does_not_drift(reference_sketch):
+    current = reference_sketch.empty_like().update(make_visa_frame(600, seed=1))
+
+    metrics = compare_sketches(reference_sketch, current)["data_drift"]["data"]["metrics"]
+
+    assert not metrics["dataset_drift"]
+    assert metrics["current_rows"] == 600
+
+
+def test_shifted_distribution_drifts(reference_sketch):
+    shifted = make_visa_frame(600, seed=1)
+    shifted["prevailing_wage"] *= 3
+    shifted["continent"] = "Asia"
+
+    columns = compare_sketches(reference_sketch, reference_sketch.empty_like().update(shifted),
+                               drift_share_threshold=0.3)["data_drift"]["data"]["metrics"]
+
+    assert columns["dataset_drift"]
+    assert columns["columns"]["prevailing_wage"]["drift_detected"]
+    assert columns["columns"]["prevailing_wage"]["psi"] > 0.25
+    assert columns["columns"]["continent"]["drift_detected"]
+    assert not columns["columns"]["yr_of_estab"]["drift_detected"]
+
+
+def test_overflowed_categories_are_not_tested():
+    reference = DatasetSketch(numeric={}, categorical={"case_id": CategoricalSketch(max_categories=2)})
+    reference.update(pd.DataFrame({"case_id": ["a", "b", "c"]}))
+
+    metrics = compare_sketches(reference, reference.empty_like())["data_drift"]["data"]["metrics"]
+
+    assert reference.categorical["case_id"].overflowed
+    assert metrics["columns"]["case_id"]["stattest"] == "skipped"
+    assert metrics["n_features"] == 0 and not metrics["dataset_drift"]
+
+
+def test_quantile_sketch_estimates_quantiles_within_its_error():
+    values = np.random.default_rng(0).normal(size=(50_000, 2)) * [1.0, 10.0]
+    sketch = QuantileSketch(n_columns=2, capacity=256, seed=0)
+    for start in range(0, len(values), 100):
+        sketch.update(values[start:start + 100])
+
+    estimated = sketch.quantiles([0.1, 0.5, 0.9])
+
+    assert sketch.n == 50_000
+    for column in range(2):
+        ranks = np.searchsorted(np.sort(values[:, column]), estimated[column]) / len(values)
+        np.testing.assert_allclose(ranks, [0.1, 0.5, 0.9], atol=0.02)
+
+
+def test_merged_quantile_sketches_match_one_sketch():
+    values = np.random.default_rng(1).exponential(size=(20_000, 1))
+    one = QuantileSketch(n_columns=1, capacity=128, seed=0).update(values)
+    merged = QuantileSketch(n_columns=1, capacity=128, seed=0)
+    for part in np.array_split(values, 7):
+        merged.merge(QuantileSketch(n_columns=1, capacity=128, seed=1).update(part))
+
+    assert merged.n == one.n == 20_000
+    np.testing.assert_allclose(merged.quantiles([0.25, 0.5, 0.75]), one.quantiles([0.25, 0.5, 0.75]), rtol=0.05)
+
+
+def test_quantile_sketch_memory_is_bounded():
+    sketch = QuantileSketch(n_columns=3, capacity=64, seed=0)
+    sketch.update(np.random.default_rng(2).random((100_000, 3)))
+
+    values, weights = sketch._weighted_values()
+
+    assert values.shape[1] <= 64 * np.log2(100_000)
+    np.testing.assert_allclose(weights.sum(), 100_000, rtol=0.01)
+
+
+def test_quantile_sketch_counts_missing_values_exactly():
+    values = np.array([[1.0, np.nan], [np.nan, np.nan], [3.0, 2.0]] * 1000)
+    sketch = QuantileSketch(n_columns=2, capacity=256, seed=0).update(values)
+
+    counts = sketch.histograms([np.array([2.0]), np.array([2.0])])
+
+    np.testing.assert_array_equal(sketch.n_missing, [1000, 2000])
+    # the counts are estimates, off by at most a few n / capacity
+    np.testing.assert_allclose(counts[0], [1000, 1000], atol=3 * len(values) / 256)
+    np.testing.assert_allclose(counts[1], [0, 1000], atol=3 * len(values) / 256)
@@ -0,0 +1,101 @@
+import warnings
+
+import numpy as np
+import pytest
+from scipy import sparse
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.naive_bayes import GaussianNB
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.utils import feature_matrix
+from Visa_Prediction.utils.feature_matrix import (as_estimator_input, feature_matrix_file_path, get_feature_layout,
+                                                  load_feature_matrix, save_feature_matrix, to_feature_matrix)
+
+
+@pytest.fixture
+def dense():
+    X = np.zeros((50, 6))
+    X[np.arange(50), np.arange(50) % 6] = 1.0
+    X[:, 0] = np.linspace(-1, 1, 50)
+    return X
+
+
+def test_csr_layout_keeps_the_values(dense):
+    X = to_feature_matrix(dense, "csr", dtype="float32")
+
+    assert get_feature_layout(X) == "csr" and X.dtype == np.float32
+    np.testing.assert_array_equal(X.toarray(), dense.astype(np.float32))
+    np.testing.assert_array_equal(to_feature_matrix(X, "dense"), dense.astype(np.float32))
+
+
+def test_large_matrices_are_converted_in_chunks(dense, monkeypatch):
+    monkeypatch.setattr(feature_matrix, "CONVERSION_CHUNK_ROWS", 7)
+
+    np.testing.assert_array_equal(to_feature_matrix(dense, "csr").toarray(), dense)
+
+
+def test_unknown_layout_raises(dense):
+    with pytest.raises(visaException):
+        to_feature_matrix(dense, "coo")
+
+
+def test_file_path_follows_the_layout():
+    assert feature_matrix_file_path("artifact/train.npy", "dense") == "artifact/train.npy"
+    assert feature_matrix_file_path("artifact/train.npy", "csr") == "artifact/train.npz"
+
+
+@pytest.mark.parametrize("layout", ["dense", "csr"])
+def test_matrices_round_trip_through_their_files(tmp_path, dense, layout):
+    file_path = feature_matrix_file_path(str(tmp_path / "train.npy"), layout)
+
+    save_feature_matrix(file_path, to_feature_matrix(dense, layout), dtype="float32")
+    X = load_feature_matrix(file_path, mmap_mode="r")
+
+    assert get_feature_layout(X) == layout
+    np.testing.assert_array_equal(to_feature_matrix(X, "dense"), dense.astype(np.float32))
+
+
+def test_only_estimators_without_sparse_support_get_dense_input(dense):
+    X = sparse.csr_matrix(dense)
+
+    assert sparse.issparse(as_estimator_input(RandomForestClassifier(), X))
+    assert sparse.issparse(as_estimator_input(KNeighborsClassifier(), X))
+    densified = as_estimator_input(GaussianNB(), X)
+    assert isinstance(densified, np.ndarray)
+    np.testing.assert_array_equal(densified, dense)
+    assert as_estimator_input(GaussianNB(), dense) is dense
+
+
+class NoTagsModel:
+    def predict(self, X):
+        return np.zeros(X.shape[0])
+
+
+class BrokenTagsModel(NoTagsModel):
+    def __sklearn_tags__(self):
+        raise RuntimeError("broken tags")
+
+
+def test_estimators_without_tags_get_dense_input(dense):
+    # sklearn warns and uses the default tags for them, later versions raise an AttributeError
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", DeprecationWarning)
+        assert isinstance(as_estimator_input(NoTagsModel(), sparse.csr_matrix(dense)), np.ndarray)
+
+
+def test_errors_of_the_tags_are_not_hidden(dense):
+    with pytest.raises(RuntimeError):
+        as_estimator_input(BrokenTagsModel(), sparse.csr_matrix(dense))
+
+
+def test_densified_input_is_logged_once_per_estimator(dense, monkeypatch):
+    messages = []
+    monkeypatch.setattr(feature_matrix, "_densified_estimators", set())
+    monkeypatch.setattr(feature_matrix.logging, "info", messages.append)
+    X = sparse.csr_matrix(dense)
+
+    for _ in range(3):
+        as_estimator_input(GaussianNB(), X)
+
+    assert len(messages) == 1 and "GaussianNB" in messages[0]
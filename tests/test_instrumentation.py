@@ -0,0 +1,118 @@
+import os
+import pstats
+import threading
+import time
+
+import pytest
+
+from Visa_Prediction.utils.instrumentation import Instrumentation
+
+
+def busy_for(seconds: float) -> None:
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def test_track_aggregates_calls_rows_and_errors():
+    instrumentation = Instrumentation()
+
+    for rows in (10, 20):
+        with instrumentation.track("stage") as track:
+            track.add_rows(rows)
+    with pytest.raises(ValueError):
+        with instrumentation.track("stage"):
+            raise ValueError("failed")
+
+    stats = instrumentation.export()["stage"]
+    assert stats["calls"] == 3 and stats["errors"] == 1 and stats["rows"] == 30
+
+
+def test_nested_bytes_roll_up_but_rows_do_not():
+    instrumentation = Instrumentation()
+
+    with instrumentation.track("outer"):
+        with instrumentation.track("inner") as inner:
+            inner.add_rows(5)
+            inner.add_bytes(100)
+        instrumentation.add_bytes(20)
+
+    stats = instrumentation.export()
+    assert stats["inner"]["bytes"] == 100 and stats["outer"]["bytes"] == 120
+    assert stats["inner"]["rows"] == 5 and stats["outer"]["rows"] == 0
+
+
+def test_instrument_records_rows_and_bytes_of_each_call():
+    instrumentation = Instrumentation()
+
+    @instrumentation.instrument(name="double", rows=lambda result, arguments: len(arguments["values"]),
+                                nbytes=lambda result, arguments: 8 * len(result))
+    def double(values):
+        return [2 * value for value in values]
+
+    assert double([1, 2, 3]) == [2, 4, 6]
+    stats = instrumentation.export()["double"]
+    assert stats["calls"] == 1 and stats["rows"] == 3 and stats["bytes"] == 24
+
+
+def test_cpu_seconds_only_count_the_thread_of_the_track():
+    instrumentation = Instrumentation()
+    ready = threading.Event()
+
+    def spin():
+        ready.set()
+        busy_for(0.3)
+
+    worker = threading.Thread(target=spin)
+    worker.start()
+    ready.wait()
+    with instrumentation.track("sleeping"):
+        time.sleep(0.3)
+    worker.join()
+    with instrumentation.track("spinning"):
+        busy_for(0.2)
+
+    stats = instrumentation.export()
+    # the other thread kept the process busy while the track slept
+    assert stats["sleeping"]["cpu_seconds"] < 0.1
+    assert stats["spinning"]["cpu_seconds"] > 0.1
+
+
+def test_merge_adds_the_measurements_of_another_process():
+    worker, parent = Instrumentation(), Instrumentation()
+    with worker.track("stage") as track:
+        track.add_rows(7)
+    with parent.track("stage") as track:
+        track.add_rows(3)
+
+    parent.merge(worker.export())
+
+    stats = parent.export()["stage"]
+    assert stats["calls"] == 2 and stats["rows"] == 10
+
+
+def test_profiled_tracks_dump_a_readable_profile(tmp_path):
+    instrumentation = Instrumentation()
+    instrumentation.configure_profiling(["profiled"], str(tmp_path))
+
+    with instrumentation.track("profiled"):
+        busy_for(0.01)
+    with instrumentation.track("not_profiled"):
+        busy_for(0.01)
+
+    profiles = os.listdir(tmp_path)
+    assert len(profiles) == 1 and profiles[0].startswith("profiled_")
+    assert pstats.Stats(str(tmp_path / profiles[0])).total_calls > 0
+
+
+def test_save_report_writes_every_track(tmp_path):
+    instrumentation = Instrumentation()
+    with instrumentation.track("stage") as track:
+        track.add_rows(1)
+
+    instrumentation.save_report(str(tmp_path / "report" / "instrumentation.json"))
+
+    report = instrumentation.report()
+    assert set(report["tracks"]) == {"stage"}
+    assert report["tracks"]["stage"]["rows_per_second"] > 0
+    assert os.path.exists(tmp_path / "report" / "instrumentation.json")
@@ -0,0 +1,76 @@
+import numpy as np
+import pyarrow.parquet as pq
+import pandas as pd
+import pytest
+
+from Visa_Prediction.constants import SCHEMA_FILE_PATH
+from Visa_Prediction.utils.main_utils import (load_numpy_array_data, read_dataframe, read_yaml_file, save_dataframe,
+                                              save_numpy_array_data)
+from Visa_Prediction.utils.model_search import ModelSearch
+
+
+def test_dataframe_round_trips_through_parquet(tmp_path, visa_frame):
+    file_path = str(tmp_path / "data" / "train.parquet")
+    category_columns = read_yaml_file(SCHEMA_FILE_PATH)["categorical_columns"]
+
+    save_dataframe(file_path, visa_frame, category_columns=category_columns)
+    dataframe = read_dataframe(file_path)
+
+    assert all(isinstance(dataframe[column].dtype, pd.CategoricalDtype) for column in category_columns)
+    pd.testing.assert_frame_equal(dataframe, visa_frame, check_dtype=False, check_categorical=False)
+
+
+def test_category_columns_are_dictionary_encoded_on_disk(tmp_path, visa_frame):
+    file_path = str(tmp_path / "train.parquet")
+
+    save_dataframe(file_path, visa_frame, category_columns=["continent", "not_a_column"])
+
+    schema = pq.read_schema(file_path)
+    assert str(schema.field("continent").type).startswith("dictionary")
+    assert not str(schema.field("unit_of_wage").type).startswith("dictionary")
+
+
+def test_read_dataframe_reads_only_the_requested_columns(tmp_path, visa_frame):
+    file_path = str(tmp_path / "train.parquet")
+    save_dataframe(file_path, visa_frame, category_columns=["continent"])
+
+    dataframe = read_dataframe(file_path, columns=["continent", "prevailing_wage"])
+
+    assert list(dataframe.columns) == ["continent", "prevailing_wage"]
+    assert isinstance(dataframe["continent"].dtype, pd.CategoricalDtype)
+    pd.testing.assert_frame_equal(dataframe, visa_frame[["continent", "prevailing_wage"]], check_dtype=False,
+                                  check_categorical=False)
+
+
+def test_array_is_saved_with_the_requested_dtype(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+
+    save_numpy_array_data(file_path, np.arange(12.0).reshape(4, 3)[:, ::2], dtype="float32")
+
+    array = load_numpy_array_data(file_path)
+    assert array.dtype == np.float32
+    np.testing.assert_array_equal(array, np.arange(12.0).reshape(4, 3)[:, ::2])
+
+
+def test_memory_mapped_array_is_read_only(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+    save_numpy_array_data(file_path, np.arange(10, dtype=np.int8))
+
+    array = load_numpy_array_data(file_path, mmap_mode="r")
+
+    assert isinstance(array, np.memmap)
+    np.testing.assert_array_equal(array, np.arange(10))
+    with pytest.raises(ValueError):
+        array[0] = 1
+
+
+def test_search_workers_map_the_artifact_file_itself(tmp_path):
+    file_path = str(tmp_path / "train.npy")
+    save_numpy_array_data(file_path, np.ones((5, 2)))
+    shared_dir = tmp_path / "shared"
+    shared_dir.mkdir()
+
+    shared_path = ModelSearch._shared_file_path(load_numpy_array_data(file_path, mmap_mode="r"), str(shared_dir), "X")
+
+    assert shared_path == file_path
+    assert not list(shared_dir.iterdir())
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+
+import pytest
+
+from Visa_Prediction.pipeline.micro_batcher import MicroBatcher
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_concurrent_records_are_scored_in_one_batch():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(list(records))
+        return [record * 2 for record in records]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=32, max_wait_ms=50)
+        await batcher.start()
+        results = await asyncio.gather(*(batcher.submit(record) for record in range(10)))
+        await batcher.stop()
+        return results
+
+    assert run(scenario()) == [record * 2 for record in range(10)]
+    assert calls == [list(range(10))]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    calls = []
+
+    def predict_fn(records):
+        calls.append(len(records))
+        return records
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=4, max_wait_ms=50)
+        await batcher.start()
+        await asyncio.gather(*(batcher.submit(record) for record in range(10)))
+        await batcher.stop()
+
+    run(scenario())
+    assert max(calls) <= 4 and sum(calls) == 10
+
+
+def test_a_rejected_record_only_fails_its_own_request():
+    def predict_fn(records):
+        return [ValueError("bad record") if record < 0 else record for record in records]
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(-1), batcher.submit(2), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    ok, rejected, other = run(scenario())
+    assert (ok, other) == (1, 2)
+    assert isinstance(rejected, ValueError)
+
+
+def test_a_failing_batch_fails_all_its_records():
+    def predict_fn(records):
+        raise RuntimeError("model unavailable")
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=8, max_wait_ms=20)
+        await batcher.start()
+        results = await asyncio.gather(batcher.submit(1), batcher.submit(2), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    assert all(isinstance(result, Exception) for result in run(scenario()))
+
+
+def test_stop_scores_the_queued_records_and_the_batch_in_hand():
+    release = threading.Event()
+    scored = []
+
+    def predict_fn(records):
+        release.wait(timeout=5)
+        scored.extend(records)
+        return records
+
+    async def scenario():
+        batcher = MicroBatcher(predict_fn, max_batch_size=2, max_wait_ms=1000, max_concurrent_batches=1)
+        await batcher.start()
+        futures = [asyncio.ensure_future(batcher.submit(record)) for record in range(7)]
+        # the first batch is being scored, the collector holds the second one and the rest is queued
+        await asyncio.sleep(0.05)
+        stopping = asyncio.ensure_future(batcher.stop())
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.wait_for(stopping, timeout=5)
+        assert all(future.done() for future in futures)
+        return [future.result() for future in futures]
+
+    assert run(scenario()) == list(range(7))
+    assert sorted(scored) == list(range(7))
+
+
+def test_submit_after_stop_is_refused():
+    async def scenario():
+        batcher = MicroBatcher(lambda records: records, max_batch_size=2, max_wait_ms=1)
+        await batcher.start()
+        await batcher.stop()
+        with pytest.raises(RuntimeError):
+            await batcher.submit(1)
+
+    run(scenario())
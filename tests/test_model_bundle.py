@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from Visa_Prediction.entity.compiled_model import CompiledForest
+from Visa_Prediction.entity.estimator import VisaModel
+from Visa_Prediction.utils.main_utils import load_object, save_object
+from Visa_Prediction.utils.model_bundle import is_model_bundle, load_model_bundle
+
+
+@pytest.fixture
+def compiled_visa_model(visa_model) -> VisaModel:
+    model = VisaModel(preprocessing_object=visa_model.preprocessing_object,
+                      trained_model_object=visa_model.trained_model_object)
+    model.compile_preprocessor()
+    model.compiled_model = CompiledForest.from_estimator(model.trained_model_object)
+    return model
+
+
+@pytest.fixture
+def features(visa_frame, data_transformation):
+    return data_transformation.prepare_features(visa_frame)[0]
+
+
+def test_bundle_round_trip_keeps_the_predictions(tmp_path, compiled_visa_model, features):
+    file_path = str(tmp_path / "model" / "model.pkl")
+
+    save_object(file_path, compiled_visa_model, bundle=True)
+    loaded = load_object(file_path)
+
+    assert is_model_bundle(file_path)
+    np.testing.assert_array_equal(loaded.predict(features), compiled_visa_model.predict(features))
+
+
+def test_bundle_arrays_are_memory_mapped(tmp_path, compiled_visa_model):
+    file_path = str(tmp_path / "model.pkl")
+    save_object(file_path, compiled_visa_model, bundle=True)
+
+    mapped = load_model_bundle(file_path).compiled_model
+    in_memory = load_model_bundle(file_path, mmap=False).compiled_model
+
+    assert isinstance(mapped.children.base, np.memmap)
+    assert not isinstance(in_memory.children.base, np.memmap)
+    np.testing.assert_array_equal(mapped.threshold, compiled_visa_model.compiled_model.threshold)
+    np.testing.assert_array_equal(in_memory.value, compiled_visa_model.compiled_model.value)
+
+
+def test_objects_saved_without_bundle_are_loaded_with_dill(tmp_path):
+    file_path = str(tmp_path / "object.pkl")
+
+    save_object(file_path, {"weights": np.arange(1000.0)})
+
+    assert not is_model_bundle(file_path)
+    np.testing.assert_array_equal(load_object(file_path)["weights"], np.arange(1000.0))
@@ -0,0 +1,77 @@
+import os
+
+import pytest
+from botocore.exceptions import EndpointConnectionError
+
+from Visa_Prediction.cloud_storage.model_cache import ModelCache
+from Visa_Prediction.configuration.aws_connection import S3Client
+from Visa_Prediction.exception import visaException
+
+
+@pytest.fixture
+def model_cache(s3_bucket, tmp_path, monkeypatch):
+    cache = ModelCache(s3_client=S3Client().s3_client, cache_dir=str(tmp_path / "model_cache"))
+    downloads = []
+    download = cache._download
+    monkeypatch.setattr(cache, "_download", lambda *args, **kwargs: (downloads.append(args[1]), download(*args, **kwargs)))
+    cache.downloads = downloads
+    return cache
+
+
+def put_model(model_cache, s3_bucket, content: bytes, key: str = "model.pkl") -> None:
+    model_cache.s3_client.put_object(Bucket=s3_bucket, Key=key, Body=content)
+
+
+def test_unchanged_model_is_only_downloaded_once(model_cache, s3_bucket):
+    put_model(model_cache, s3_bucket, b"version 1")
+
+    first = model_cache.get_model_file(s3_bucket, "model.pkl")
+    second = model_cache.get_model_file(s3_bucket, "model.pkl")
+
+    assert first == second
+    assert model_cache.downloads == ["model.pkl"]
+    with open(first, "rb") as file_obj:
+        assert file_obj.read() == b"version 1"
+
+
+def test_changed_model_is_downloaded_under_its_new_etag(model_cache, s3_bucket):
+    put_model(model_cache, s3_bucket, b"version 1")
+    first = model_cache.get_model_file(s3_bucket, "model.pkl")
+
+    put_model(model_cache, s3_bucket, b"version 2")
+    second = model_cache.get_model_file(s3_bucket, "model.pkl")
+
+    assert ModelCache.etag_of(first) != ModelCache.etag_of(second)
+    assert len(model_cache.downloads) == 2
+    with open(second, "rb") as file_obj:
+        assert file_obj.read() == b"version 2"
+
+
+def test_missing_model_raises(model_cache, s3_bucket):
+    with pytest.raises(visaException):
+        model_cache.get_model_file(s3_bucket, "model.pkl")
+
+
+def test_cached_model_is_used_when_s3_can_not_be_reached(model_cache, s3_bucket, monkeypatch):
+    put_model(model_cache, s3_bucket, b"version 1")
+    cached = model_cache.get_model_file(s3_bucket, "model.pkl")
+
+    def unreachable(**kwargs):
+        raise EndpointConnectionError(endpoint_url="https://s3.amazonaws.com")
+
+    monkeypatch.setattr(model_cache.s3_client, "head_object", unreachable)
+
+    assert model_cache.get_model_file(s3_bucket, "model.pkl") == cached
+
+
+def test_least_recently_used_versions_are_evicted(model_cache, s3_bucket):
+    model_cache.max_bytes = 15
+    put_model(model_cache, s3_bucket, b"version 1", key="a.pkl")
+    first = model_cache.get_model_file(s3_bucket, "a.pkl")
+    os.utime(first, (0, 0))
+
+    put_model(model_cache, s3_bucket, b"version 2", key="b.pkl")
+    second = model_cache.get_model_file(s3_bucket, "b.pkl")
+
+    assert not os.path.exists(first)
+    assert os.path.exists(second)
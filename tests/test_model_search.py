@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+import yaml
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.utils.model_search import ModelSearch
+
+
+def write_model_config(tmp_path, n_jobs: int = 1, successive_halving: bool = True) -> str:
+    config = {
+        "grid_search": {"params": {"cv": 3}},
+        "search_engine": {"n_jobs": n_jobs, "threads_per_worker": 1, "scoring": "accuracy",
+                          "successive_halving": successive_halving, "min_folds": 1, "halving_factor": 2},
+        "model_selection": {
+            "module_0": {"class": "KNeighborsClassifier", "module": "sklearn.neighbors", "params": {},
+                         "search_param_grid": {"n_neighbors": [3, 9]}},
+            "module_1": {"class": "RandomForestClassifier", "module": "sklearn.ensemble",
+                         "params": {"random_state": 0},
+                         "search_param_grid": {"max_depth": [2, 6], "n_estimators": [5]}},
+        },
+    }
+    file_path = tmp_path / f"model_{n_jobs}_{successive_halving}.yaml"
+    file_path.write_text(yaml.safe_dump(config))
+    return str(file_path)
+
+
+def test_candidates_flatten_every_grid(tmp_path):
+    candidates = ModelSearch(write_model_config(tmp_path)).get_candidates(class_weight={0: 1.0, 1: 2.0})
+
+    assert [candidate.model_serial_number for candidate in candidates] == ["module_0"] * 2 + ["module_1"] * 2
+    # KNN has no class_weight, the forest gets it
+    assert "class_weight" not in candidates[0].params
+    assert candidates[2].params == {"random_state": 0, "max_depth": 2, "n_estimators": 5, "class_weight": {0: 1.0, 1: 2.0}}
+
+
+def test_successive_halving_drops_candidates_after_the_first_fold(tmp_path, training_data):
+    _, X, y = training_data
+
+    _, scores, report = ModelSearch(write_model_config(tmp_path)).search(X, y)
+
+    assert report["fits"] < report["full_grid_fits"] == 12
+    assert np.isfinite(scores[:, 0]).all()
+    assert np.isfinite(scores).all(axis=1).sum() == 1
+
+
+def test_full_search_scores_every_fold(tmp_path, training_data):
+    _, X, y = training_data
+
+    _, scores, report = ModelSearch(write_model_config(tmp_path, successive_halving=False)).search(X, y)
+
+    assert report["fits"] == report["full_grid_fits"]
+    assert np.isfinite(scores).all()
+
+
+def test_process_pool_gives_the_scores_of_the_inline_search(tmp_path, training_data):
+    _, X, y = training_data
+
+    _, inline_scores, _ = ModelSearch(write_model_config(tmp_path, n_jobs=1)).search(X, y)
+    _, pool_scores, report = ModelSearch(write_model_config(tmp_path, n_jobs=2)).search(X, y)
+
+    assert report["workers"] == 2
+    np.testing.assert_array_equal(pool_scores, inline_scores)
+
+
+def test_best_model_is_refitted_on_all_the_data(tmp_path, training_data):
+    _, X, y = training_data
+
+    best = ModelSearch(write_model_config(tmp_path)).get_best_model(X, y, base_accuracy=0.0)
+
+    assert best.best_model.predict(X).shape == y.shape
+    assert best.best_score > 0.5
+
+
+def test_best_model_below_the_base_accuracy_raises(tmp_path, training_data):
+    _, X, y = training_data
+
+    with pytest.raises(visaException):
+        ModelSearch(write_model_config(tmp_path)).get_best_model(X, y, base_accuracy=1.1)
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+from Visa_Prediction.constants import TARGET_COLUMN
+from Visa_Prediction.entity.config_entity import VisaPredictionConfig
+from Visa_Prediction.pipeline.prediction_pipeline import VisaClassifier, VisaInputData
+from Visa_Prediction.utils.schema_validator import SchemaValidationError
+
+
+@pytest.fixture
+def records(visa_frame):
+    return visa_frame.drop(columns=[TARGET_COLUMN]).head(50)
+
+
+@pytest.mark.parametrize("convert", [
+    lambda df: df,
+    lambda df: df.to_dict(orient="records"),
+    lambda df: {column: df[column].to_numpy() for column in df.columns},
+    lambda df: pa.Table.from_pandas(df, preserve_index=False),
+])
+def test_to_dataframe_accepts_every_input_format(records, convert):
+    dataframe = VisaInputData.to_dataframe(convert(records))
+
+    pd.testing.assert_frame_equal(dataframe.reset_index(drop=True), records.reset_index(drop=True), check_dtype=False)
+
+
+def test_predict_in_batches_matches_the_model_on_the_whole_frame(records, visa_model):
+    classifier = VisaClassifier(VisaPredictionConfig(max_batch_size=7), visa_model=visa_model)
+
+    predictions = classifier.predict(records)
+
+    expected = visa_model.predict(classifier.prepare_features(records))
+    np.testing.assert_array_equal(predictions, expected)
+
+
+def test_predict_without_records_returns_no_predictions(records, visa_model):
+    classifier = VisaClassifier(VisaPredictionConfig(), visa_model=visa_model)
+
+    assert len(classifier.predict(records.head(0))) == 0
+
+
+def test_predict_labels_maps_back_to_the_case_status(records, visa_model):
+    classifier = VisaClassifier(VisaPredictionConfig(), visa_model=visa_model)
+
+    labels = classifier.predict_labels(records.to_dict(orient="records"))
+
+    assert len(labels) == len(records)
+    assert set(labels) <= {"Certified", "Denied"}
+
+
+def test_invalid_records_get_errors_and_the_others_labels(records, visa_model):
+    classifier = VisaClassifier(VisaPredictionConfig(), visa_model=visa_model)
+    records = records.reset_index(drop=True)
+    records.loc[2, "continent"] = "Atlantis"
+
+    labels = classifier.predict_labels_or_errors(records)
+
+    assert isinstance(labels[2], SchemaValidationError)
+    assert "continent:domain" in str(labels[2])
+    expected = classifier.predict_labels(records.drop(index=2), validate=False)
+    assert [label for index, label in enumerate(labels) if index != 2] == expected
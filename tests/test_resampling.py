@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+from imblearn.combine import SMOTEENN
+from imblearn.over_sampling import SMOTE
+
+from Visa_Prediction.exception import visaException
+from Visa_Prediction.utils.resampling import (ClassWeightResampler, Resampler, SmoteEnnResampler, get_resampler,
+                                              stratified_chunks)
+
+
+def test_none_keeps_the_rows(training_data):
+    _, X, y = training_data
+
+    result = get_resampler("none").run(X, y)
+
+    assert result.X is X and result.y is y
+    assert result.report["strategy"] == "none" and result.report["rows_after"] == len(y)
+
+
+def test_class_weight_balances_the_classes(training_data):
+    _, X, y = training_data
+
+    result = ClassWeightResampler().run(X, y)
+
+    counts = np.bincount(y)
+    assert result.class_weight == pytest.approx({label: len(y) / (2 * count) for label, count in enumerate(counts)})
+    assert result.X is X
+
+
+def test_smoteenn_matches_imblearn(training_data):
+    _, X, y = training_data
+
+    result = SmoteEnnResampler(n_jobs=1, random_state=0).run(X, y)
+
+    expected_X, expected_y = SMOTEENN(sampling_strategy="minority", smote=SMOTE(sampling_strategy="minority", random_state=0),
+                                      random_state=0).fit_resample(X, y)
+    np.testing.assert_array_equal(result.y, expected_y)
+    np.testing.assert_allclose(result.X, expected_X)
+    assert result.report["rows_after"] == len(y) + result.report["rows_added"] - result.report["rows_removed"]
+
+
+def test_large_matrices_are_resampled_in_stratified_chunks(training_data):
+    _, X, y = training_data
+
+    result = SmoteEnnResampler(n_jobs=1, max_chunk_bytes=X.nbytes // 3 + 1, random_state=0,
+                               approximate_neighbors=True).run(X, y)
+
+    assert result.report["chunks"] == 3
+    assert result.report["approximate_neighbors"]
+    assert result.report["rows_after"] == len(y) + result.report["rows_added"] - result.report["rows_removed"]
+    assert result.X.shape == (len(result.y), X.shape[1])
+
+
+def test_stratified_chunks_keep_the_class_proportions():
+    y = np.array([0] * 90 + [1] * 30)
+
+    chunks = stratified_chunks(y, 3, random_state=0)
+
+    np.testing.assert_array_equal(np.sort(np.concatenate(chunks)), np.arange(len(y)))
+    assert [int(y[chunk].sum()) for chunk in chunks] == [10, 10, 10]
+
+
+def test_unknown_strategy_raises():
+    with pytest.raises(visaException):
+        get_resampler("oversample_everything")
+    assert isinstance(get_resampler("none"), Resampler)
@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from sklearn.ensemble import RandomForestClassifier
+
+from Visa_Prediction.cloud_storage.model_cache import ModelCache
+from Visa_Prediction.entity.estimator import VisaModel
+from Visa_Prediction.entity.s3_estimator import visaEstimator
+from Visa_Prediction.utils.main_utils import save_object
+
+
+@pytest.fixture
+def estimator(s3_bucket, tmp_path):
+    estimator = visaEstimator(bucket_name=s3_bucket, model_path="model.pkl")
+    estimator.model_cache = ModelCache(s3_client=estimator.s3.s3_client, cache_dir=str(tmp_path / "model_cache"))
+    return estimator
+
+
+@pytest.fixture
+def warmup_frame(visa_frame, data_transformation):
+    return data_transformation.prepare_features(visa_frame.head(5))[0]
+
+
+def publish(estimator, tmp_path, obj, name: str) -> None:
+    file_path = str(tmp_path / name)
+    save_object(file_path, obj, bundle=True)
+    estimator.save_model(file_path)
+
+
+def other_model(visa_model, training_data) -> VisaModel:
+    _, X, y = training_data
+    model = RandomForestClassifier(n_estimators=3, max_depth=2, random_state=1).fit(X, y)
+    return VisaModel(preprocessing_object=visa_model.preprocessing_object, trained_model_object=model)
+
+
+def test_new_version_is_swapped_in(estimator, tmp_path, visa_model, training_data, warmup_frame):
+    publish(estimator, tmp_path, visa_model, "v1.pkl")
+    first = estimator.get_model()
+    first_etag = estimator.loaded_etag
+
+    assert estimator.refresh(warmup_frame) is False
+
+    publish(estimator, tmp_path, other_model(visa_model, training_data), "v2.pkl")
+    assert estimator.refresh(warmup_frame) is True
+    assert estimator.loaded_etag != first_etag
+    assert estimator.get_model() is not first
+    assert estimator.get_model().trained_model_object.n_estimators == 3
+
+
+def test_version_failing_the_warm_up_is_rejected(estimator, tmp_path, visa_model, warmup_frame):
+    publish(estimator, tmp_path, visa_model, "v1.pkl")
+    current = estimator.get_model()
+
+    publish(estimator, tmp_path, {"not": "a model"}, "broken.pkl")
+
+    assert estimator.refresh(warmup_frame) is False
+    assert estimator.get_model() is current
+    assert estimator._rejected_etag is not None and estimator._rejected_etag != estimator.loaded_etag
+
+
+def test_refresher_thread_swaps_in_the_background(estimator, tmp_path, visa_model, training_data, warmup_frame):
+    publish(estimator, tmp_path, visa_model, "v1.pkl")
+    estimator.get_model()
+    publish(estimator, tmp_path, other_model(visa_model, training_data), "v2.pkl")
+
+    estimator.start_refresher(interval_seconds=0.01, warmup_frame=warmup_frame)
+    try:
+        for _ in range(500):
+            if estimator.get_model().trained_model_object.n_estimators == 3:
+                break
+            estimator._stop_refresher.wait(0.01)
+    finally:
+        estimator.stop_refresher()
+
+    assert estimator.get_model().trained_model_object.n_estimators == 3
+    np.testing.assert_array_equal(estimator.predict(warmup_frame), estimator.get_model().predict(warmup_frame))
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from Visa_Prediction.constants import TARGET_COLUMN
+from Visa_Prediction.utils.drift_utils import iter_frame_chunks
+from Visa_Prediction.utils.schema_validator import SchemaValidator
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return SchemaValidator.from_schema_file()
+
+
+@pytest.fixture
+def records(visa_frame):
+    return visa_frame.drop(columns=[TARGET_COLUMN]).head(40).reset_index(drop=True)
+
+
+def break_records(records):
+    records = records.astype({"no_of_employees": object, "yr_of_estab": float})
+    records.loc[3, "continent"] = "Atlantis"
+    records.loc[5, "yr_of_estab"] = 1700
+    records.loc[5, "unit_of_wage"] = None
+    records.loc[9, "no_of_employees"] = "many"
+    records.loc[9, "continent"] = None
+    return records
+
+
+def test_valid_records_pass(validator, visa_frame):
+    result = validator.validate_frame(visa_frame)
+
+    assert result.is_valid
+    assert result.n_invalid_rows == 0 and result.violated_rules() == {}
+
+
+def test_every_rule_reports_its_rows(validator, records):
+    result = validator.validate_frame(break_records(records))
+
+    assert not result.is_valid
+    assert result.invalid_rows().tolist() == [3, 5, 9]
+    assert result.violated_rules() == {
+        3: ["continent:domain"],
+        5: ["unit_of_wage:null", "yr_of_estab:range"],
+        9: ["continent:null", "no_of_employees:type"],
+    }
+    assert result.summary()["rule_counts"] == {"continent:domain": 1, "continent:null": 1, "no_of_employees:type": 1,
+                                               "unit_of_wage:null": 1, "yr_of_estab:range": 1}
+
+
+def test_chunks_give_the_result_of_the_whole_frame(validator, records):
+    records = break_records(records)
+
+    whole = validator.validate_frame(records)
+    chunked = validator.validate(iter_frame_chunks(records, 4))
+
+    assert chunked.violated_rules() == whole.violated_rules()
+    assert chunked.rule_counts == whole.rule_counts
+    np.testing.assert_array_equal(chunked.invalid_row_bitmap, whole.invalid_row_bitmap)
+
+
+def test_categorical_columns_are_checked_by_category(validator, records):
+    records = break_records(records).astype({"continent": "category"})
+
+    result = validator.validate_frame(records)
+
+    assert result.violated_rules()[3] == ["continent:domain"]
+    assert result.violated_rules()[9] == ["continent:null", "no_of_employees:type"]
+
+
+def test_missing_columns_invalidate_the_records(records):
+    validator = SchemaValidator.from_schema_file(columns=["continent", "prevailing_wage"])
+
+    result = validator.validate_frame(records.drop(columns=["continent"]))
+
+    assert not result.is_valid
+    assert result.missing_columns == ["continent"]
@@ -0,0 +1,97 @@
+import os
+from dataclasses import dataclass
+
+import pytest
+
+from Visa_Prediction.components.data_validation import DataValidation
+from Visa_Prediction.entity.artifact_entity import ClassificationMetricArtifact, DataIngestionArtifact, ModelTrainerArtifact
+from Visa_Prediction.entity.config_entity import StageCacheConfig, training_pipeline_config
+from Visa_Prediction.utils.stage_cache import StageCache
+
+
+@dataclass
+class StageConfig:
+    output_file_path: str
+    threshold: float = 0.5
+
+
+@pytest.fixture
+def stage_cache(tmp_path):
+    return StageCache(StageCacheConfig(stage_cache_dir=str(tmp_path / "stage_cache"), keep_per_stage=2))
+
+
+@pytest.fixture
+def ingestion_artifact(tmp_path):
+    for name in ("train.parquet", "test.parquet"):
+        (tmp_path / name).write_bytes(name.encode())
+    return DataIngestionArtifact(train_file_path=str(tmp_path / "train.parquet"),
+                                 test_file_path=str(tmp_path / "test.parquet"))
+
+
+def run_config(threshold: float = 0.5, run: str = "run") -> StageConfig:
+    return StageConfig(os.path.join(training_pipeline_config.artifact_dir, run, "out.pkl"), threshold)
+
+
+def test_key_ignores_the_paths_of_the_run(stage_cache, ingestion_artifact):
+    key = stage_cache.compute_key("validation", artifacts=[ingestion_artifact], configs=[run_config(run="a")])
+
+    assert key == stage_cache.compute_key("validation", artifacts=[ingestion_artifact], configs=[run_config(run="b")])
+
+
+def test_key_changes_with_every_input(stage_cache, ingestion_artifact, tmp_path):
+    schema_file = tmp_path / "schema.yaml"
+    schema_file.write_text("columns: []")
+    inputs = dict(artifacts=[ingestion_artifact], configs=[run_config()], files=[str(schema_file)],
+                  components=[DataValidation], constants={"threshold": 0.1})
+    key = stage_cache.compute_key("validation", **inputs)
+
+    assert stage_cache.compute_key("transformation", **inputs) != key
+    assert stage_cache.compute_key("validation", **{**inputs, "configs": [run_config(threshold=0.9)]}) != key
+    assert stage_cache.compute_key("validation", **{**inputs, "constants": {"threshold": 0.2}}) != key
+    assert stage_cache.compute_key("validation", **{**inputs, "components": []}) != key
+
+    schema_file.write_text("columns: [case_id]")
+    assert stage_cache.compute_key("validation", **inputs) != key
+    schema_file.write_text("columns: []")
+    (tmp_path / "train.parquet").write_bytes(b"new rows")
+    assert stage_cache.compute_key("validation", **inputs) != key
+
+
+def test_key_ignores_the_reports_of_upstream_artifacts(stage_cache, tmp_path):
+    model_file = tmp_path / "model.pkl"
+    model_file.write_bytes(b"model")
+    metrics = ClassificationMetricArtifact(f1_score=0.8, precision_score=0.8, recall_score=0.8)
+
+    def key(speedup):
+        artifact = ModelTrainerArtifact(str(model_file), metrics, compiled_model_report={"speedups": {1: speedup}})
+        return stage_cache.compute_key("evaluation", artifacts=[artifact])
+
+    assert key(1.5) == key(0.9)
+
+
+def test_saved_artifact_is_loaded_back(stage_cache, ingestion_artifact):
+    stage_cache.save("ingestion", "abc", ingestion_artifact)
+
+    assert stage_cache.load("ingestion", "abc") == ingestion_artifact
+    assert stage_cache.load("ingestion", "def") is None
+
+
+def test_entry_with_missing_files_is_dropped(stage_cache, ingestion_artifact):
+    stage_cache.save("ingestion", "abc", ingestion_artifact)
+    os.remove(ingestion_artifact.test_file_path)
+
+    assert stage_cache.load("ingestion", "abc") is None
+    assert not os.listdir(os.path.join(stage_cache.stage_cache_config.stage_cache_dir, "ingestion"))
+
+
+def test_gc_keeps_the_most_recently_used_entries(stage_cache, ingestion_artifact):
+    for index, key in enumerate(["a", "b", "c"]):
+        stage_cache.save("ingestion", key, ingestion_artifact)
+        entry_path = os.path.join(stage_cache.stage_cache_config.stage_cache_dir, "ingestion", f"{key}.pkl")
+        os.utime(entry_path, (index, index))
+
+    report = stage_cache.gc(remove_unreferenced_runs=False)
+
+    assert report["removed_entries"] == 1
+    assert stage_cache.load("ingestion", "a") is None
+    assert stage_cache.load("ingestion", "c") == ingestion_artifact
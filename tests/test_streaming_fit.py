@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from Visa_Prediction.components.data_transformation import DataTransformation
+from Visa_Prediction.entity.artifact_entity import DataIngestionArtifact
+from Visa_Prediction.entity.config_entity import DataTransformationConfig
+from Visa_Prediction.utils.main_utils import count_dataframe_rows, iter_dataframe_batches, save_dataframe
+from Visa_Prediction.utils.streaming_fit import ReservoirSample
+
+
+@pytest.fixture
+def train_file(tmp_path, visa_frame):
+    file_path = str(tmp_path / "train.parquet")
+    save_dataframe(file_path, visa_frame, category_columns=["continent"])
+    return file_path
+
+
+def streaming_transformation(train_file, sample_rows: int) -> DataTransformation:
+    return DataTransformation(data_ingestion_artifact=DataIngestionArtifact(train_file, train_file),
+                              data_transformation_config=DataTransformationConfig(streaming_batch_rows=64,
+                                                                                  streaming_sample_rows=sample_rows),
+                              data_validation_artifact=None)
+
+
+def test_batches_cover_the_file(train_file, visa_frame):
+    batches = list(iter_dataframe_batches(train_file, columns=["continent", "prevailing_wage"], batch_rows=64))
+
+    assert count_dataframe_rows(train_file) == len(visa_frame)
+    assert max(len(batch) for batch in batches) == 64
+    pd.testing.assert_frame_equal(pd.concat(batches, ignore_index=True), visa_frame[["continent", "prevailing_wage"]],
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_reservoir_keeps_every_row_of_a_small_dataset(visa_frame):
+    reservoir = ReservoirSample(n_rows=1000, random_state=0)
+    for start in range(0, len(visa_frame), 64):
+        reservoir.update(visa_frame.iloc[start:start + 64])
+
+    pd.testing.assert_frame_equal(reservoir.sample, visa_frame.reset_index(drop=True), check_dtype=False)
+
+
+def test_reservoir_sample_is_uniform():
+    frame = pd.DataFrame({"row": np.arange(100)})
+    counts = np.zeros(100)
+    for seed in range(400):
+        reservoir = ReservoirSample(n_rows=20, random_state=seed)
+        for start in range(0, 100, 7):
+            reservoir.update(frame.iloc[start:start + 7])
+        assert len(reservoir) == 20 and reservoir.n_seen == 100
+        sample = reservoir.sample["row"].to_numpy()
+        assert len(np.unique(sample)) == 20
+        counts[sample] += 1
+
+    # every row is kept with probability 20 / 100, 80 times out of 400 runs
+    assert abs(counts[:50].mean() - counts[50:].mean()) < 8
+    assert counts.min() > 50 and counts.max() < 115
+
+
+def test_streaming_fit_equals_the_in_memory_fit_when_the_sample_holds_every_row(train_file, visa_frame,
+                                                                                   training_data):
+    preprocessor, X, _ = training_data
+    data_transformation = streaming_transformation(train_file, sample_rows=len(visa_frame))
+
+    streamed_preprocessor, _ = data_transformation.fit_preprocessor_streaming(train_file)
+
+    features, _ = data_transformation.prepare_features(visa_frame)
+    np.testing.assert_allclose(streamed_preprocessor.transform(features), X, rtol=1e-9, atol=1e-9)
+
+
+def test_transform_to_file_writes_the_transformed_batches(tmp_path, train_file, visa_frame):
+    data_transformation = streaming_transformation(train_file, sample_rows=100)
+    preprocessor, reference_sketch = data_transformation.fit_preprocessor_streaming(train_file)
+
+    features, labels = data_transformation.transform_to_file(preprocessor, train_file, str(tmp_path / "X.npy"),
+                                                             str(tmp_path / "y.npy"), reference_sketch=reference_sketch)
+
+    expected_features, expected_labels = data_transformation.prepare_features(visa_frame)
+    np.testing.assert_allclose(features, preprocessor.transform(expected_features))
+    np.testing.assert_array_equal(labels, expected_labels.to_numpy())
+    assert reference_sketch.n == len(visa_frame)
@@ -0,0 +1,77 @@
+import pyarrow as pa
+import pytest
+
+from Visa_Prediction.constants import SCHEMA_FILE_PATH
+from Visa_Prediction.data_access.visa_data import VisaData, get_id_partitions, get_schema_column_types, iter_collection_batches
+from Visa_Prediction.utils.main_utils import read_yaml_file
+from tests.conftest import make_visa_frame
+
+
+@pytest.fixture
+def column_types():
+    return get_schema_column_types(read_yaml_file(SCHEMA_FILE_PATH))
+
+
+@pytest.fixture
+def collection(mongo_client):
+    collection = mongo_client["visa"]["visa_data"]
+    collection.insert_many(make_visa_frame(95).to_dict(orient="records"))
+    return collection
+
+
+def test_batches_are_typed_and_bounded(collection, column_types):
+    tables = list(iter_collection_batches(collection, column_types, batch_size=20))
+
+    assert [table.num_rows for table in tables] == [20, 20, 20, 20, 15]
+    for table in tables:
+        assert table.column_names == list(column_types)
+        assert pa.types.is_string(table.schema.field("continent").type)
+        assert pa.types.is_integer(table.schema.field("no_of_employees").type)
+
+
+def test_na_values_become_nulls_and_unknown_fields_are_not_read(mongo_client, column_types):
+    collection = mongo_client["visa"]["with_na"]
+    record = make_visa_frame(1).to_dict(orient="records")[0]
+    collection.insert_one(dict(record, prevailing_wage="na", extra_field="ignored"))
+
+    table = next(iter_collection_batches(collection, column_types))
+
+    assert table.column("prevailing_wage").null_count == 1
+    assert "extra_field" not in table.column_names and "_id" not in table.column_names
+
+
+def test_export_keeps_the_insertion_order(collection):
+    expected = make_visa_frame(95)
+
+    dataframe = VisaData().export_collection_as_dataframe("visa_data", batch_size=30)
+
+    assert dataframe["case_id"].tolist() == expected["case_id"].tolist()
+    assert dataframe["no_of_employees"].tolist() == expected["no_of_employees"].tolist()
+
+
+def test_export_of_an_empty_collection_has_the_schema_columns(mongo_client, column_types):
+    table = VisaData().export_collection_as_table("missing_collection")
+
+    assert table.num_rows == 0
+    assert table.column_names == list(column_types)
+
+
+@pytest.mark.parametrize("num_partitions", [1, 3, 7])
+def test_id_partitions_cover_every_document_once_in_order(collection, column_types, num_partitions):
+    queries = get_id_partitions(collection, num_partitions)
+
+    case_ids = [case_id for query in queries
+                for table in iter_collection_batches(collection, column_types, batch_size=16, query=query)
+                for case_id in table.column("case_id").to_pylist()]
+
+    assert len(queries) == num_partitions
+    assert case_ids == make_visa_frame(95)["case_id"].tolist()
+
+
+def test_id_partitions_keep_the_query(collection, column_types):
+    last_id = list(collection.find({}, {"_id": 1}).sort("_id", 1).skip(59).limit(1))[0]["_id"]
+
+    queries = get_id_partitions(collection, 4, query={"_id": {"$gt": last_id}})
+
+    n_rows = sum(table.num_rows for query in queries for table in iter_collection_batches(collection, column_types, query=query))
+    assert n_rows == 35